@@ -5,7 +5,20 @@ from collections import deque
 from typing import List, Optional, Any, Union
 from kruskal import MazeDisjointSet, test_maze_disjoint_set
 import json
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
 from settings import Colors
+import wall_bitmap
+import bitmap_generators
+import instrumentation
+import maze_validator
+import maze_formats
+
+logger = logging.getLogger(__name__)
 
 GREEN = (0, 128, 0)
 BLACK = (0, 0, 0)
@@ -15,20 +28,37 @@ DARKGRAY = (51, 51, 51)
 WALL_WIDTH = 6
 BLINK_OFFSET = 4
 
+# Every generator name accepted by MazeMap.runToCompletion
+GENERATORS = ("dfs", "kruskal", "prim", "wilson", "eller", "sidewinder", "binary_tree", "aldous_broder", "ab_wilson", "division")
+
 class MazeMap:
-    def __init__(self, mazeWidth: int, mazeHeight:int, cellSize: int, startX: int=0, startY: int=0) -> None:
-        # Set up display
-        self.screen = pygame.display.set_mode((mazeWidth, mazeHeight))
+    def __init__(self, mazeWidth: int, mazeHeight:int, cellSize: int, startX: int=0, startY: int=0,
+                 headless: bool = False, rng: Optional[random.Random] = None, seed: Optional[int] = None) -> None:
+        # Set up display, unless running headless (batch generation, worker processes): then nothing is drawn
+        self.headless = headless
+        self.screen = None if headless else pygame.display.set_mode((mazeWidth, mazeHeight))
         self.clock = pygame.time.Clock()
         # Set window title
-        pygame.display.set_caption("Maze Solver")
+        if not headless:
+            pygame.display.set_caption("Maze Solver")
+        # Random number generator used by every generator. Without an explicit rng a seed is always drawn and kept,
+        # so any maze can be regenerated exactly from (generator, size, seed), see fromSeed()
+        if rng is None and seed is None:
+            seed = random.SystemRandom().randrange(sys.maxsize)
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.generatorName: Optional[str] = None # recorded in saved files along with the seed
+        self.stats = instrumentation.NULL_STATS # counters and timers, see enableStats()
+        self.wallJournal: Optional[list] = None # (x1, y1, x2, y2) of every removed wall while a checkpoint.Checkpointer is attached
+        self.remainingJournal: Optional[list] = None # Wilson cells taken out of remainingCells, same condition
         # Background color is set to black
         self.backgroundColor = BLACK
         # Defining the cell properties
         self.cellSize = cellSize
         self.cols = mazeWidth // cellSize
         self.rows = mazeHeight // cellSize 
-        print('Number of cols: ', self.cols, '\nNumber of rows: ', self.rows, '\nNumber of cells: ', self.cols * self.rows)
+        if not headless:
+            logger.info("Number of cols: %d, number of rows: %d, number of cells: %d", self.cols, self.rows, self.cols * self.rows)
         # List represented as a 2-Dimensional grid of cells being enumerated by the xy        
         # IDEA TODO: using pygame's Sprite group
         # NOTE: check debug note of 3/14 to understand why we do list comprehension like this
@@ -48,16 +78,20 @@ class MazeMap:
         self.disjointSet = MazeDisjointSet(n_rows=self.rows, n_cols=self.cols)
         # Wilson
         self.remainingCells = []
+        self.remainingIndex = None # position of every cell in remainingCells, an int32 array indexed [x, y]
         self.currentlyRandomWalking = False
         self.randomWalk = [] # a list to store the current cell of the random walks
+        self.walkPositions = {} # index of every cell of the random walk, for O(1) loop detection
     # -----------------------------------------------------------------------------
     def iterativeDFS(self):
         """Recursive Backtracker, or randomized depth-first search
         NOTE: this method works on every iteration based of the pygame's clock"""
+        self.stats.count("generator_steps")
+        self.stats.sample("frontier", len(self.stack))
         # Given a current cell as a parameter and mark as visited
         self.current.visited = True
         # Invoking checkNeighbors() to return unvisited neighbor cells
-        next_cell = self.current.checkNeighbors(self.MazeGrid, return_all=False, includeVisited=False)
+        next_cell = self.current.checkNeighbors(self.MazeGrid, return_all=False, includeVisited=False, rng=self.rng)
         # TEST using maze's method for finding neighbors
         # next_cell = self.checkNeighbors(currentCell=self.current)
 
@@ -120,11 +154,13 @@ class MazeMap:
                 if x > 0:  # Ensure the left wall exists and is within bounds
                     self.walls.append(((x, y), (x - 1, y)))
         # Shuffle the walls for a random choice, we can do this or randomly choose from the list of walls
-        random.shuffle(self.walls)         
+        self.rng.shuffle(self.walls)
         # print(self.walls)
 
     def iterativeKruskal(self):
         "Iterative randomized Kruskal's Algorithm (with sets)"
+        self.stats.count("generator_steps")
+        self.stats.sample("frontier", len(self.walls))
         if self.walls:
             chosenWall = self.walls.pop()
             # Randomly choose a wall from the list of walls
@@ -139,13 +175,13 @@ class MazeMap:
                 self.removeWalls(self.MazeGrid[x1][y1], self.MazeGrid[x2][y2])
                 # Join the sets of the formerly divided cells - UNIONIZE the two sets!!! hell ye Marx
                 self.disjointSet.union(x1, y1, x2, y2)
-        print(self.walls)
         
     def iterativeKruskal_preload(self):
         """
         Same as the randomized iterative Kruskal but we just computed them all beforehand, before getting into the loop
         """
-        for chosenWall in self.walls:
+        # Same order as iterativeKruskal, which pops from the end, so both produce the same maze from the same seed
+        for chosenWall in reversed(self.walls):
             # Randomly choose a wall from the list of walls
             # chosenWall = random.choice(self.walls) # the other randomization choice, either is easy to code
             # Retrieve the information of the cells being divided by this wall
@@ -158,14 +194,17 @@ class MazeMap:
                 self.removeWalls(self.MazeGrid[x1][y1], self.MazeGrid[x2][y2])
                 # Join the sets of the formerly divided cells - UNIONIZE the two sets!!! hell ye Marx
                 self.disjointSet.union(x1, y1, x2, y2)
+        self.walls = []
 
     # -----------------------------------------------------------------------------
     # Randomized Prim's Algorithm without stacks without sets
     def iterativePrim(self):
         """Iterative randomized Prim's algorithm where we concurrently update the Maze grid as we display onto Pygame"""
+        self.stats.count("generator_steps")
+        self.stats.sample("frontier", len(self.walls))
         if self.walls: 
             # Pick a random wall from the list
-            chosenWall = random.choice(self.walls)
+            chosenWall = self.rng.choice(self.walls)
             # Retrieving the two cells divided by the wall
             cell1, cell2 = chosenWall
             x1, y1 = cell1
@@ -173,7 +212,8 @@ class MazeMap:
             cell1: "Cell" = self.MazeGrid[x1][y1]
             cell2: "Cell" = self.MazeGrid[x2][y2]
             # Display the currently compared cell
-            cell1.DrawCell(self.screen, cellColor=RED, flash=True); cell2.DrawCell(self.screen, cellColor=RED, flash=True)
+            if self.screen is not None:
+                cell1.DrawCell(self.screen, cellColor=RED, flash=True); cell2.DrawCell(self.screen, cellColor=RED, flash=True)
             # Remove the wall from the list so we don't have to revisit
             self.walls.remove(chosenWall)
 
@@ -200,7 +240,7 @@ class MazeMap:
 
         while self.walls: # TODO: change this into an iterative style for maze generation
             # Pick a random wall from the list
-            chosenWall = random.choice(self.walls)
+            chosenWall = self.rng.choice(self.walls)
             # Retrieving the two cells divided by the wall
             cell1, cell2 = chosenWall 
             x1, y1 = cell1
@@ -228,26 +268,37 @@ class MazeMap:
     # Wilson's Algorithm Implementation
     def init_Wilson(self):
         # Generate a list containing all the maze's Cells, which we will be using to retrieve a randomly chosen cell
-        for x in range(self.cols):
-            for y in range(self.rows):
-                self.remainingCells.append((x, y))
+        self.remainingCells = [(x, y) for x in range(self.cols) for y in range(self.rows)]
+        self.remainingIndex = np.arange(self.cols * self.rows, dtype=np.int32).reshape(self.cols, self.rows)
         # Set the initial cell (here just using the starting point, but we can do an arbitrarily random choice)
         self.current.visited = True
-        self.remainingCells.remove((self.current.x, self.current.y))
+        self.removeRemainingCell(self.current.x, self.current.y)
         self.currentlyRandomWalking = False
-        
+
+    def removeRemainingCell(self, x: int, y: int) -> None:
+        """Take a cell out of remainingCells in O(1): the last cell of the list moves into its slot.
+        The order of remainingCells, hence the cell rng.choice picks, depends on the previous removals: a seed gives the
+        same maze on every run, but not the maze it gave when the cells were removed with list.remove"""
+        remove_remaining_cell(self.remainingCells, self.remainingIndex, x, y)
+        if self.remainingJournal is not None:
+            self.remainingJournal.append((x, y))
+
     def iterativeWilson(self):
         """Wilson's algorithm: Generates an unbiased sample from the uniform distribution over all mazes, using loop-erased random walks"""
+        self.stats.count("generator_steps")
+        self.stats.sample("walk_length", len(self.randomWalk))
         # TODO: add a feature where the random walk backtracks to erase loop -> DONE
         # TODO: show the cells as gray while the algorithm is performing a random walk -> DONE
         if self.remainingCells:
-            print(f"Number of remaining cells: {len(self.remainingCells)}")  # Debugging log
+            if __debug__:
+                logger.debug("Number of remaining cells: %d", len(self.remainingCells))
             # print(self.remainingCells)
             if not self.currentlyRandomWalking:
                 "1. Either starting the algorithm or just finished adding a new random walk to the maze"
                 # Choose a random unvisited cell
-                start_coords = random.choice(self.remainingCells)
-                print(f"Starting random walk from: {start_coords}")  # Debugging log
+                start_coords = self.rng.choice(self.remainingCells)
+                if __debug__:
+                    logger.debug("Starting random walk from: %s", start_coords)
                 start_x, start_y = start_coords
                 self.current: "Cell" = self.MazeGrid[start_x][start_y]
                 assert start_x == self.current.x
@@ -257,21 +308,22 @@ class MazeMap:
                 # Reset the random walk to a new list containing this starting cell's xy-coordinate
                 # and Perform a loop-erased random walk
                 self.randomWalk = [(self.current.x, self.current.y)]
+                self.walkPositions = {(self.current.x, self.current.y): 0}
                 self.currentlyRandomWalking = True
 
             else: 
                 "Case 2: Currently in a random walk"
                 # Choose a random neighbor, important to call the checkneighbors to include also visited cells
-                newCell: "Cell" = self.current.checkNeighbors(self.MazeGrid, return_all=False, includeVisited=True)
+                newCell: "Cell" = self.current.checkNeighbors(self.MazeGrid, return_all=False, includeVisited=True, rng=self.rng)
                 # If the new cell is already in the random walk, ERASE THE LOOP
-                if (newCell.x, newCell.y) in self.randomWalk:
-                    # Getting the index of the cell that is revisited
-                    loop_start = self.randomWalk.index((newCell.x, newCell.y))
+                loop_start = self.walkPositions.get((newCell.x, newCell.y))
+                if loop_start is not None:
                     # For display purpose, we remove the loop out of the random walk
                     for cellx, celly in self.randomWalk[loop_start+1:]:
                         self.MazeGrid[cellx][celly].Color = BLACK
+                        del self.walkPositions[(cellx, celly)]
                     # Erase the loop of the random walk by resetting to the array till the start of the loop that we have identified
-                    self.randomWalk = self.randomWalk[:loop_start + 1]
+                    del self.randomWalk[loop_start + 1:]
                     # Restart at the latest element for the reset random walk
                     self.current = self.MazeGrid[self.randomWalk[-1][0]][self.randomWalk[-1][1]]
                     # print(f"Loop detected, erasing to: {self.randomWalk}")  # Debugging log
@@ -294,10 +346,10 @@ class MazeMap:
                             # Maybe figure something out in the future to iprove this
                             cell1.Color = BLACK
                             # print(f"Removing cell:", cell1.x, cell1.y)  # Debug check
-                            self.remainingCells.remove((cell1.x, cell1.y)) # Remove the added cells in the random 
+                            self.removeRemainingCell(cell1.x, cell1.y) # Remove the added cells in the random walk
                         # Remove the wall between the newCell: the one in the maze, and the last cell in the array to make contact with it
                         x, y = self.randomWalk[-1]
-                        self.remainingCells.remove((x, y)) # We are still missing the last cell in the random walk so we remove that also
+                        self.removeRemainingCell(x, y) # We are still missing the last cell in the random walk so we remove that also
                         lastCellinRandomWalk = self.MazeGrid[x][y]
                         lastCellinRandomWalk.Color = BLACK 
                         self.removeWalls(cell1=newCell, cell2=lastCellinRandomWalk)
@@ -305,63 +357,50 @@ class MazeMap:
                         return
                     else:
                         # Have yet to encounter the maze, continue the random walk
+                        self.walkPositions[(newCell.x, newCell.y)] = len(self.randomWalk)
                         self.randomWalk.append((newCell.x, newCell.y))
                         self.current = newCell
                         self.current.Color = DARKGRAY
 
     def Wilson(self) -> None:
-        """Wilson's algorithm: Generates an unbiased sample from the uniform distribution over all mazes, using loop-erased random walks"""
+        """Wilson's algorithm run to the end without display: iterativeWilson until every cell is in the maze
+        NOTE: call init_Wilson() first. The preload display and runToCompletion both go through it, so a seed gives the
+        same maze as the step-by-step display. Linear in the number of cells plus the length of the walks: loop
+        erasure (walkPositions) and removal from remainingCells (removeRemainingCell) are O(1).
+        Seed -> maze: the remaining cells are swap-removed, which changes the cell each walk starts from compared with
+        the list.remove version, so Wilson mazes saved by seed before that change regenerate differently"""
         while self.remainingCells:
-            # Choose a random unvisited cell
-            start_coords = random.choice(self.remainingCells)
-            start_x, start_y = start_coords
-            currentCell = self.MazeGrid[start_x][start_y]
-
-            # Perform a loop-erased random walk form the random unvisited cell
-            randomWalk = [(currentCell.x, currentCell.y)]
-            while True:
-                # Choose a random neighbor
-                newCell = currentCell.checkNeighbors(self.MazeGrid)
-                if not newCell:
-                    break
-
-                # If the new cell is already in the random walk, erase the loop
-                if (newCell.x, newCell.y) in randomWalk:
-                    # Getting the index of the cell that is revisited causing the loop
-                    loop_start = randomWalk.index((newCell.x, newCell.y))
-                    # Erase the loop of the random walk by resetting to the array till the start of the loop that we have identified
-                    randomWalk = randomWalk[:loop_start + 1]
-                else:
-                    randomWalk.append((newCell.x, newCell.y))
-
-                # If the new cell is part of the maze that we have already defined,  walk
-                if newCell.visited:
-                    break
-
-                currentCell = newCell
-
-            # Add the random walk to the maze
-            for i in range(len(randomWalk) - 1):
-                x1, y1 = randomWalk[i]
-                x2, y2 = randomWalk[i + 1]
-                cell1 = self.MazeGrid[x1][y1]
-                cell2 = self.MazeGrid[x2][y2]
-                self.removeWalls(cell1, cell2)
-                cell2.visited = True
-                self.remainingCells.remove((cell2.x, cell2.y))
+            self.iterativeWilson()
     # -----------------------------------------------------------------------------
     # TODO: Aldous-Broder Algorithm and Fractal Tessellation algorithm
-    def AldousBroder(self):
-        pass
+    def AldousBroder(self, wilsonAt: float = 1.0) -> None:
+        """Aldous-Broder random walk, switching to Wilson's algorithm once a fraction wilsonAt of the cells is covered
+        (1.0 = pure Aldous-Broder). See bitmap_generators.aldous_broder_bitmap"""
+        self.loadBitmap(bitmap_generators.aldous_broder_bitmap(self.cols, self.rows, self.rng, wilsonAt))
 
     def FractalTessellation(self):
         pass
 
-    def Eller(self):
-        pass
+    def RecursiveDivision(self, roomSize: int = 1) -> None:
+        """Recursive division, adding walls to an empty grid (bitmap_generators.recursive_division_bitmap).
+        A roomSize above 1 leaves open rooms, so the maze is no longer perfect"""
+        self.loadBitmap(bitmap_generators.recursive_division_bitmap(self.cols, self.rows, self.numpyRng(), roomSize))
 
-    def Sidewinder(self):
-        pass
+    def Eller(self, horizontalBias: float = 0.5, verticalBias: float = 0.5) -> None:
+        """Eller's algorithm, row by row (see bitmap_generators.eller_rows for the streaming version)"""
+        self.loadBitmap(bitmap_generators.eller_bitmap(self.cols, self.rows, self.rng, horizontalBias, verticalBias))
+
+    def Sidewinder(self, eastBias: float = 0.5) -> None:
+        """Vectorized Sidewinder, decided for the whole grid at once (bitmap_generators.sidewinder_bitmap)"""
+        self.loadBitmap(bitmap_generators.sidewinder_bitmap(self.cols, self.rows, self.numpyRng(), eastBias))
+
+    def BinaryTree(self, northBias: float = 0.5) -> None:
+        """Vectorized Binary Tree, decided for the whole grid at once (bitmap_generators.binary_tree_bitmap)"""
+        self.loadBitmap(bitmap_generators.binary_tree_bitmap(self.cols, self.rows, self.numpyRng(), northBias))
+
+    def numpyRng(self) -> np.random.Generator:
+        """NumPy generator for the vectorized generators, seeded from self.rng so the maze still follows self.seed"""
+        return np.random.default_rng(self.rng.getrandbits(64))
     # -----------------------------------------------------------------------------
     # Utility functions for the cells and maze
     #TODO
@@ -371,6 +410,77 @@ class MazeMap:
         # Initialize the grid full of walls
         pass
 
+    def braid(self, fraction: float = 0.5) -> None:
+        """Post-process the generated maze: remove one wall from a fraction of the dead ends to add loops
+        (bitmap_generators.braid_bitmap)"""
+        self.loadBitmap(bitmap_generators.braid_bitmap(wall_bitmap.from_maze_grid(self.MazeGrid), fraction, self.numpyRng()))
+
+    def enableStats(self, stats: Optional[instrumentation.Stats] = None) -> instrumentation.Stats:
+        """Start recording counters and timers (steps, wall removals, frontier size...) into stats, a new Stats by default"""
+        self.stats = stats if stats is not None else instrumentation.Stats()
+        return self.stats
+
+    def loadBitmap(self, bitmap: np.ndarray) -> None:
+        """Replace the walls of the grid with a wall bitmap of shape (cols, rows), e.g. from a bitmap generator"""
+        if bitmap.shape != (self.cols, self.rows):
+            raise ValueError(f"Bitmap shape {bitmap.shape} does not match the maze ({self.cols}, {self.rows})")
+        wall_bitmap.apply_to_maze_grid(bitmap, self.MazeGrid)
+        for column in self.MazeGrid:
+            for cell in column:
+                cell.visited = True
+        self.mazeGenerated = True
+
+    @classmethod
+    def fromBitmap(cls, bitmap: np.ndarray, cellSize: int = 20, headless: bool = True) -> "MazeMap":
+        """Build a maze with the walls of a wall bitmap of shape (cols, rows)"""
+        cols, rows = bitmap.shape
+        maze = cls(mazeWidth=cols * cellSize, mazeHeight=rows * cellSize, cellSize=cellSize, headless=headless)
+        maze.loadBitmap(bitmap)
+        return maze
+
+    def runToCompletion(self, generatorName: str = "dfs", profilePath: Optional[str] = None, validate: bool = False) -> None:
+        """Run a generator until the maze is complete without drawing anything (headless mazes, batch generation).
+        Draws the random numbers in the same order as the step-by-step display, so a seed gives the same maze in both
+        With profilePath the run is done under cProfile and its stats are dumped there (.prof)
+        With validate the result is checked to be a perfect maze, raising maze_validator.MazeValidationError if not"""
+        with instrumentation.profiled(profilePath), self.stats.timer("generate"):
+            self.generatorName = generatorName
+            if generatorName == "dfs":
+                while not self.mazeGenerated:
+                    self.iterativeDFS()
+            elif generatorName == "kruskal":
+                self.generateListofWalls()
+                self.iterativeKruskal_preload()
+            elif generatorName == "prim":
+                self.iterativePrim_preload(self.current)
+            elif generatorName == "wilson":
+                self.init_Wilson()
+                self.Wilson()
+            elif generatorName == "eller":
+                self.Eller()
+            elif generatorName == "sidewinder":
+                self.Sidewinder()
+            elif generatorName == "binary_tree":
+                self.BinaryTree()
+            elif generatorName == "aldous_broder":
+                self.AldousBroder()
+            elif generatorName == "ab_wilson":
+                self.AldousBroder(wilsonAt=bitmap_generators.DEFAULT_WILSON_SWITCH)
+            elif generatorName == "division":
+                self.RecursiveDivision()
+            else:
+                raise ValueError(f"Unknown generator: {generatorName}")
+            self.mazeGenerated = True
+        if validate:
+            maze_validator.raise_if_invalid(wall_bitmap.from_maze_grid(self.MazeGrid), f"{generatorName} maze (seed {self.seed})")
+
+    @classmethod
+    def fromSeed(cls, generatorName: str, cols: int, rows: int, seed: int, cellSize: int = 20, headless: bool = True) -> "MazeMap":
+        """Regenerate a maze exactly from its (generator, size, seed), e.g. the values stored by save2file"""
+        maze = cls(mazeWidth=cols * cellSize, mazeHeight=rows * cellSize, cellSize=cellSize, headless=headless, seed=seed)
+        maze.runToCompletion(generatorName)
+        return maze
+
     def blinkSpecifiedCell(self, screen: pygame.Surface, chosenCell: "Cell", blinkInterval: int = 500, cellColor: tuple=RED) -> None:
         """
         Blink a specified cell in the grid
@@ -410,6 +520,9 @@ class MazeMap:
 
     def removeWalls(self, cell1: "Cell", cell2: "Cell"):
         "Remove walls between adjacent cells for our maze"
+        self.stats.count("wall_removals")
+        if self.wallJournal is not None:
+            self.wallJournal.append((cell1.x, cell1.y, cell2.x, cell2.y))
         # Compare between the difference in indices of the two cells
         dx = cell1.x - cell2.x
         dy = cell1.y - cell2.y
@@ -441,7 +554,7 @@ class MazeMap:
             neighbors.append(self.MazeGrid[cellX][cellY + 1])
         if neighbors:
             if not return_all:
-                return random.choice(neighbors)
+                return self.rng.choice(neighbors)
             else:
                 return neighbors
         return None
@@ -479,6 +592,10 @@ class MazeMap:
             - "kruksal": iterative Kruskal's algorithm
             - "prim": iterative Prim's algorithm
             - "wilson": Wilson's algorithm
+            - "eller": Eller's algorithm (preload only)
+            - "sidewinder", "binary_tree": vectorized Sidewinder and Binary Tree (preload only)
+            - "aldous_broder", "ab_wilson": Aldous-Broder, and its hybrid finishing with Wilson (preload only)
+            - "division": recursive division (preload only)
         Returns
         -------
         None
@@ -505,6 +622,18 @@ class MazeMap:
         elif generatorName == "wilson":
             self.init_Wilson()
             self.Wilson()
+        elif generatorName == "eller":
+            self.Eller()
+        elif generatorName == "sidewinder":
+            self.Sidewinder()
+        elif generatorName == "binary_tree":
+            self.BinaryTree()
+        elif generatorName == "aldous_broder":
+            self.AldousBroder()
+        elif generatorName == "ab_wilson":
+            self.AldousBroder(wilsonAt=bitmap_generators.DEFAULT_WILSON_SWITCH)
+        elif generatorName == "division":
+            self.RecursiveDivision()
 
         running = True
         paused = False
@@ -559,8 +688,8 @@ class MazeMap:
             self.clock.tick(fpsSpeed)
             if log_data:
                 # Logging info stuff- not that it is necessary but is good to know when working with data-intensive applications
-                print("Time passed in pygame's Clock: ",self.clock.get_time())
-                print("Current Frame per Second: ", self.clock.get_fps())
+                logger.debug("Time passed in pygame's Clock: %d ms, current frames per second: %.1f",
+                             self.clock.get_time(), self.clock.get_fps())
         pygame.quit()
 
     def iterative_display(self, fpsSpeed: int= 60, generatorName: str="dfs", log_data:bool = False) -> None:
@@ -646,53 +775,58 @@ class MazeMap:
             self.clock.tick(fpsSpeed)
             if log_data:
                 # Logging info stuff- not that it is necessary but is good to know when working with data-intensive applications
-                print("Time passed in pygame's Clock: ",self.clock.get_time())
-                print("Current Frame per Second: ", self.clock.get_fps())
+                logger.debug("Time passed in pygame's Clock: %d ms, current frames per second: %.1f",
+                             self.clock.get_time(), self.clock.get_fps())
         pygame.quit()
 
     # TODO: 
-    def save2file(self, filename: str) -> None:
+    def snapshot(self) -> dict:
+        """The content of a save file with the walls copied into a wall bitmap: cheap enough to take on the render
+        thread, and unaffected by whatever happens to the grid afterwards"""
+        return {"cols": self.cols, "rows": self.rows, "cellSize": self.cellSize, "generator": self.generatorName,
+                "seed": self.seed, "bitmap": wall_bitmap.from_maze_grid(self.MazeGrid)}
+
+    def save2file(self, filename: str, background: bool = False) -> Optional[Future]:
         """
         Save the maze structure to a file. Example: `maze.save_to_file("saved_maze.json")`
         Args:
             filename (str): The name of the file to save the maze to.
+            background (bool): Only take the snapshot here, serialize and write it on the I/O thread.
+                               Returns the Future of the write
         """
-        maze_data = {
-            "cols": self.cols,
-            "rows": self.rows,
-            "cellSize": self.cellSize,
-            "walls": [
-                [cell.walls for cell in row]
-                for row in self.MazeGrid
-            ],
-        }
-        with open(filename, "w") as file:
-            json.dump(maze_data, file)
-        print(f"Maze saved to {filename}")
-
-    def load_file(self, filename: str) -> None:
+        snapshot = self.snapshot()
+        if background:
+            return _io_executor().submit(write_maze_file, filename, snapshot)
+        write_maze_file(filename, snapshot)
+        return None
+
+    def load_file(self, filename: str, background: bool = False) -> Optional[Future]:
         """
         Load the maze structure from a file. Example: `loaded_maze.load_from_file("saved_maze.json")`
         Args:
-            filename (str): The name of the file to load the maze from.
+            filename (str): The name of the file to load the maze from. .maz and .txt files are read as micromouse mazes.
+            background (bool): Parse the file and build the Cells on the I/O thread and return the Future of the
+                               result, which the caller swaps in with applyLoadedMaze(future.result()) between two
+                               frames. The maze is left untouched until then
         """
+        if background:
+            return _io_executor().submit(read_maze_file, filename, self.cellSize)
         try:
-            with open(filename, "r") as file:
-                maze_data = json.load(file)
-            self.cols = maze_data["cols"]
-            self.rows = maze_data["rows"]
-            self.cellSize = maze_data["cellSize"]
-            # Reconstruct the MazeGrid
-            self.MazeGrid = [
-                [
-                    Cell(x, y, self.cellSize, wallState=maze_data["walls"][x][y] if "walls" in maze_data else None) # handle missing wallState gracefully
-                    for y in range(self.rows)
-                ]
-                for x in range(self.cols)
-            ]
-            print(f"Maze loaded from {filename}")
+            self.applyLoadedMaze(read_maze_file(filename, self.cellSize))
         except FileNotFoundError:
             print("No saved maze found.")
+        return None
+
+    def applyLoadedMaze(self, loaded: dict) -> None:
+        "Swap in a maze parsed by read_maze_file"
+        self.cols = loaded["cols"]
+        self.rows = loaded["rows"]
+        self.cellSize = loaded["cellSize"]
+        # Older files have no seed or generator recorded
+        self.generatorName = loaded["generator"]
+        self.seed = loaded["seed"]
+        self.MazeGrid = loaded["grid"]
+        print(f"Maze loaded from {loaded['filename']}")
 
     # TODO: check this code generated by chatGPT
     def load_file_BETA(self, filename: str) -> None:
@@ -807,7 +941,7 @@ class Cell:
         if self.walls[3]:
             pygame.draw.line(surface=screen, color=GREEN, start_pos=(x, y + self.size), end_pos=(x, y), width=WALL_WIDTH)
         
-    def checkNeighbors(self, grid: List["Cell"], return_all: bool = False, includeVisited: bool = False) -> Union[List["Cell"], "Cell", None]:
+    def checkNeighbors(self, grid: List["Cell"], return_all: bool = False, includeVisited: bool = False, rng: Any = random) -> Union[List["Cell"], "Cell", None]:
         """Find neighboring cells
         Parameters
         ----------
@@ -817,6 +951,8 @@ class Cell:
             Default = False, to return all of the neighbors or not
         includeVisited: bool (default: False__)
             To include visited neighbors as well
+        rng : random.Random (default: the global random module)
+            Source of randomness when picking a single neighbor
         Returns
         -------
         None
@@ -834,7 +970,7 @@ class Cell:
                 neighbors.append(grid[self.x][self.y + 1])
             if neighbors:
                 if not return_all:
-                    return random.choice(neighbors)
+                    return rng.choice(neighbors)
                 else:
                     return neighbors
             return None 
@@ -849,11 +985,72 @@ class Cell:
                 neighbors.append(grid[self.x][self.y + 1])
             if neighbors:
                 if not return_all:
-                    return random.choice(neighbors)
+                    return rng.choice(neighbors)
                 else:
                     return neighbors
             return None 
         
+# ----------------------------------------------------------------------------------
+def remove_remaining_cell(cells: list, index: np.ndarray, x: int, y: int) -> None:
+    "Swap-remove (x, y) from a list of cells, index[x, y] being the position of every cell of the list"
+    position = int(index[x, y])
+    last = cells.pop()
+    if position < len(cells):
+        cells[position] = last
+        index[last] = position
+
+# ----------------------------------------------------------------------------------
+# Save files. Both functions only touch their arguments, so they can run on the I/O thread
+_ioExecutor: Optional[ThreadPoolExecutor] = None
+
+def _io_executor() -> ThreadPoolExecutor:
+    "The background thread of save2file and load_file. A single one, so a load queued after a save reads the saved file"
+    global _ioExecutor
+    if _ioExecutor is None:
+        _ioExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="maze-io")
+    return _ioExecutor
+
+def write_maze_file(filename: str, snapshot: dict) -> None:
+    """Write a MazeMap.snapshot() as JSON (or .maz/.txt by extension, see maze_formats), to a temporary file renamed over filename: an interrupted save never leaves
+    a truncated file behind"""
+    fileFormat = maze_formats.format_of(filename)
+    if fileFormat == "json":
+        maze_data = {key: snapshot[key] for key in ("cols", "rows", "cellSize", "generator", "seed")}
+        maze_data["walls"] = wall_bitmap.to_wall_lists(snapshot["bitmap"])
+        data = json.dumps(maze_data).encode()
+    else:
+        data = maze_formats.encode(snapshot["bitmap"], fileFormat) # no room for the seed in these formats
+    directory = os.path.dirname(os.path.abspath(filename))
+    descriptor, temporaryPath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.chmod(temporaryPath, wall_bitmap.NEW_FILE_MODE)
+        os.replace(temporaryPath, filename)
+    except BaseException:
+        os.unlink(temporaryPath)
+        raise
+    print(f"Maze saved to {filename}")
+
+def read_maze_file(filename: str, cellSize: int = 20) -> dict:
+    """Parse a file written by save2file and build its Cells, see MazeMap.applyLoadedMaze.
+    Micromouse .maz and ASCII .txt files are read with maze_formats, with the given cellSize"""
+    fileFormat = maze_formats.format_of(filename)
+    if fileFormat != "json":
+        bitmap = maze_formats.read_maze(filename)
+        cols, rows = bitmap.shape
+        walls = wall_bitmap.to_wall_lists(bitmap)
+        grid = [[Cell(x, y, cellSize, wallState=walls[x][y]) for y in range(rows)] for x in range(cols)]
+        return {"filename": filename, "cols": cols, "rows": rows, "cellSize": cellSize, "generator": None,
+                "seed": None, "grid": grid}
+    with open(filename, "r") as file:
+        maze_data = json.load(file)
+    cols, rows, cellSize = maze_data["cols"], maze_data["rows"], maze_data["cellSize"]
+    walls = maze_data.get("walls") # handle missing wallState gracefully
+    grid = [[Cell(x, y, cellSize, wallState=walls[x][y] if walls else None) for y in range(rows)] for x in range(cols)]
+    return {"filename": filename, "cols": cols, "rows": rows, "cellSize": cellSize,
+            "generator": maze_data.get("generator"), "seed": maze_data.get("seed"), "grid": grid}
+
 # Boiler plate code to test things
 if __name__ == "__main__":
     test_maze_disjoint_set()
@@ -2,10 +2,14 @@ import pygame, sys
 from settings import *
 import Maze
 import solver
+import logging
+import logger_config
 import threading # using threading to run the tkinter menu and Pygame window display simultaneously
 import tkinter as tk
 from tkinter import ttk
 
+logger = logging.getLogger(__name__)
+
 class MainApp(object):
     """MainApp to store the state machines flow during the main application run
 
@@ -71,6 +75,23 @@ class MainApp(object):
             self.draw()
             pygame.display.update()
 
+def report_io_error(future) -> None:
+    "Done callback of a background save: its errors would otherwise stay in the Future"
+    if future.exception() is not None:
+        logger.error("Saving the maze failed: %s", future.exception())
+
+def apply_loaded_maze(maze: "Maze.MazeMap", future) -> bool:
+    """Swap the result of a background load_file into the maze, return False if the load failed"""
+    try:
+        maze.applyLoadedMaze(future.result())
+    except FileNotFoundError:
+        print("No saved maze found.")
+        return False
+    except Exception:
+        logger.exception("Loading the maze failed")
+        return False
+    return True
+
 def mainMazeProgram(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse", fpsSpeed: int= 60, generatorName: str="dfs", solver: str='dfs', log_data:bool = False) -> None:
     # TODO TODO TODO: add utility functions to initialize algorithms and runnning generator/solver to make
     # the programs more compact
@@ -79,6 +100,10 @@ def mainMazeProgram(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse", fpsSpeed:
     main_screen = pygame.display.set_mode((MAZE_WIDTH, MAZE_HEIGHT))
     mainclock = pygame.time.Clock()
 
+    maze.generatorName = generatorName # recorded with the seed when saving
+    if log_data:
+        # Counters and timers shared by the maze, the mouse and the frame loop, see instrumentation.py
+        mouseSolver.stats = maze.enableStats()
     if generatorName == "kruskal":
         maze.generateListofWalls()
     elif generatorName == "prim":
@@ -99,10 +124,18 @@ def mainMazeProgram(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse", fpsSpeed:
     mazeGenerated = False
     mazeLoaded = False # a flag to signal that maze is already loaded and disable for further loading
     reachedGoal = False
+    pendingLoad = None # Future of a maze being parsed in the background
     while running:
+        # Frame boundary: nothing is drawing or stepping through the grid, so a loaded maze can replace it
+        if pendingLoad is not None and pendingLoad.done():
+            if apply_loaded_maze(maze, pendingLoad):
+                mazeGenerated = True
+            pendingLoad = None
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+                if log_data:
+                    print(maze.stats.summary())
                 pygame.quit()
                 sys.exit()
             # Key-press events
@@ -156,14 +189,23 @@ def mainMazeProgram(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse", fpsSpeed:
                 elif event.key == pygame.K_q:
                     if mazeGenerated:
                         print("Saving...")
-                        maze.save2file(filename="saved_maze_test")
+                        # Only the snapshot is taken here, the frames keep coming while the file is written
+                        maze.save2file(filename="saved_maze_test", background=True).add_done_callback(report_io_error)
                     else:
                         print("Maze Generation not finished yet, please wait until completion then press Q to save maze...")
+                elif event.key == pygame.K_i:
+                    if mazeGenerated:
+                        print("Exporting the maze picture...")
+                        # 1-bit PNG, see maze_image. Written in the background like the saves
+                        maze.save2file(filename="saved_maze_test.png", background=True).add_done_callback(report_io_error)
+                    else:
+                        print("Maze Generation not finished yet, please wait until completion then press I to export the maze picture...")
                 elif event.key == pygame.K_p:
-                    if not mazeLoaded:
+                    if pendingLoad is not None:
+                        print("Still loading the maze, please wait")
+                    elif not mazeLoaded:
                         print("Key P is pressed, loading the maze now...")
-                        maze.load_file('saved_maze_test')
-                        mazeGenerated = True
+                        pendingLoad = maze.load_file('saved_maze_test', background=True) # swapped in at the start of a frame
                     else:
                         print("Maze already loaded, please reset the whole program if you want to reload the maze")
         # -------------------------------------------------------------------------
@@ -224,23 +266,24 @@ def mainMazeProgram(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse", fpsSpeed:
         # Fill the screen with the background color first and foremost
         maze.screen.fill(maze.backgroundColor)
         # Update the maze's grids' Cell objects - 
-        for x in range(maze.cols):
-            for y in range(maze.rows): 
-                maze.MazeGrid[x][y].DrawCell(main_screen)
+        with maze.stats.timer("frame_draw"):
+            for x in range(maze.cols):
+                for y in range(maze.rows): 
+                    maze.MazeGrid[x][y].DrawCell(main_screen)
         # Add a blinking effect to a specific cell (e.g., the starting cell)
         maze.blinkSpecifiedCell(main_screen, maze.MazeGrid[mouseSolver.x][mouseSolver.y])
         # Update for the solver mouse if we are solving
         if current_state == GameState.SOLVING:
         # Get the current position of the maze solver mouse on the map, see where it is at
-            print("Update after running solver: Mouse currently at x = {} | y = {}".format(mouseSolver.x, mouseSolver.y))
+            if __debug__:
+                logger.debug("Update after running solver: Mouse currently at x = %d | y = %d", mouseSolver.x, mouseSolver.y)
         # Update the display
         pygame.display.update()
         # Control the frame rate
         mainclock.tick(fpsSpeed)
-        if log_data:
-            # Logging info stuff- not that it is necessary but is good to know when working with data-intensive applications
-            print("Time passed in pygame's Clock: ",maze.clock.get_time())
-            print("Current Frame per Second: ", maze.clock.get_fps())
+        # Frame timing goes into the stats (a no-op unless log_data), summarized on exit instead of printed every frame
+        maze.stats.sample("frame_time_ms", mainclock.get_time())
+        maze.stats.sample("fps", mainclock.get_fps())
     pygame.quit()
 
 def mainMazeProgram_util(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse",control_vars, fpsSpeed: int= 60, generatorName: str="dfs", solver: str='dfs', log_data:bool = False) -> None:
@@ -251,6 +294,10 @@ def mainMazeProgram_util(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse",contr
     main_screen = pygame.display.set_mode((MAZE_WIDTH, MAZE_HEIGHT))
     mainclock = pygame.time.Clock()
 
+    maze.generatorName = generatorName # recorded with the seed when saving
+    if log_data:
+        # Counters and timers shared by the maze, the mouse and the frame loop, see instrumentation.py
+        mouseSolver.stats = maze.enableStats()
     if generatorName == "kruskal":
         maze.generateListofWalls()
     elif generatorName == "prim":
@@ -271,10 +318,18 @@ def mainMazeProgram_util(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse",contr
     mazeGenerated = False
     mazeLoaded = False # a flag to signal that maze is already loaded and disable for further loading
     reachedGoal = False
+    pendingLoad = None # Future of a maze being parsed in the background
     while running:
+        # Frame boundary: nothing is drawing or stepping through the grid, so a loaded maze can replace it
+        if pendingLoad is not None and pendingLoad.done():
+            if apply_loaded_maze(maze, pendingLoad):
+                mazeGenerated = True
+            pendingLoad = None
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+                if log_data:
+                    print(maze.stats.summary())
                 pygame.quit()
                 sys.exit()
             # Key-press events
@@ -328,14 +383,23 @@ def mainMazeProgram_util(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse",contr
                 elif event.key == pygame.K_q:
                     if mazeGenerated:
                         print("Saving...")
-                        maze.save2file(filename="saved_maze_test")
+                        # Only the snapshot is taken here, the frames keep coming while the file is written
+                        maze.save2file(filename="saved_maze_test", background=True).add_done_callback(report_io_error)
                     else:
                         print("Maze Generation not finished yet, please wait until completion then press Q to save maze...")
+                elif event.key == pygame.K_i:
+                    if mazeGenerated:
+                        print("Exporting the maze picture...")
+                        # 1-bit PNG, see maze_image. Written in the background like the saves
+                        maze.save2file(filename="saved_maze_test.png", background=True).add_done_callback(report_io_error)
+                    else:
+                        print("Maze Generation not finished yet, please wait until completion then press I to export the maze picture...")
                 elif event.key == pygame.K_p:
-                    if not mazeLoaded:
+                    if pendingLoad is not None:
+                        print("Still loading the maze, please wait")
+                    elif not mazeLoaded:
                         print("Key P is pressed, loading the maze now...")
-                        maze.load_file('saved_maze_test')
-                        mazeGenerated = True
+                        pendingLoad = maze.load_file('saved_maze_test', background=True) # swapped in at the start of a frame
                     else:
                         print("Maze already loaded, please reset the whole program if you want to reload the maze")
         # Handle controls from the Tkinter GUI
@@ -370,7 +434,11 @@ def mainMazeProgram_util(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse",contr
                             mazeGenerated = True
                             print("Maze Generation complete!")
                     elif generatorName == "kruskal":
-                        maze.iterativeKruskal()
+                        if maze.walls:
+                            maze.iterativeKruskal()
+                        else:
+                            mazeGenerated = True
+                            print("Maze Generation complete!")
                     elif generatorName == "prim":
                         if maze.walls:
                             maze.iterativePrim()
@@ -408,23 +476,24 @@ def mainMazeProgram_util(maze: "Maze.MazeMap", mouseSolver: "solver.Mouse",contr
         # Fill the screen with the background color first and foremost
         maze.screen.fill(maze.backgroundColor)
         # Update the maze's grids' Cell objects - 
-        for x in range(maze.cols):
-            for y in range(maze.rows): 
-                maze.MazeGrid[x][y].DrawCell(main_screen)
+        with maze.stats.timer("frame_draw"):
+            for x in range(maze.cols):
+                for y in range(maze.rows): 
+                    maze.MazeGrid[x][y].DrawCell(main_screen)
         # Add a blinking effect to a specific cell (e.g., the starting cell)
         maze.blinkSpecifiedCell(main_screen, maze.MazeGrid[mouseSolver.x][mouseSolver.y])
         # Update for the solver mouse if we are solving
         if current_state == GameState.SOLVING:
         # Get the current position of the maze solver mouse on the map, see where it is at
-            print("Update after running solver: Mouse currently at x = {} | y = {}".format(mouseSolver.x, mouseSolver.y))
+            if __debug__:
+                logger.debug("Update after running solver: Mouse currently at x = %d | y = %d", mouseSolver.x, mouseSolver.y)
         # Update the display
         pygame.display.update()
         # Control the frame rate
         mainclock.tick(fpsSpeed)
-        if log_data:
-            # Logging info stuff- not that it is necessary but is good to know when working with data-intensive applications
-            print("Time passed in pygame's Clock: ",maze.clock.get_time())
-            print("Current Frame per Second: ", maze.clock.get_fps())
+        # Frame timing goes into the stats (a no-op unless log_data), summarized on exit instead of printed every frame
+        maze.stats.sample("frame_time_ms", mainclock.get_time())
+        maze.stats.sample("fps", mainclock.get_fps())
     pygame.quit()
 
 # Function to create the Tkinter settings menu
@@ -512,6 +581,7 @@ def create_settings_menu(maze, mouseSolver):
 
 # --- Driver Code ---
 if __name__ == "__main__":
+    logger_config.setup_logging()
     # new maze new mouse who dis
     new_maze = Maze.MazeMap(mazeWidth=800, mazeHeight=800, cellSize=20, startX=0, startY=0)
     new_mouse = solver.Mouse(maze=new_maze)
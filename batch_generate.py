@@ -0,0 +1,96 @@
+# Batch maze generation fanned out over a process pool
+"""Every task is (generator, cols, rows, seed). Each maze is generated headless with its own random.Random(seed),
+so a given task always produces the same walls no matter how many workers run or which worker picks it up.
+Results come back in task order as compact wall bitmaps (see wall_bitmap)
+
+Usage:
+    python batch_generate.py --generator kruskal --cols 16 --rows 16 --count 10000 --seed 0 --out corpus.bin
+The output file is the bitmaps back to back: np.fromfile("corpus.bin", np.uint8).reshape(count, cols, rows)
+With --archive the mazes are appended to a maze archive instead, with their metadata (see maze_archive):
+    python batch_generate.py --generator kruskal --count 100000 --archive corpus.mza
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") # keep the pygame banner out of every worker's output
+import numpy as np
+import Maze
+import wall_bitmap
+import maze_archive
+import maze_validator
+
+GENERATORS = Maze.GENERATORS
+
+def generate_bitmap(generator: str, cols: int, rows: int, seed: int, validate: bool = False) -> np.ndarray:
+    """Generate one maze headless and return its wall bitmap.
+    With validate, raise maze_validator.MazeValidationError if the maze is not perfect"""
+    maze = Maze.MazeMap.fromSeed(generator, cols, rows, seed, cellSize=1)
+    bitmap = wall_bitmap.from_maze_grid(maze.MazeGrid)
+    if validate:
+        maze_validator.raise_if_invalid(bitmap, f"{generator} maze {cols}x{rows} (seed {seed})")
+    return bitmap
+
+def _generate_task(task: Tuple[str, int, int, int], validate: bool = False) -> bytes:
+    "Worker entry point: raw bytes pickle much faster than arrays between processes"
+    return generate_bitmap(*task, validate=validate).tobytes()
+
+def _generate_validated_task(task: Tuple[str, int, int, int]) -> bytes:
+    return _generate_task(task, validate=True)
+
+def generate_batch(tasks: Iterable[Tuple[str, int, int, int]], workers: Optional[int] = None,
+                   chunksize: int = 16, validate: bool = False) -> Iterator[Tuple[Tuple[str, int, int, int], np.ndarray]]:
+    """
+    Generate many mazes in parallel
+
+    Parameters
+    ----------
+    tasks : iterable of (generator, cols, rows, seed)
+    workers : int or None
+        Number of worker processes, defaults to the number of CPUs
+    chunksize : int
+        Tasks sent to a worker at a time, larger chunks amortize the inter-process overhead of small mazes
+    validate : bool
+        Check every maze in its worker (see maze_validator), the first imperfect maze raises MazeValidationError
+    Returns
+    -------
+    Iterator of (task, bitmap) in the same order as the tasks
+    """
+    tasks = list(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for task, data in zip(tasks, pool.map(_generate_validated_task if validate else _generate_task, tasks, chunksize=chunksize)):
+            _, cols, rows, _ = task
+            yield task, np.frombuffer(data, dtype=np.uint8).reshape(cols, rows)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a corpus of mazes in parallel")
+    parser.add_argument("--generator", choices=GENERATORS, default="dfs")
+    parser.add_argument("--cols", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=16)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first maze, maze i uses seed + i")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--out", default="corpus.bin")
+    parser.add_argument("--archive", default=None, help="append to this maze archive instead of writing --out")
+    parser.add_argument("--validate", action="store_true", help="check that every maze is perfect")
+    args = parser.parse_args()
+
+    tasks = [(args.generator, args.cols, args.rows, args.seed + i) for i in range(args.count)]
+    start_time = time.perf_counter()
+    if args.archive:
+        total = maze_archive.write_corpus(args.archive, tasks, workers=args.workers, chunksize=args.chunksize,
+                                          validate=args.validate)
+        runtime = time.perf_counter() - start_time
+        print(f"Archived {args.count} {args.cols}x{args.rows} mazes with {args.generator} in {runtime:.2f} seconds "
+              f"-> {args.archive} ({total} mazes)")
+        return
+    with open(args.out, "wb") as file:
+        for _, bitmap in generate_batch(tasks, workers=args.workers, chunksize=args.chunksize, validate=args.validate):
+            file.write(bitmap.tobytes())
+    runtime = time.perf_counter() - start_time
+    print(f"Generated {args.count} {args.cols}x{args.rows} mazes with {args.generator} in {runtime:.2f} seconds -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# Benchmark harness: generators x solvers x grid sizes, with JSON results and a regression check between two runs
+"""Method
+- Every maze comes from a fixed seed, so two runs measure exactly the same workloads
+- Each measurement does `warmup` untimed runs, then `trials` timed runs; the median is the reported time
+- Peak memory comes from one extra run under tracemalloc (tracing slows Python down a lot, so it is never timed)
+- Solvers are timed on a fresh MazeMap built from the generated bitmap for every run, as A* keeps state in the Cells
+- The solvers and generators print their progress, all of it goes to os.devnull while measuring
+- a_star_alt is timed with its landmark table already built; the build is a separate "prepare" record
+- The random mouse (WALKERS) finds no path, it is timed over at most WALK_STEPS moves and reports how many it took.
+  Not benchmarked: rightHand (FIXME in solver.py, it never reports the goal and can go round forever), Tremaux and
+  Pledge (empty), and the drawing versions depthFirstSearch, breadthFirstSearch, Dijsktra and Astar_search, which run
+  the same searches as the step functions behind solver.SOLVERS
+- Generators listed in MAX_SIZES are skipped above their cap: prim keeps its frontier in a list it scans, so its time
+  grows with the square of the cell count (1.2 s at 100x100, 8.8 s at 200x200, 74 s at 400x400, about 45 min a run at
+  1000x1000). The others grow linearly: at 1000x1000 kruskal takes 27 s, wilson 47 s and aldous_broder 71 s, and
+  building the MazeMap for a solver takes 6 s plus 4-5 s for bfs or a_star. With the default 5 trials and 1 warm-up,
+  --full spends about 2 hours at 1000x1000 and 8-10 hours at 2000x2000
+
+Usage:
+    python benchmark.py run --sizes 16 64 256 --trials 5 --out before.json
+    python benchmark.py run --full --braid 0.5 --out braided.json
+    python benchmark.py compare before.json after.json --threshold 0.1
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import numpy as np
+import Maze
+import solver
+import wall_bitmap
+import bitmap_generators
+
+QUICK_SIZES = (16, 64, 256)
+FULL_SIZES = (16, 64, 256, 1000, 2000)
+WALKERS = ("random_mouse",) # solvers without a path, stopped after WALK_STEPS moves
+WALK_STEPS = 100_000
+MAX_SIZES = {"prim": 400} # largest side benchmarked for generators that are known to be quadratic
+
+@contextlib.contextmanager
+def _silenced():
+    "Send everything printed to os.devnull"
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def measure(setup: Callable[[], object], run: Callable[[object], object], trials: int, warmup: int) -> Dict[str, object]:
+    """Time run(setup()) over repeated trials after warm-up runs, then measure its peak memory in one traced run.
+    Only run() is timed, setup() builds the fresh state (e.g. a grid of Cells) it needs every time"""
+    times = []
+    with _silenced():
+        for _ in range(warmup):
+            run(setup())
+        for _ in range(trials):
+            state = setup()
+            start_time = time.perf_counter()
+            result = run(state)
+            times.append(time.perf_counter() - start_time)
+        state = setup()
+        tracemalloc.start()
+        try:
+            run(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"times": times, "median": statistics.median(times), "min": min(times), "peak_bytes": peak, "result": result}
+
+def bench_generator(generator: str, size: int, seed: int, trials: int, warmup: int) -> Tuple[Dict[str, object], np.ndarray]:
+    "Time one generator on a size x size grid. Return the record and the bitmap of the generated maze"
+    def setup():
+        return Maze.MazeMap(mazeWidth=size, mazeHeight=size, cellSize=1, headless=True, seed=seed)
+    def run(maze):
+        maze.runToCompletion(generator)
+        return maze
+    stats = measure(setup, run, trials, warmup)
+    bitmap = wall_bitmap.from_maze_grid(stats.pop("result").MazeGrid)
+    stats["per_cell_us"] = stats["median"] / (size * size) * 1e6
+    return {"kind": "generate", "generator": generator, "size": size, "seed": seed, **stats}, bitmap
+
+def bench_landmarks(bitmap: np.ndarray, seed: int, trials: int, warmup: int) -> Dict[str, object]:
+    "Time the landmark table build of a_star_alt on its own"
+    def setup():
+        return solver.Mouse(Maze.MazeMap.fromBitmap(bitmap, cellSize=1), rng=random.Random(seed))
+    def run(mouse):
+        mouse.useLandmarks()
+        return mouse
+    stats = measure(setup, run, trials, warmup)
+    stats.pop("result")
+    return {"kind": "prepare", "solver": "a_star_alt", "size": bitmap.shape[0], "seed": seed, **stats}
+
+def bench_solver(solverName: str, bitmap: np.ndarray, seed: int, trials: int, warmup: int) -> Dict[str, object]:
+    "Time one solver from the top-left to the bottom-right corner of a maze given as a bitmap"
+    def setup():
+        mouse = solver.Mouse(Maze.MazeMap.fromBitmap(bitmap, cellSize=1), rng=random.Random(seed))
+        if solverName == "a_star_alt":
+            mouse.useLandmarks() # timed by bench_landmarks, runToCompletion reuses the table
+        return mouse
+    def run(mouse):
+        mouse.runToCompletion(solverName)
+        return mouse
+    stats = measure(setup, run, trials, warmup)
+    mouse = stats.pop("result")
+    return {"kind": "solve", "solver": solverName, "size": bitmap.shape[0], "seed": seed, **stats,
+            "solved": mouse.MazeSolved, "path_length": len(mouse.finalPath), "expanded": mouse.nodesExpanded(solverName)}
+
+def bench_walker(solverName: str, bitmap: np.ndarray, seed: int, trials: int, warmup: int) -> Dict[str, object]:
+    "Time a random mouse walk until the goal or WALK_STEPS moves"
+    def setup():
+        return solver.Mouse(Maze.MazeMap.fromBitmap(bitmap, cellSize=1), rng=random.Random(seed))
+    def run(mouse):
+        steps = 0
+        while not mouse.MazeSolved and steps < WALK_STEPS:
+            mouse.RandomMouse()
+            steps += 1
+        return mouse, steps
+    stats = measure(setup, run, trials, warmup)
+    mouse, steps = stats.pop("result")
+    return {"kind": "solve", "solver": solverName, "size": bitmap.shape[0], "seed": seed, **stats,
+            "solved": mouse.MazeSolved, "path_length": 0, "expanded": steps}
+
+def run_suite(generators: List[str], solvers: List[str], sizes: List[int], seed: int = 0, trials: int = 5,
+              warmup: int = 1, braid: float = 0.0) -> Dict[str, object]:
+    """Benchmark every generator at every size, then every solver on every generated maze (braided first if
+    braid > 0, which gives the solvers loops to choose between)"""
+    results = []
+    for size in sizes:
+        for generator in generators:
+            if size > MAX_SIZES.get(generator, size):
+                print(f"{generator:>14} {size:>5}x{size:<5} skipped, quadratic above {MAX_SIZES[generator]}")
+                continue
+            record, bitmap = bench_generator(generator, size, seed, trials, warmup)
+            print(f"{generator:>14} {size:>5}x{size:<5} generate {record['median'] * 1e3:10.2f} ms "
+                  f"({record['per_cell_us']:.2f} us/cell)")
+            results.append(record)
+            if braid > 0:
+                bitmap = bitmap_generators.braid_bitmap(bitmap, braid, np.random.default_rng(seed))
+            if "a_star_alt" in solvers:
+                record = bench_landmarks(bitmap, seed, trials, warmup)
+                record.update(generator=generator, braid=braid)
+                print(f"{generator:>14} {size:>5}x{size:<5} {'landmarks':>10} {record['median'] * 1e3:10.2f} ms")
+                results.append(record)
+            for solverName in solvers:
+                bench = bench_walker if solverName in WALKERS else bench_solver
+                record = bench(solverName, bitmap, seed, trials, warmup)
+                record.update(generator=generator, braid=braid)
+                print(f"{generator:>14} {size:>5}x{size:<5} {solverName:>10} {record['median'] * 1e3:10.2f} ms "
+                      f"expanded={record['expanded']} path={record['path_length']}")
+                results.append(record)
+    meta = {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"), "seed": seed, "trials": trials, "warmup": warmup, "braid": braid}
+    return {"meta": meta, "results": results}
+
+# ----------------------------------------------------------------------------------
+# Comparing two runs
+def _key(record: Dict[str, object]) -> tuple:
+    return (record["kind"], record.get("generator"), record.get("solver"), record["size"], record.get("braid", 0.0))
+
+def compare(before: Dict[str, object], after: Dict[str, object], threshold: float = 0.1) -> List[str]:
+    """Return a line for every measurement that got slower by more than `threshold` (0.1 = 10%), used more memory by
+    more than `threshold`, or changed its result (path length, nodes expanded)"""
+    previous = {_key(record): record for record in before["results"]}
+    problems = []
+    for record in after["results"]:
+        old = previous.get(_key(record))
+        if old is None:
+            continue
+        name = " ".join(str(part) for part in _key(record) if part is not None)
+        if record["median"] > old["median"] * (1 + threshold):
+            problems.append(f"SLOWER  {name}: {old['median'] * 1e3:.2f} ms -> {record['median'] * 1e3:.2f} ms")
+        if record["peak_bytes"] > old["peak_bytes"] * (1 + threshold):
+            problems.append(f"MEMORY  {name}: {old['peak_bytes']} -> {record['peak_bytes']} bytes")
+        for field in ("path_length", "expanded", "solved"):
+            if field in record and record[field] != old.get(field):
+                problems.append(f"CHANGED {name}: {field} {old.get(field)} -> {record[field]}")
+    return problems
+
+def _positive_int(text: str) -> int:
+    "argparse type for counts that must be at least 1"
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def _non_negative_int(text: str) -> int:
+    "argparse type for counts that may be 0"
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be at least 0, got {value}")
+    return value
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark maze generators and solvers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    runParser = commands.add_parser("run", help="run the benchmarks and write the results as JSON")
+    runParser.add_argument("--generators", nargs="+", choices=Maze.GENERATORS, default=list(Maze.GENERATORS))
+    runParser.add_argument("--solvers", nargs="+", choices=solver.SOLVERS + WALKERS,
+                           default=list(solver.SOLVERS + WALKERS))
+    runParser.add_argument("--sizes", nargs="+", type=_positive_int, default=list(QUICK_SIZES))
+    runParser.add_argument("--full", action="store_true", help=f"use the sizes {FULL_SIZES}, this takes about half a day (prim stops at {MAX_SIZES['prim']})")
+    runParser.add_argument("--seed", type=int, default=0)
+    runParser.add_argument("--trials", type=_positive_int, default=5)
+    runParser.add_argument("--warmup", type=_non_negative_int, default=1)
+    runParser.add_argument("--braid", type=float, default=0.0, help="fraction of dead ends removed before solving")
+    runParser.add_argument("--out", default="benchmark_results.json")
+    compareParser = commands.add_parser("compare", help="flag regressions between two result files")
+    compareParser.add_argument("before")
+    compareParser.add_argument("after")
+    compareParser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sizes = list(FULL_SIZES) if args.full else args.sizes
+        report = run_suite(args.generators, args.solvers, sizes, args.seed, args.trials, args.warmup, args.braid)
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.out}")
+        return 0
+
+    with open(args.before) as file:
+        before = json.load(file)
+    with open(args.after) as file:
+        after = json.load(file)
+    problems = compare(before, after, args.threshold)
+    for line in problems:
+        print(line)
+    print(f"{len(problems)} regression(s) over a {args.threshold:.0%} threshold")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+# Maze generators that work directly on wall bitmaps (see wall_bitmap) instead of a grid of Cell objects
+"""Row streams
+A row is the walls of one horizontal line of cells, bitmap[:, y], as a uint8 array of length cols.
+Streamed rows are written one after the other (row-major), so a stream of `rows` rows of `cols` cells reads back with
+np.fromfile(file, np.uint8).reshape(rows, cols).T, which is the usual (cols, rows) bitmap
+"""
+import random
+from typing import BinaryIO, Iterable, Iterator, List
+import numpy as np
+import wall_bitmap
+from wall_bitmap import TOP, RIGHT, BOTTOM, LEFT, ALL_WALLS
+
+# -----------------------------------------------------------------------------
+# Eller's algorithm
+def eller_rows(cols: int, rows: int, rng: random.Random, horizontalBias: float = 0.5,
+               verticalBias: float = 0.5) -> Iterator[np.ndarray]:
+    """
+    Eller's algorithm as a stream of rows, top to bottom. Only the set labels of the current row are kept,
+    so memory is O(cols) no matter how many rows are generated
+
+    Parameters
+    ----------
+    rng : random.Random
+        Source of every random decision, a seeded instance gives a reproducible maze
+    horizontalBias : float
+        Chance of joining two neighboring cells of different sets within a row (more = longer horizontal corridors)
+    verticalBias : float
+        Chance of every cell opening downwards, on top of the one opening each set always gets
+    Returns
+    -------
+    Iterator of uint8 arrays of length cols, the walls of row 0, 1, ..., rows - 1
+    """
+    labels = list(range(cols)) # set label of every cell of the current row
+    nextLabel = cols
+    openAbove = [False] * cols # cells whose top wall was removed by the row above
+    for y in range(rows):
+        lastRow = y == rows - 1
+        walls = [ALL_WALLS & ~TOP if opened else ALL_WALLS for opened in openAbove]
+
+        # 1. Randomly join neighboring cells of different sets. The labels of a row are merged with a small union-find
+        parent = {}
+        def find(label):
+            while parent.get(label, label) != label:
+                parent[label] = parent.get(parent[label], parent[label]) # path halving
+                label = parent[label]
+            return label
+        for x in range(cols - 1):
+            left, right = find(labels[x]), find(labels[x + 1])
+            if left != right and (lastRow or rng.random() < horizontalBias):
+                parent[right] = left
+                walls[x] &= ~RIGHT
+                walls[x + 1] &= ~LEFT
+        labels = [find(label) for label in labels]
+
+        # 2. Every set opens downwards at least once, so no set is cut off from the rows below
+        if not lastRow:
+            members = {}
+            for x, label in enumerate(labels):
+                members.setdefault(label, []).append(x)
+            openAbove = [False] * cols
+            for cells in members.values():
+                down = [x for x in cells if rng.random() < verticalBias]
+                if not down:
+                    down = [rng.choice(cells)]
+                for x in down:
+                    openAbove[x] = True
+                    walls[x] &= ~BOTTOM
+            # 3. Cells not connected from above start a new set in the next row
+            for x in range(cols):
+                if not openAbove[x]:
+                    labels[x] = nextLabel
+                    nextLabel += 1
+        yield np.array(walls, dtype=np.uint8)
+
+def eller_bitmap(cols: int, rows: int, rng: random.Random, horizontalBias: float = 0.5, verticalBias: float = 0.5) -> np.ndarray:
+    """Whole (cols, rows) bitmap generated with Eller's algorithm"""
+    return rows_to_bitmap(eller_rows(cols, rows, rng, horizontalBias, verticalBias), cols, rows)
+
+# -----------------------------------------------------------------------------
+# Binary Tree and Sidewinder: every decision is independent, so the whole grid is decided at once with random arrays
+def carve_north_east(north: np.ndarray, east: np.ndarray) -> np.ndarray:
+    """Bitmap of a full grid where every cell flagged in `north` opens towards y - 1 and every cell flagged in `east`
+    opens towards x + 1 (both boolean arrays of shape (cols, rows), flags pointing out of the grid must be False)"""
+    north = north.astype(np.uint8)
+    east = east.astype(np.uint8)
+    bitmap = np.full(north.shape, ALL_WALLS, dtype=np.uint8)
+    # Both walls are set in a full grid, so clearing a bit is a subtraction
+    bitmap -= TOP * north + RIGHT * east
+    bitmap[:, :-1] -= BOTTOM * north[:, 1:] # the cell above the opening loses its bottom wall
+    bitmap[1:, :] -= LEFT * east[:-1, :] # the cell right of the opening loses its left wall
+    return bitmap
+
+def binary_tree_bitmap(cols: int, rows: int, rng: np.random.Generator, northBias: float = 0.5) -> np.ndarray:
+    """Binary Tree: every cell opens either north or east. The top row can only go east and the last column only
+    north, which leaves a corridor along both edges"""
+    north = rng.random((cols, rows)) < northBias
+    north[:, 0] = False
+    north[-1, :] = True
+    north[-1, 0] = False # the top-right corner is the root of the tree
+    east = ~north
+    east[-1, :] = False
+    return carve_north_east(north, east)
+
+def sidewinder_bitmap(cols: int, rows: int, rng: np.random.Generator, eastBias: float = 0.5) -> np.ndarray:
+    """
+    Sidewinder: each row is cut into runs of cells joined eastwards, then every run opens north from one random cell.
+    The top row is a single corridor
+
+    The rows are handled together: the run starts are found in the flattened row-major grid (a run never crosses a
+    row since the last column never joins east), and the north opening of each run is its start plus a random offset
+    below its length
+    """
+    # Row-major (rows, cols) layout so that the runs of a row are contiguous once flattened
+    east = rng.random((rows, cols)) < eastBias
+    east[0, :] = True
+    east[:, -1] = False
+    north = np.zeros((rows, cols), dtype=bool)
+    if rows > 1:
+        body = east[1:]
+        runStart = np.ones_like(body)
+        runStart[:, 1:] = ~body[:, :-1]
+        starts = np.flatnonzero(runStart)
+        lengths = np.diff(np.append(starts, body.size))
+        openings = starts + (rng.random(len(starts)) * lengths).astype(np.int64)
+        north[1:].ravel()[openings] = True
+    return carve_north_east(north.T, east.T)
+
+# -----------------------------------------------------------------------------
+# Aldous-Broder, and the Aldous-Broder -> Wilson hybrid (uniform spanning trees)
+DEFAULT_WILSON_SWITCH = 0.3 # coverage at which the hybrid stops Aldous-Broder and finishes with Wilson's walks
+
+def grid_neighbors(cols: int, rows: int) -> List[List[int]]:
+    """Flat indices (x * rows + y, like bitmap.ravel()) of the up/right/down/left neighbors of every cell"""
+    neighbors = []
+    for x in range(cols):
+        for y in range(rows):
+            index = x * rows + y
+            cellNeighbors = []
+            if y > 0:
+                cellNeighbors.append(index - 1)
+            if x < cols - 1:
+                cellNeighbors.append(index + rows)
+            if y < rows - 1:
+                cellNeighbors.append(index + 1)
+            if x > 0:
+                cellNeighbors.append(index - rows)
+            neighbors.append(cellNeighbors)
+    return neighbors
+
+def _open_passage(walls: List[int], rows: int, a: int, b: int) -> None:
+    "Remove the wall between two neighboring flat indices of a flat wall list"
+    # Horizontal offsets are checked first: with a single row, +-1 is also a horizontal move
+    if b - a == rows:
+        walls[a] &= ~RIGHT; walls[b] &= ~LEFT
+    elif a - b == rows:
+        walls[a] &= ~LEFT; walls[b] &= ~RIGHT
+    elif b - a == 1:
+        walls[a] &= ~BOTTOM; walls[b] &= ~TOP
+    else:
+        walls[a] &= ~TOP; walls[b] &= ~BOTTOM
+
+def aldous_broder_bitmap(cols: int, rows: int, rng: random.Random, wilsonAt: float = 1.0) -> np.ndarray:
+    """
+    Uniform spanning tree maze with Aldous-Broder, optionally finished with Wilson's algorithm
+
+    Aldous-Broder is a plain random walk that carves into every cell the first time it is entered: quick while most
+    cells are new, very slow to find the last few. Wilson's loop-erased walks are the opposite: slow while the tree
+    is tiny, quick once it is large. Running the first until a fraction of the cells is covered and the second from
+    there avoids both slow phases
+
+    Pure Aldous-Broder (wilsonAt=1) and pure Wilson (wilsonAt=0) give exactly uniform spanning trees. The hybrid in
+    between does not: Wilson completes the partial tree uniformly, but the partial tree left by a stopped walk is not
+    distributed like the matching part of a uniform tree. On a 3x2 grid (15 trees, 150k samples) the switch at 50%
+    gives a chi-square of ~500 against ~13 for either pure algorithm, so use the hybrid for speed, not for statistics
+
+    Parameters
+    ----------
+    rng : random.Random
+    wilsonAt : float
+        Fraction of covered cells at which to switch to Wilson's algorithm, 1.0 = pure Aldous-Broder
+    Returns
+    -------
+    Wall bitmap of shape (cols, rows)
+    """
+    size = cols * rows
+    neighbors = grid_neighbors(cols, rows)
+    walls = [ALL_WALLS] * size
+    inTree = [False] * size
+    current = rng.randrange(size)
+    inTree[current] = True
+    covered = 1
+    target = min(size, max(1, int(wilsonAt * size)))
+
+    # Aldous-Broder phase
+    while covered < target:
+        following = rng.choice(neighbors[current])
+        if not inTree[following]:
+            _open_passage(walls, rows, current, following)
+            inTree[following] = True
+            covered += 1
+        current = following
+
+    # Wilson phase: walk from every cell outside the tree until the tree is hit, remembering only the last exit taken
+    # from each cell (which erases the loops implicitly), then carve the remembered path
+    if covered < size:
+        exits = [0] * size
+        for start in range(size):
+            if inTree[start]:
+                continue
+            cell = start
+            while not inTree[cell]:
+                exits[cell] = rng.choice(neighbors[cell])
+                cell = exits[cell]
+            cell = start
+            while not inTree[cell]:
+                inTree[cell] = True
+                _open_passage(walls, rows, cell, exits[cell])
+                cell = exits[cell]
+    return np.array(walls, dtype=np.uint8).reshape(cols, rows)
+
+# -----------------------------------------------------------------------------
+# Recursive division: the only wall-adding generator, it starts from an empty grid and builds walls
+def _segment_cells(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    "Concatenation of range(start, start + length) for every segment, without a Python loop"
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+def recursive_division_bitmap(cols: int, rows: int, rng: np.random.Generator, roomSize: int = 1) -> np.ndarray:
+    """
+    Recursive division without recursion: the regions waiting to be split are kept as arrays and every level of
+    the division is done at once. Each split adds a whole wall segment with a single door in it; all the segments
+    of a level are written with a few fancy-indexed assignments (the regions of a level never overlap)
+
+    Parameters
+    ----------
+    rng : np.random.Generator
+    roomSize : int
+        Regions no larger than roomSize x roomSize are not split any further and stay open rooms.
+        1 gives a perfect maze, larger values give open rooms (and loops inside them)
+    Returns
+    -------
+    Wall bitmap of shape (cols, rows)
+    """
+    bitmap = np.zeros((cols, rows), dtype=np.uint8)
+    # Only the outer border starts with walls
+    bitmap[:, 0] |= TOP
+    bitmap[:, -1] |= BOTTOM
+    bitmap[0, :] |= LEFT
+    bitmap[-1, :] |= RIGHT
+    regions = np.array([[0, 0, cols, rows]], dtype=np.int64) # x, y, width, height
+    while len(regions):
+        width, height = regions[:, 2], regions[:, 3]
+        regions = regions[~((width <= roomSize) & (height <= roomSize)) & ((width >= 2) | (height >= 2))]
+        if not len(regions):
+            break
+        x, y, width, height = regions.T
+        # Cut across the longer side so the regions stay roughly square, flip a coin for squares
+        coin = rng.random(len(regions)) < 0.5
+        horizontal = np.where(width < 2, True, np.where(height < 2, False, np.where(width != height, height > width, coin)))
+        children = []
+
+        # Horizontal walls below row wallY, with a door at column doorX
+        hx, hy, hw, hh = x[horizontal], y[horizontal], width[horizontal], height[horizontal]
+        wallY = hy + (rng.random(len(hy)) * (hh - 1)).astype(np.int64)
+        doorX = hx + (rng.random(len(hx)) * hw).astype(np.int64)
+        cellsX, cellsY = _segment_cells(hx, hw), np.repeat(wallY, hw)
+        bitmap[cellsX, cellsY] |= BOTTOM
+        bitmap[cellsX, cellsY + 1] |= TOP
+        bitmap[doorX, wallY] &= ALL_WALLS & ~BOTTOM
+        bitmap[doorX, wallY + 1] &= ALL_WALLS & ~TOP
+        children.append(np.stack([hx, hy, hw, wallY - hy + 1], axis=1))
+        children.append(np.stack([hx, wallY + 1, hw, hy + hh - wallY - 1], axis=1))
+
+        # Vertical walls right of column wallX, with a door at row doorY
+        vx, vy, vw, vh = x[~horizontal], y[~horizontal], width[~horizontal], height[~horizontal]
+        wallX = vx + (rng.random(len(vx)) * (vw - 1)).astype(np.int64)
+        doorY = vy + (rng.random(len(vy)) * vh).astype(np.int64)
+        cellsX, cellsY = np.repeat(wallX, vh), _segment_cells(vy, vh)
+        bitmap[cellsX, cellsY] |= RIGHT
+        bitmap[cellsX + 1, cellsY] |= LEFT
+        bitmap[wallX, doorY] &= ALL_WALLS & ~RIGHT
+        bitmap[wallX + 1, doorY] &= ALL_WALLS & ~LEFT
+        children.append(np.stack([vx, vy, wallX - vx + 1, vh], axis=1))
+        children.append(np.stack([wallX + 1, vy, vx + vw - wallX - 1, vh], axis=1))
+        regions = np.concatenate(children)
+    return bitmap
+
+# -----------------------------------------------------------------------------
+# Braiding: post-processing that turns a perfect maze into one with loops
+def braid_bitmap(bitmap: np.ndarray, fraction: float, rng: np.random.Generator) -> np.ndarray:
+    """
+    Remove one wall from a random fraction of the dead ends, which adds loops (a braid maze). Every picked dead end
+    prefers to open into a neighboring dead end, which removes two dead ends with one wall. All dead ends are found
+    and opened at once, so two picked neighbors may open the same wall: the loops added can be slightly fewer than
+    the dead ends picked
+
+    Parameters
+    ----------
+    bitmap : np.ndarray
+        Wall bitmap of shape (cols, rows), not modified
+    fraction : float
+        Fraction of the dead ends to remove, 0 keeps the maze as is and 1 removes them all
+    Returns
+    -------
+    New wall bitmap
+    """
+    braided = bitmap.copy()
+    cols, rows = bitmap.shape
+    deadEnds = wall_bitmap.degrees(bitmap) == 1
+    picked = deadEnds & (rng.random(bitmap.shape) < fraction)
+    # Score every closed wall of a picked cell: random in [0, 1), +1 if it leads into another dead end.
+    # Padding with a False border makes the shifted views of the neighbors stop at the edge of the grid
+    paddedInside = np.pad(np.ones(bitmap.shape, dtype=bool), 1)
+    paddedDeadEnds = np.pad(deadEnds, 1)
+    scores = np.full((4,) + bitmap.shape, -1.0)
+    for side, (bit, (dx, dy)) in enumerate(zip(wall_bitmap.WALL_BITS, wall_bitmap.WALL_OFFSETS)):
+        neighbor = (slice(1 + dx, 1 + dx + cols), slice(1 + dy, 1 + dy + rows))
+        closed = paddedInside[neighbor] & ((bitmap & bit) != 0)
+        scores[side] = np.where(closed, rng.random(bitmap.shape) + paddedDeadEnds[neighbor], -1.0)
+    choice = np.argmax(scores, axis=0)
+    picked &= np.max(scores, axis=0) >= 0 # a 1x1 maze has nothing to open
+    for side, (bit, (dx, dy)) in enumerate(zip(wall_bitmap.WALL_BITS, wall_bitmap.WALL_OFFSETS)):
+        opening = picked & (choice == side)
+        braided[opening] &= ALL_WALLS & ~bit
+        x, y = np.nonzero(opening)
+        braided[x + dx, y + dy] &= ALL_WALLS & ~wall_bitmap.OPPOSITE_BIT[bit]
+    return braided
+
+# -----------------------------------------------------------------------------
+# Row stream utilities
+def write_rows(rowStream: Iterable[np.ndarray], stream: BinaryIO) -> int:
+    """Write rows to a binary stream (an open file, socket.makefile("wb"), ...) as they are produced.
+    Return the number of rows written"""
+    count = 0
+    for row in rowStream:
+        stream.write(np.ascontiguousarray(row, dtype=np.uint8).tobytes())
+        count += 1
+    return count
+
+def read_rows(stream: BinaryIO, cols: int) -> Iterator[np.ndarray]:
+    """Read rows of `cols` cells back from a binary stream until it ends"""
+    while True:
+        data = stream.read(cols)
+        if len(data) < cols:
+            if data:
+                raise ValueError(f"Truncated row: expected {cols} bytes, got {len(data)}")
+            return
+        yield np.frombuffer(data, dtype=np.uint8)
+
+def rows_to_bitmap(rowStream: Iterable[np.ndarray], cols: int, rows: int) -> np.ndarray:
+    """Collect a row stream into the usual (cols, rows) bitmap"""
+    bitmap = np.empty((cols, rows), dtype=np.uint8)
+    for y, row in enumerate(rowStream):
+        bitmap[:, y] = row
+    return bitmap
+
+# Driver code: stream a tall maze to a file without ever holding it in memory
+if __name__ == "__main__":
+    import time
+    cols, rows = 64, 100_000
+    start_time = time.perf_counter()
+    with open("eller_stream.bin", "wb") as file:
+        written = write_rows(eller_rows(cols, rows, random.Random(0)), file)
+    print(f"Streamed {written} rows of {cols} cells in {time.perf_counter() - start_time:.2f} seconds -> eller_stream.bin")
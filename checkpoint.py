@@ -0,0 +1,400 @@
+# Checkpoint and resume of step-by-step maze generation and solving
+"""A checkpoint is a compressed .npz holding the full state of a MazeMap (and optionally of the Mouse solving it):
+- the wall bitmap (see wall_bitmap)
+- the generator frontier: DFS stack, Kruskal/Prim wall list, Wilson remaining cells and current random walk
+- the solver frontier: DFS stack, BFS queue, visited set, parent links, Dijkstra heap and distances, A* open list
+  and the A* scores kept in the Cells
+- the state of both random.Random generators, so a resumed run draws exactly the same numbers
+- a JSON blob of the scalar fields, and CHECKPOINT_VERSION
+
+Visited flags of the generator cells are not stored, they follow from the rest: a cell is in the maze when it has an
+opening, or is the start/current cell (DFS, Prim), or is no longer in the remaining cells (Wilson). The Kruskal
+disjoint set is rebuilt from the carved passages, only the equality of the roots matters.
+
+Writing never stalls the step loop: the Checkpointer keeps its own copy of the wall bitmap, updated from the
+journal of removed walls (MazeMap.wallJournal) instead of rescanning the grid, its copy of the Wilson remaining cells
+follows MazeMap.remainingJournal the same way, and capturing a checkpoint only takes
+shallow copies of the frontier containers (list.copy, set.copy: pointer copies, no Python loop). Converting them,
+building the arrays, compressing and writing happen on a background thread, to a
+temporary file renamed over the previous checkpoint (a crash mid-write leaves the previous one intact).
+The cell colors (walk in gray, solver trail) are display only and are not restored.
+
+Usage:
+    checkpointer = Checkpointer("run.ckpt.npz", maze, mouse, interval=30.0)
+    while ...:
+        maze.iterativeWilson()
+        checkpointer.maybeCheckpoint()      # captures at most every `interval` seconds
+    checkpointer.stop()
+
+    maze, mouse = restore("run.ckpt.npz")   # then keep calling the same step function
+"""
+import json
+import logging
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import numpy as np
+import wall_bitmap
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import Maze
+import solver
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+# ----------------------------------------------------------------------------------
+# Capture: runs on the step thread. Only shallow copies of the containers: their items are tuples, or Cells whose
+# coordinates never change, so the writer thread converts them while the steps go on
+def capture_maze_state(maze: "Maze.MazeMap", copyWalls: bool = True, copyRemaining: bool = True) -> dict:
+    """Without copyWalls or copyRemaining only the length of that list is kept, the Checkpointer rebuilds it"""
+    return {"generatorName": maze.generatorName, "seed": maze.seed, "cols": maze.cols, "rows": maze.rows,
+            "cellSize": maze.cellSize, "start": (maze.startingX, maze.startingY), "mazeGenerated": maze.mazeGenerated,
+            "current": (maze.current.x, maze.current.y), "currentlyRandomWalking": maze.currentlyRandomWalking,
+            "stack": maze.stack.copy(), "walls": maze.walls.copy() if copyWalls else None, "wallCount": len(maze.walls),
+            "remainingCells": maze.remainingCells.copy() if copyRemaining else None,
+            "remainingCount": len(maze.remainingCells), "randomWalk": maze.randomWalk.copy(), "rng": maze.rng.getstate()}
+
+def capture_mouse_state(mouse: "solver.Mouse") -> dict:
+    state = {"position": (mouse.x, mouse.y), "start": (mouse.startX, mouse.startY), "end": (mouse.endX, mouse.endY),
+             "MazeSolved": mouse.MazeSolved, "finalPath": mouse.finalPath.copy(), "stack": mouse.stack.copy(),
+             "queue": mouse.queue.copy(), "visited": mouse.visited.copy(), "parent": mouse.parent.copy(),
+             "pq": mouse.pq.copy(), "rng": mouse.rng.getstate(), "hasDistances": mouse.distances is not None,
+             "open_list": None, "grid": None, "openCells": None}
+    if mouse.open_list is not None:
+        # A* keeps f, g, h and the parent in the Cells. Those of the expanded cells never change again and are read by
+        # the writer thread, only the cells of the open list (the frontier) can still improve and are copied here
+        grid = mouse.maze.MazeGrid
+        state["open_list"] = mouse.open_list.copy()
+        state["grid"] = grid
+        state["openCells"] = [(x, y, grid[x][y].f, grid[x][y].g, grid[x][y].h, grid[x][y].parent_x, grid[x][y].parent_y)
+                              for _, x, y in state["open_list"]]
+    return state
+
+def _dijkstra_distances(start: tuple, parent: dict) -> list:
+    """(x, y, distance) of the start and of every cell with a parent. With unit costs a cell gets its parent and its
+    distance at the same time, from a parent already settled: the distance is the length of the parent chain"""
+    distances = {start: 0}
+    for cell in parent:
+        chain = []
+        while cell not in distances:
+            chain.append(cell)
+            cell = parent[cell]
+        distance = distances[cell]
+        for link in reversed(chain):
+            distance += 1
+            distances[link] = distance
+    return [(x, y, distance) for (x, y), distance in distances.items()]
+
+def _astar_cells(mouseState: dict) -> list:
+    "(x, y, f, g, h, parent_x, parent_y) of the start, the expanded cells and the open list cells"
+    grid = mouseState["grid"]
+    expanded = set(mouseState["visited"])
+    expanded.add(mouseState["start"])
+    expanded.difference_update((x, y) for x, y, *_ in mouseState["openCells"])
+    return [(x, y, grid[x][y].f, grid[x][y].g, grid[x][y].h, grid[x][y].parent_x, grid[x][y].parent_y)
+            for x, y in expanded] + mouseState["openCells"]
+
+# ----------------------------------------------------------------------------------
+# Arrays: runs on the writer thread
+def _cells(items: list, width: int = 2, dtype=np.int32) -> np.ndarray:
+    return np.array(items, dtype=dtype).reshape(-1, width)
+
+def _rng_arrays(prefix: str, rngState: tuple, meta: dict) -> Dict[str, np.ndarray]:
+    version, internal, gaussNext = rngState
+    meta[prefix + "rng"] = {"version": version, "gauss_next": gaussNext}
+    return {prefix + "rng": np.array(internal, dtype=np.uint32)}
+
+def _rng_state(arrays: dict, prefix: str, meta: dict) -> tuple:
+    info = meta[prefix + "rng"]
+    return (info["version"], tuple(int(value) for value in arrays[prefix + "rng"]), info["gauss_next"])
+
+def state_to_arrays(bitmap: np.ndarray, mazeState: dict, mouseState: Optional[dict] = None) -> Dict[str, np.ndarray]:
+    """Flatten captured states into the named arrays of the .npz"""
+    meta = {key: mazeState[key] for key in ("generatorName", "seed", "cols", "rows", "cellSize", "start",
+                                            "mazeGenerated", "current", "currentlyRandomWalking")}
+    arrays = {"walls": bitmap, "maze_stack": _cells([(cell.x, cell.y) for cell in mazeState["stack"]]),
+              "maze_walls": _cells([a + b for a, b in mazeState["walls"]], 4),
+              "maze_remaining": _cells(mazeState["remainingCells"]), "maze_walk": _cells(mazeState["randomWalk"])}
+    arrays.update(_rng_arrays("maze_", mazeState["rng"], meta))
+    if mouseState is not None:
+        meta["mouse"] = {key: mouseState[key] for key in ("position", "start", "end", "MazeSolved")}
+        meta["mouse"]["hasDistances"] = mouseState["hasDistances"]
+        meta["mouse"]["hasOpenList"] = mouseState["open_list"] is not None
+        distances = _dijkstra_distances(mouseState["start"], mouseState["parent"]) if mouseState["hasDistances"] else []
+        cells = _astar_cells(mouseState) if mouseState["open_list"] is not None else []
+        arrays.update({"mouse_path": _cells(mouseState["finalPath"]), "mouse_stack": _cells(mouseState["stack"]),
+                       "mouse_queue": _cells(list(mouseState["queue"])), "mouse_visited": _cells(list(mouseState["visited"])),
+                       "mouse_parent": _cells([child + parent for child, parent in mouseState["parent"].items()], 4),
+                       "mouse_pq": _cells([(distance, x, y) for distance, (x, y) in mouseState["pq"]], 3, np.float64),
+                       "mouse_distances": _cells(distances, 3, np.float64),
+                       "mouse_open": _cells(mouseState["open_list"] or [], 3, np.float64),
+                       "mouse_cells": _cells(cells, 7, np.float64)})
+        arrays.update(_rng_arrays("mouse_", mouseState["rng"], meta))
+    arrays["version"] = np.array(CHECKPOINT_VERSION)
+    arrays["meta"] = np.array(json.dumps(meta))
+    return arrays
+
+def write_checkpoint(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    "Write the arrays to a temporary file next to path, then rename it over path"
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporaryPath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            np.savez_compressed(file, **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temporaryPath, wall_bitmap.NEW_FILE_MODE) # mkstemp files are 0600
+        os.replace(temporaryPath, path)
+    except BaseException:
+        os.unlink(temporaryPath)
+        raise
+
+def apply_journal(bitmap: np.ndarray, journal: list) -> None:
+    """Remove the journaled walls (x1, y1, x2, y2) from the bitmap, vectorized per direction"""
+    if not journal:
+        return
+    x1, y1, x2, y2 = np.array(journal, dtype=np.int64).T
+    for bit, (dx, dy) in zip(wall_bitmap.WALL_BITS, wall_bitmap.WALL_OFFSETS):
+        mask = (x2 - x1 == dx) & (y2 - y1 == dy)
+        bitmap[x1[mask], y1[mask]] &= ~bit & wall_bitmap.ALL_WALLS
+        bitmap[x2[mask], y2[mask]] &= ~wall_bitmap.OPPOSITE_BIT[bit] & wall_bitmap.ALL_WALLS
+
+# ----------------------------------------------------------------------------------
+class Checkpointer:
+    """
+    Periodic background checkpoints of a MazeMap and optionally of the Mouse solving it
+
+    Parameters
+    ----------
+    path : str
+        The checkpoint file (.npz), replaced by every new checkpoint
+    interval : float
+        Seconds between two checkpoints taken by maybeCheckpoint
+    """
+    def __init__(self, path: str, maze: "Maze.MazeMap", mouse: Optional["solver.Mouse"] = None, interval: float = 30.0):
+        self.path = path
+        self.maze = maze
+        self.mouse = mouse
+        self.interval = interval
+        self.written = 0
+        self.skipped = 0
+        self.error: Optional[BaseException] = None
+        # The only full scan of the grid: from now on the bitmap follows the journal
+        self._bitmap = wall_bitmap.from_maze_grid(maze.MazeGrid)
+        maze.wallJournal = []
+        # Even a shallow copy of a list of millions of walls or cells takes tens of milliseconds, so the two lists that
+        # start out grid-sized are not copied at each checkpoint:
+        # - Kruskal only pops its shuffled wall list from the end, the walls left are always a prefix of it as it is now
+        # - Wilson swap-removes cells from its remaining cells: the writer keeps its own copy of the list and replays
+        #   the removals journaled by the maze (MazeMap.remainingJournal), which gives the same order
+        self._wallList = maze.walls if maze.generatorName == "kruskal" else None
+        self._wallPrefix = maze.walls.copy() if self._wallList is not None else None
+        self._remainingList = maze.remainingCells if maze.generatorName == "wilson" and maze.remainingCells else None
+        if self._remainingList is not None:
+            self._remainingCopy = maze.remainingCells.copy()
+            self._remainingIndex = maze.remainingIndex.copy()
+            maze.remainingJournal = []
+        self._pending: "queue.Queue" = queue.Queue(maxsize=1)
+        self._lastCapture = time.perf_counter()
+        self._thread = threading.Thread(target=self._writeLoop, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def maybeCheckpoint(self) -> bool:
+        "Checkpoint if `interval` seconds have passed since the last one. Call once per step"
+        if time.perf_counter() - self._lastCapture < self.interval:
+            return False
+        return self.checkpoint()
+
+    def checkpoint(self, block: bool = False) -> bool:
+        """Capture the state and hand it to the writer. Without block, a checkpoint is skipped (and retried at the
+        next call) while the previous one is still being written. Return True if a checkpoint was queued"""
+        if not block and self._pending.full():
+            self.skipped += 1
+            return False
+        journal, self.maze.wallJournal = self.maze.wallJournal, []
+        if self._remainingList is not None and self.maze.remainingCells is not self._remainingList:
+            self._remainingList = self.maze.remainingJournal = None # replaced by init_Wilson: copied from now on
+        mazeState = capture_maze_state(self.maze, copyWalls=self.maze.walls is not self._wallList,
+                                       copyRemaining=self.maze.remainingCells is not self._remainingList)
+        if self._remainingList is not None:
+            mazeState["removedCells"], self.maze.remainingJournal = self.maze.remainingJournal, []
+        mouseState = capture_mouse_state(self.mouse) if self.mouse is not None else None
+        self._pending.put((journal, mazeState, mouseState))
+        self._lastCapture = time.perf_counter()
+        return True
+
+    def _writeLoop(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            journal, mazeState, mouseState = item
+            try:
+                apply_journal(self._bitmap, journal)
+                self._completeState(mazeState)
+                write_checkpoint(self.path, state_to_arrays(self._bitmap, mazeState, mouseState))
+                self.written += 1
+            except Exception as error:
+                self.error = error
+                logger.exception("Writing the checkpoint %s failed", self.path)
+
+    def _completeState(self, mazeState: dict) -> None:
+        "Rebuild the lists capture_maze_state did not copy, on the writer thread"
+        if mazeState["walls"] is None:
+            mazeState["walls"] = self._wallPrefix[:mazeState["wallCount"]]
+        if mazeState["remainingCells"] is None:
+            for x, y in mazeState.pop("removedCells"):
+                Maze.remove_remaining_cell(self._remainingCopy, self._remainingIndex, x, y)
+            mazeState["remainingCells"] = self._remainingCopy # converted before the next replay, no copy needed
+            if len(mazeState["remainingCells"]) != mazeState["remainingCount"]:
+                raise RuntimeError(f"{mazeState['remainingCount']} remaining cells, but {len(mazeState['remainingCells'])} "
+                                   "after replaying the journal: remainingCells was changed outside removeRemainingCell")
+
+    def stop(self, final: bool = True) -> None:
+        """Stop the writer thread, after writing a last checkpoint of the current state if final"""
+        if final:
+            self.checkpoint(block=True)
+        self._pending.put(None)
+        self._thread.join()
+        self.maze.wallJournal = None
+        self.maze.remainingJournal = None
+
+# ----------------------------------------------------------------------------------
+# Restore
+def restore(path: str, headless: bool = True) -> Tuple["Maze.MazeMap", Optional["solver.Mouse"]]:
+    """Rebuild the MazeMap (and the Mouse, if one was checkpointed) exactly as they were captured"""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    version = int(arrays["version"])
+    if version > CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint version {version} is newer than the supported version {CHECKPOINT_VERSION}")
+    meta = json.loads(str(arrays["meta"]))
+    cols, rows, cellSize = meta["cols"], meta["rows"], meta["cellSize"]
+    startX, startY = meta["start"]
+    maze = Maze.MazeMap(mazeWidth=cols * cellSize, mazeHeight=rows * cellSize, cellSize=cellSize, startX=startX,
+                        startY=startY, headless=headless, seed=meta["seed"])
+    maze.generatorName = meta["generatorName"]
+    maze.mazeGenerated = meta["mazeGenerated"]
+    maze.rng.setstate(_rng_state(arrays, "maze_", meta))
+    bitmap = arrays["walls"]
+    wall_bitmap.apply_to_maze_grid(bitmap, maze.MazeGrid)
+    grid = maze.MazeGrid
+    maze.current = grid[meta["current"][0]][meta["current"][1]]
+    maze.stack = [grid[x][y] for x, y in arrays["maze_stack"].tolist()]
+    maze.walls = [((x1, y1), (x2, y2)) for x1, y1, x2, y2 in arrays["maze_walls"].tolist()]
+    maze.remainingCells = [tuple(cell) for cell in arrays["maze_remaining"].tolist()]
+    maze.remainingIndex = np.zeros((cols, rows), dtype=np.int32)
+    if maze.remainingCells:
+        maze.remainingIndex[tuple(arrays["maze_remaining"].T)] = np.arange(len(maze.remainingCells), dtype=np.int32)
+    maze.randomWalk = [tuple(cell) for cell in arrays["maze_walk"].tolist()]
+    maze.walkPositions = {cell: index for index, cell in enumerate(maze.randomWalk)}
+    maze.currentlyRandomWalking = meta["currentlyRandomWalking"]
+
+    # Visited flags, see the module docstring
+    if maze.generatorName == "wilson":
+        inMaze = np.ones((cols, rows), dtype=bool)
+        if maze.remainingCells:
+            remaining = np.array(maze.remainingCells)
+            inMaze[remaining[:, 0], remaining[:, 1]] = False
+        if maze.currentlyRandomWalking:
+            inMaze[maze.randomWalk[0]] = True
+            for x, y in maze.randomWalk:
+                grid[x][y].Color = Maze.DARKGRAY
+    else:
+        inMaze = wall_bitmap.degrees(bitmap) > 0
+        if maze.generatorName != "kruskal":
+            inMaze[startX, startY] = inMaze[maze.current.x, maze.current.y] = True
+    if maze.generatorName != "kruskal" or maze.mazeGenerated:
+        for x, y in np.argwhere(inMaze).tolist():
+            grid[x][y].visited = True
+    # Kruskal: the sets only have to agree on which cells are already connected
+    _, openRight, openBottom, _ = wall_bitmap.open_masks(bitmap)
+    for x, y in np.argwhere(openRight).tolist():
+        maze.disjointSet.union(x, y, x + 1, y)
+    for x, y in np.argwhere(openBottom).tolist():
+        maze.disjointSet.union(x, y, x, y + 1)
+
+    if "mouse" not in meta:
+        return maze, None
+    info = meta["mouse"]
+    mouse = solver.Mouse(maze, x=info["start"][0], y=info["start"][1])
+    mouse.rng.setstate(_rng_state(arrays, "mouse_", meta))
+    mouse.x, mouse.y = info["position"]
+    mouse.endX, mouse.endY = info["end"]
+    mouse.currentCell = grid[mouse.x][mouse.y]
+    mouse.MazeSolved = info["MazeSolved"]
+    mouse.finalPath = [tuple(cell) for cell in arrays["mouse_path"].tolist()]
+    mouse.stack = [tuple(cell) for cell in arrays["mouse_stack"].tolist()]
+    mouse.queue.clear()
+    mouse.queue.extend(tuple(cell) for cell in arrays["mouse_queue"].tolist())
+    mouse.visited = set(tuple(cell) for cell in arrays["mouse_visited"].tolist())
+    mouse.parent = {(cx, cy): (px, py) for cx, cy, px, py in arrays["mouse_parent"].tolist()}
+    # Heaps are restored as the same lists, so they keep their heap order
+    mouse.pq = [(int(distance), (int(x), int(y))) for distance, x, y in arrays["mouse_pq"].tolist()]
+    if info["hasDistances"]:
+        mouse.distances = [[float("inf")] * rows for _ in range(cols)]
+        for x, y, distance in arrays["mouse_distances"].tolist():
+            mouse.distances[int(x)][int(y)] = int(distance)
+    if info["hasOpenList"]:
+        mouse.open_list = [(f, int(x), int(y)) for f, x, y in arrays["mouse_open"].tolist()]
+        mouse.closed_list = [[False] * rows for _ in range(cols)]
+        for x, y in mouse.visited:
+            mouse.closed_list[x][y] = True
+        for x, y, f, g, h, parentX, parentY in arrays["mouse_cells"].tolist():
+            cell = grid[int(x)][int(y)]
+            cell.f, cell.g, cell.h, cell.parent_x, cell.parent_y = f, g, h, int(parentX), int(parentY)
+    return maze, mouse
+
+# Driver code: interrupt every step-by-step generator and solver halfway, resume from the checkpoint and compare
+if __name__ == "__main__":
+    path = os.path.join(tempfile.gettempdir(), "maze_checkpoint_test.npz")
+    steps = {"dfs": "iterativeDFS", "kruskal": "iterativeKruskal", "prim": "iterativePrim", "wilson": "iterativeWilson"}
+    setups = {"kruskal": lambda maze: maze.generateListofWalls(), "wilson": lambda maze: maze.init_Wilson(),
+              "prim": lambda maze: (setattr(maze.current, "visited", True),
+                                    setattr(maze, "walls", maze.retrieveWallsasXY_Tuple(maze.current))),
+              "dfs": lambda maze: None}
+    def finished(maze, name):
+        return maze.mazeGenerated if name == "dfs" else not (maze.remainingCells if name == "wilson" else maze.walls)
+    for name, step in steps.items():
+        maze = Maze.MazeMap(mazeWidth=30, mazeHeight=20, cellSize=1, headless=True, seed=7)
+        maze.generatorName = name
+        setups[name](maze)
+        checkpointer = Checkpointer(path, maze)
+        for _ in range(150):
+            getattr(maze, step)()
+        checkpointer.stop()
+        while not finished(maze, name):
+            getattr(maze, step)()
+        resumed, _ = restore(path)
+        while not finished(resumed, name):
+            getattr(resumed, step)()
+        same = np.array_equal(wall_bitmap.from_maze_grid(maze.MazeGrid), wall_bitmap.from_maze_grid(resumed.MazeGrid))
+        print(f"{name:>8}: resumed maze identical: {same}")
+
+    base = Maze.MazeMap.fromSeed("kruskal", 30, 20, 3, cellSize=1)
+    bitmap = wall_bitmap.from_maze_grid(base.MazeGrid)
+    for name, init, step in (("dfs", None, "depthFirstSearch_iter"), ("bfs", None, "breadthFirstSearch_iter"),
+                             ("dijkstra", "dijkstra_init", "dijkstra_iter"), ("a_star", "astar_init", "astar_iter")):
+        mouse = solver.Mouse(Maze.MazeMap.fromBitmap(bitmap, cellSize=1), seed=5)
+        if init:
+            getattr(mouse, init)()
+        for _ in range(40):
+            getattr(mouse, step)()
+        checkpointer = Checkpointer(path, mouse.maze, mouse)
+        checkpointer.stop()
+        stepsTaken = 0
+        while not mouse.MazeSolved:
+            getattr(mouse, step)()
+            stepsTaken += 1
+        _, resumedMouse = restore(path)
+        resumedSteps = 0
+        while not resumedMouse.MazeSolved:
+            getattr(resumedMouse, step)()
+            resumedSteps += 1
+        print(f"{name:>8}: same path {mouse.finalPath == resumedMouse.finalPath}, same steps {stepsTaken == resumedSteps}")
+    print(f"Checkpoint size: {os.path.getsize(path)} bytes")
@@ -0,0 +1,67 @@
+# Dead-end filling on the wall bitmap, pruning every dead end of the maze at once
+"""Method
+1. Count the open sides (degree) of every cell
+2. Every cell of degree <= 1 that is not the start or the goal is a dead end: fill all of them in the same round
+3. Filling a cell lowers the degree of its open neighbors, which are the only candidates for the next round
+4. Stop when no candidate is left: what remains is the "core" - the solution corridor in a perfect maze,
+   plus the loops in a braided one
+Rounds take as many steps as the longest dead-end branch, and each round only looks at the cells next to the ones
+just filled, so the whole fill is O(cells) NumPy work instead of a walk per dead end
+"""
+from typing import Iterable, Tuple
+import numpy as np
+import wall_bitmap
+from distance_map import neighbor_table
+
+def prune_dead_ends(bitmap: np.ndarray, keep: Iterable[Tuple[int, int]] = ()) -> np.ndarray:
+    """
+    Fill all dead ends of a maze
+
+    Parameters
+    ----------
+    bitmap : np.ndarray
+        Wall bitmap of shape (cols, rows)
+    keep : iterable of (x, y)
+        Cells never filled, usually the start and the goal
+    Returns
+    -------
+    Boolean "core" mask of shape (cols, rows): True for the cells left after filling
+    """
+    cols, rows = bitmap.shape
+    size = cols * rows
+    masks = [mask.ravel() for mask in wall_bitmap.open_masks(bitmap)]
+    neighbors = neighbor_table(masks, rows)
+    # Index `size` is the "no neighbor" slot of the neighbor table, it is never alive
+    alive = np.ones(size + 1, dtype=bool)
+    alive[size] = False
+    degree = np.zeros(size + 1, dtype=np.int16)
+    degree[:size] = wall_bitmap.degrees(bitmap).ravel()
+    protected = np.zeros(size + 1, dtype=bool)
+    for x, y in keep:
+        protected[x * rows + y] = True
+
+    candidates = np.flatnonzero(degree[:size] <= 1)
+    while candidates.size:
+        filled = candidates[alive[candidates] & (degree[candidates] <= 1) & ~protected[candidates]]
+        if not filled.size:
+            break
+        alive[filled] = False
+        touched = neighbors[filled].ravel()
+        touched, counts = np.unique(touched[alive[touched]], return_counts=True)
+        degree[touched] -= counts.astype(np.int16)
+        candidates = touched
+    return alive[:size].reshape(cols, rows)
+
+def core_bitmap(bitmap: np.ndarray, core: np.ndarray) -> np.ndarray:
+    """Walls of the maze reduced to its core: filled cells are walled in, so any other solver run on the result
+    (distance_transform, HierarchicalIndex, LandmarkTable, ...) only ever explores the remaining corridor"""
+    reduced = bitmap.copy()
+    reduced[~core] = wall_bitmap.ALL_WALLS
+    # Close the openings of core cells that lead into filled cells
+    filledUp = np.zeros_like(core); filledUp[:, 1:] = ~core[:, :-1]
+    filledRight = np.zeros_like(core); filledRight[:-1, :] = ~core[1:, :]
+    filledDown = np.zeros_like(core); filledDown[:, :-1] = ~core[:, 1:]
+    filledLeft = np.zeros_like(core); filledLeft[1:, :] = ~core[:-1, :]
+    for bit, filled in zip(wall_bitmap.WALL_BITS, (filledUp, filledRight, filledDown, filledLeft)):
+        reduced[core & filled] |= bit
+    return reduced
@@ -0,0 +1,101 @@
+# Level-synchronous BFS distance transform over a wall bitmap
+"""Instead of popping one (x, y) tuple at a time from a deque like Mouse.breadthFirstSearch, every level of the BFS
+expands the whole frontier at once with NumPy:
+- a narrow frontier (corridors of a perfect maze) is kept as an array of flat cell indices and expanded by gathering
+  the rows of a precomputed neighbor table (built from the open-wall masks) for all frontier cells in one go
+- a wide frontier (open rooms, braided mazes) is kept as a boolean mask over the grid and expanded with four
+  shifted mask operations
+The distances are identical to a plain BFS: every cell gets the level at which the frontier first reaches it.
+The speed-up is largest when the frontier is wide; in long-corridor mazes (DFS) each level is only a few cells wide,
+so the cost is dominated by the number of levels rather than the number of cells
+"""
+from typing import Iterable, Tuple
+import numpy as np
+import wall_bitmap
+
+# Switch to whole-grid boolean masks once the frontier holds more than 1/DENSE_FRACTION of the cells
+DENSE_FRACTION = 32
+UNREACHABLE = -1
+
+def distance_transform(bitmap: np.ndarray, sources: Iterable[Tuple[int, int]]) -> np.ndarray:
+    """
+    Distance in moves from the nearest source to every cell
+
+    Parameters
+    ----------
+    bitmap : np.ndarray
+        Wall bitmap of shape (cols, rows), see wall_bitmap
+    sources : iterable of (x, y)
+        Cells at distance 0, e.g. [(0, 0)] for a distance map from the start or the goal cells for goal distances
+    Returns
+    -------
+    np.ndarray of int32 with shape (cols, rows), UNREACHABLE (-1) where no path exists
+    """
+    cols, rows = bitmap.shape
+    size = cols * rows
+    masks = [mask.ravel() for mask in wall_bitmap.open_masks(bitmap)]
+    neighbors = neighbor_table(masks, rows)
+    # One extra slot at index `size` stands for "no neighbor" and is marked as already reached
+    distances = np.full(size + 1, UNREACHABLE, dtype=np.int32)
+    distances[size] = 0
+    frontier = np.unique(np.array([x * rows + y for x, y in sources], dtype=neighbors.dtype))
+    distances[frontier] = 0
+    level = 0
+    while frontier.size:
+        level += 1
+        if frontier.size * DENSE_FRACTION > size:
+            frontier = _expand_dense(frontier, masks, rows, distances)
+        else:
+            frontier = _expand_sparse(frontier, neighbors, distances)
+        distances[frontier] = level
+    return distances[:size].reshape(cols, rows)
+
+def neighbor_table(masks: list, rows: int) -> np.ndarray:
+    """(cells, 4) table of the flat index of the up/right/down/left neighbor of every cell, or `cells` if walled off"""
+    size = masks[0].size
+    dtype = np.int32 if size < np.iinfo(np.int32).max else np.int64
+    index = np.arange(size, dtype=dtype)
+    return np.stack([np.where(mask, index + offset, size).astype(dtype)
+                     for mask, offset in zip(masks, wall_bitmap.flat_offsets(rows))], axis=1)
+
+def _expand_sparse(frontier: np.ndarray, neighbors: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    "Next frontier as flat indices, gathered from the neighbor table rows of every frontier cell"
+    reached = neighbors[frontier].ravel()
+    reached = reached[distances[reached] == UNREACHABLE]
+    return np.unique(reached) if reached.size > 1 else reached
+
+def _expand_dense(frontier: np.ndarray, masks: list, rows: int, distances: np.ndarray) -> np.ndarray:
+    "Next frontier computed with whole-grid boolean masks shifted towards each neighbor"
+    openTop, openRight, openBottom, openLeft = masks
+    size = masks[0].size
+    front = np.zeros(size, dtype=bool)
+    front[frontier] = True
+    reached = np.zeros_like(front)
+    reached[:-1] |= front[1:] & openTop[1:]              # (x, y) -> (x, y - 1)
+    reached[rows:] |= front[:-rows] & openRight[:-rows]  # (x, y) -> (x + 1, y)
+    reached[1:] |= front[:-1] & openBottom[:-1]          # (x, y) -> (x, y + 1)
+    reached[:-rows] |= front[rows:] & openLeft[rows:]    # (x, y) -> (x - 1, y)
+    reached &= distances[:size] == UNREACHABLE
+    return np.flatnonzero(reached)
+
+def descend(bitmap: np.ndarray, distances: np.ndarray, start: Tuple[int, int]) -> list:
+    """Follow the distance field downhill from start to a source, returning the cells visited (a shortest path).
+    A move is open when both cells agree, the test of distance_transform (wall_bitmap.open_masks).
+    Return [] when start is unreachable or no neighbor leads downhill (distances not computed on this bitmap)"""
+    if distances[start] == UNREACHABLE:
+        return []
+    x, y = start
+    path = [start]
+    while distances[x, y] > 0:
+        walls = int(bitmap[x, y])
+        for bit, (dx, dy) in zip(wall_bitmap.WALL_BITS, wall_bitmap.WALL_OFFSETS):
+            nx, ny = x + dx, y + dy
+            if not walls & bit and 0 <= nx < distances.shape[0] and 0 <= ny < distances.shape[1] \
+                    and not int(bitmap[nx, ny]) & wall_bitmap.OPPOSITE_BIT[bit] \
+                    and distances[nx, ny] == distances[x, y] - 1:
+                x, y = nx, ny
+                break
+        else:
+            return []
+        path.append((x, y))
+    return path
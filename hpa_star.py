@@ -0,0 +1,198 @@
+# Hierarchical Pathfinding A* (HPA*) for very large mazes
+"""Method
+1. Partition the grid into square clusters of clusterSize x clusterSize cells
+2. Every open passage crossing a cluster border makes its two cells "entrances" (abstract nodes), linked with cost 1
+3. Inside each cluster, precompute the shortest distance between every pair of its entrances (BFS restricted to the cluster)
+4. A query links start/goal to the entrances of their clusters, runs A* on the small abstract graph,
+   then refines every abstract edge back into cells with a local BFS
+Since every border crossing is kept as an entrance and intra-cluster distances are exact, the refined path has
+exactly the same length as plain A* over the whole grid
+
+Reference: Botea, Muller, Schaeffer - Near Optimal Hierarchical Path-Finding (2004)
+"""
+import heapq
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import wall_bitmap
+from wall_bitmap import TOP, RIGHT, BOTTOM, LEFT
+
+class HierarchicalIndex:
+    """Abstract graph over the clusters of a maze, built from its wall bitmap"""
+    def __init__(self, bitmap: np.ndarray, clusterSize: int = 16) -> None:
+        self.cols, self.rows = bitmap.shape
+        self.clusterSize = clusterSize
+        # Plain nested lists are much faster than numpy arrays for per-cell lookups in Python loops
+        self.walls: List[List[int]] = bitmap.tolist()
+        self.entrances: Dict[tuple, List[tuple]] = {} # cluster -> entrance cells of this cluster
+        self.intraEdges: Dict[tuple, Dict[tuple, int]] = {} # entrance cell -> {entrance of the same cluster: distance}
+        self.expanded = 0 # Number of abstract nodes expanded by the last query
+        for cx in range((self.cols + clusterSize - 1) // clusterSize):
+            for cy in range((self.rows + clusterSize - 1) // clusterSize):
+                self.buildCluster((cx, cy))
+
+    @classmethod
+    def fromMaze(cls, maze, clusterSize: int = 16) -> "HierarchicalIndex":
+        """Build the index from the same wall data the Mouse reads: maze.MazeGrid"""
+        return cls(wall_bitmap.from_maze_grid(maze.MazeGrid), clusterSize=clusterSize)
+
+    # ----------------------------------------------------------------------------------
+    # Cluster utilities
+    def clusterOf(self, x: int, y: int) -> tuple:
+        return (x // self.clusterSize, y // self.clusterSize)
+
+    def clusterBounds(self, cluster: tuple) -> Tuple[int, int, int, int]:
+        "Return x0, y0, x1, y1 (exclusive) of a cluster"
+        x0, y0 = cluster[0] * self.clusterSize, cluster[1] * self.clusterSize
+        return x0, y0, min(x0 + self.clusterSize, self.cols), min(y0 + self.clusterSize, self.rows)
+
+    def crossings(self, x: int, y: int) -> List[tuple]:
+        """Open neighbors of (x, y) that lie in another cluster"""
+        return [neighbor for neighbor in wall_bitmap.open_neighbors(self.walls, x, y)
+                if self.clusterOf(*neighbor) != self.clusterOf(x, y)]
+
+    def localSearch(self, start: tuple, cluster: tuple, target: Optional[tuple] = None) -> Tuple[dict, dict]:
+        """BFS from start that never leaves the cluster. Return (distances, parents), stop early once target is reached"""
+        x0, y0, x1, y1 = self.clusterBounds(cluster)
+        walls = self.walls
+        distances = {start: 0}
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            x, y = current = queue.popleft()
+            if current == target:
+                break
+            cell = walls[x][y]
+            # Top -> Right -> Bottom -> Left, restricted to the cluster bounds, open when both cells agree
+            neighbors = []
+            if not cell & TOP and y > y0 and not walls[x][y - 1] & BOTTOM:
+                neighbors.append((x, y - 1))
+            if not cell & RIGHT and x < x1 - 1 and not walls[x + 1][y] & LEFT:
+                neighbors.append((x + 1, y))
+            if not cell & BOTTOM and y < y1 - 1 and not walls[x][y + 1] & TOP:
+                neighbors.append((x, y + 1))
+            if not cell & LEFT and x > x0 and not walls[x - 1][y] & RIGHT:
+                neighbors.append((x - 1, y))
+            for neighbor in neighbors:
+                if neighbor not in distances:
+                    distances[neighbor] = distances[current] + 1
+                    parents[neighbor] = current
+                    queue.append(neighbor)
+        return distances, parents
+
+    def buildCluster(self, cluster: tuple) -> None:
+        """(Re)compute the entrances of a cluster and the distances between them"""
+        for entrance in self.entrances.get(cluster, []):
+            self.intraEdges.pop(entrance, None)
+        x0, y0, x1, y1 = self.clusterBounds(cluster)
+        # Only the border cells of the cluster can be entrances
+        border = set()
+        for x in range(x0, x1):
+            border.add((x, y0)); border.add((x, y1 - 1))
+        for y in range(y0, y1):
+            border.add((x0, y)); border.add((x1 - 1, y))
+        entrances = sorted(cell for cell in border if self.crossings(*cell))
+        self.entrances[cluster] = entrances
+        for entrance in entrances:
+            distances, _ = self.localSearch(entrance, cluster)
+            self.intraEdges[entrance] = {other: distances[other] for other in entrances
+                                         if other != entrance and other in distances}
+
+    def refreshCells(self, bitmap: np.ndarray, cells: Iterable[tuple]) -> None:
+        """
+        Re-read the walls of the given cells (and their neighbors, whose matching wall bit changes too) from the
+        bitmap, then rebuild only the clusters that contain them
+        """
+        self._refresh(lambda x, y: int(bitmap[x, y]), cells)
+
+    def refreshFromMaze(self, maze, cells: Iterable[tuple]) -> None:
+        """Same as refreshCells but reading the walls straight from maze.MazeGrid"""
+        def readWalls(x, y):
+            walls = maze.MazeGrid[x][y].walls
+            return walls[0] | walls[1] << 1 | walls[2] << 2 | walls[3] << 3
+        self._refresh(readWalls, cells)
+
+    def _refresh(self, readWalls, cells: Iterable[tuple]) -> None:
+        touched = set()
+        for x, y in cells:
+            for dx, dy in ((0, 0),) + wall_bitmap.WALL_OFFSETS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < self.cols and 0 <= ny < self.rows:
+                    self.walls[nx][ny] = int(readWalls(nx, ny))
+                    touched.add(self.clusterOf(nx, ny))
+        for cluster in touched:
+            self.buildCluster(cluster)
+
+    # ----------------------------------------------------------------------------------
+    def findPath(self, start: tuple, goal: tuple) -> List[tuple]:
+        """Shortest path of cells from start to goal, or [] if the goal cannot be reached"""
+        self.expanded = 0
+        if start == goal:
+            return [start]
+        startCluster, goalCluster = self.clusterOf(*start), self.clusterOf(*goal)
+        startDistances, _ = self.localSearch(start, startCluster)
+        goalDistances, _ = self.localSearch(goal, goalCluster)
+
+        def heuristic(cell):
+            return abs(cell[0] - goal[0]) + abs(cell[1] - goal[1])
+
+        def successors(cell):
+            if cell == start:
+                # Start links to every entrance it can reach inside its cluster, and straight to the goal if they share it
+                for entrance in self.entrances[startCluster]:
+                    if entrance in startDistances:
+                        yield entrance, startDistances[entrance]
+                if goal in startDistances:
+                    yield goal, startDistances[goal]
+            for other, distance in self.intraEdges.get(cell, {}).items():
+                yield other, distance
+            if cell in self.intraEdges:
+                for neighbor in self.crossings(*cell):
+                    yield neighbor, 1
+            if self.clusterOf(*cell) == goalCluster and cell in goalDistances:
+                yield goal, goalDistances[cell]
+
+        # A* over the abstract graph
+        costs = {start: 0}
+        parents = {start: None}
+        openList = [(heuristic(start), 0, start)]
+        while openList:
+            _, cost, cell = heapq.heappop(openList)
+            if cost > costs[cell]:
+                continue # stale entry
+            if cell == goal:
+                break
+            self.expanded += 1
+            for neighbor, distance in successors(cell):
+                newCost = cost + distance
+                if newCost < costs.get(neighbor, float("inf")):
+                    costs[neighbor] = newCost
+                    parents[neighbor] = cell
+                    heapq.heappush(openList, (newCost + heuristic(neighbor), newCost, neighbor))
+        if goal not in parents:
+            return []
+
+        abstractPath = []
+        cell = goal
+        while cell is not None:
+            abstractPath.append(cell)
+            cell = parents[cell]
+        abstractPath.reverse()
+        return self.refinePath(abstractPath)
+
+    def refinePath(self, abstractPath: List[tuple]) -> List[tuple]:
+        """Expand consecutive abstract nodes back into the cells between them"""
+        path = [abstractPath[0]]
+        for current, following in zip(abstractPath, abstractPath[1:]):
+            cluster = self.clusterOf(*current)
+            if cluster != self.clusterOf(*following):
+                path.append(following) # Border crossing, the two cells are adjacent
+                continue
+            _, parents = self.localSearch(current, cluster, target=following)
+            segment = []
+            cell = following
+            while cell != current:
+                segment.append(cell)
+                cell = parents[cell]
+            path.extend(reversed(segment))
+        return path
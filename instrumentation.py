@@ -0,0 +1,128 @@
+# Lightweight instrumentation for the generators and solvers: named counters, sampled values, timers, cProfile dumps
+"""Usage
+    maze.enableStats()                      # or maze.stats = Stats(), mouse.stats = maze.stats to share one
+    maze.runToCompletion("kruskal")
+    print(maze.stats.summary())             # counters, sampled values (count/last/max/mean) and timers
+
+    maze.runToCompletion("dfs", profilePath="dfs.prof")   # run under cProfile, open with `python -m pstats dfs.prof`
+
+Objects start with NULL_STATS, whose methods do nothing, so the hooks left in the hot loops cost one no-op method
+call when instrumentation is disabled
+"""
+import contextlib
+import cProfile
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, Optional
+
+class Stats:
+    """Named counters, sampled values and accumulated timers"""
+    enabled = True
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.samples: Dict[str, list] = {} # name -> [count, last, max, total]
+        self.timers: Dict[str, list] = {} # name -> [count, total seconds, max seconds]
+
+    def count(self, name: str, amount: int = 1) -> None:
+        "Add to a counter, e.g. steps, expansions, wall removals"
+        self.counters[name] += amount
+
+    def sample(self, name: str, value: float) -> None:
+        "Record the current value of a quantity that goes up and down, e.g. the size of the frontier"
+        entry = self.samples.get(name)
+        if entry is None:
+            self.samples[name] = [1, value, value, value]
+        else:
+            entry[0] += 1
+            entry[1] = value
+            if value > entry[2]:
+                entry[2] = value
+            entry[3] += value
+
+    def addTime(self, name: str, seconds: float) -> None:
+        entry = self.timers.get(name)
+        if entry is None:
+            self.timers[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        "Time the body of a with-block, e.g. the drawing of a frame"
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addTime(name, time.perf_counter() - start_time)
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.samples.clear()
+        self.timers.clear()
+
+    def report(self) -> dict:
+        "Everything recorded so far as plain dicts (JSON-ready)"
+        return {
+            "counters": dict(self.counters),
+            "samples": {name: {"count": count, "last": last, "max": peak, "mean": total / count}
+                        for name, (count, last, peak, total) in self.samples.items()},
+            "timers": {name: {"count": count, "total": total, "mean": total / count, "max": peak}
+                       for name, (count, total, peak) in self.timers.items()},
+        }
+
+    def summary(self) -> str:
+        "Human-readable report, one line per counter, sample and timer"
+        lines = [f"{name}: {value}" for name, value in sorted(self.counters.items())]
+        lines += [f"{name}: last={last} max={peak} mean={total / count:.1f}"
+                  for name, (count, last, peak, total) in sorted(self.samples.items())]
+        lines += [f"{name}: {count} x {total / count * 1e3:.3f} ms (max {peak * 1e3:.3f} ms, total {total:.3f} s)"
+                  for name, (count, total, peak) in sorted(self.timers.items())]
+        return "\n".join(lines)
+
+class NullStats:
+    """Stand-in used while instrumentation is disabled, every method does nothing"""
+    enabled = False
+    _nullTimer = contextlib.nullcontext()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def sample(self, name: str, value: float) -> None:
+        pass
+
+    def addTime(self, name: str, seconds: float) -> None:
+        pass
+
+    def timer(self, name: str) -> contextlib.nullcontext:
+        return self._nullTimer
+
+    def reset(self) -> None:
+        pass
+
+    def report(self) -> dict:
+        return {"counters": {}, "samples": {}, "timers": {}}
+
+    def summary(self) -> str:
+        return "Instrumentation disabled"
+
+NULL_STATS = NullStats()
+
+@contextlib.contextmanager
+def profiled(profilePath: Optional[str]) -> Iterator[Optional[cProfile.Profile]]:
+    """Run the body of a with-block under cProfile and dump the stats to profilePath (.prof).
+    With profilePath None the body just runs, so callers can pass their option straight through"""
+    if profilePath is None:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profilePath)
+        print(f"Profile written to {profilePath}")
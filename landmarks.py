@@ -0,0 +1,94 @@
+# Landmark (ALT) heuristics for A*: A* + Landmarks + Triangle inequality
+"""Method
+1. Pick K landmark cells spread over the maze (farthest-point selection: each new landmark is the cell farthest
+   from all the landmarks chosen so far)
+2. Store the BFS distance from every landmark to every cell
+3. For any cell n and goal g and landmark L, the triangle inequality gives |d(L, g) - d(L, n)| <= d(n, g),
+   so the max over all landmarks is an admissible (and consistent) heuristic, much tighter than Manhattan distance
+   in mazes where the real distance is many times the straight-line one
+
+Reference: Goldberg & Harrelson - Computing the Shortest Path: A* Search Meets Graph Theory (2005)
+"""
+import hashlib
+import logging
+import os
+from typing import List, Optional
+import numpy as np
+from distance_map import distance_transform
+
+LANDMARK_FILE_SUFFIX = ".landmarks.npz"
+
+logger = logging.getLogger(__name__)
+
+def bitmap_digest(bitmap: np.ndarray) -> str:
+    "Fingerprint of a wall bitmap, stored with the tables so stale landmark files are detected"
+    return hashlib.sha1(np.ascontiguousarray(bitmap, dtype=np.uint8).tobytes() + str(bitmap.shape).encode()).hexdigest()
+
+class LandmarkTable:
+    """Compact distance tables (uint16, or uint32 for huge mazes) from K landmark cells"""
+    def __init__(self, landmarks: List[tuple], distances: np.ndarray, digest: str = "") -> None:
+        self.landmarks = [tuple(landmark) for landmark in landmarks]
+        self.distances = distances # shape (K, cols, rows), UNREACHABLE where no path exists
+        self.unreachable = np.iinfo(distances.dtype).max
+        self.digest = digest
+        self._cellTable = None # per-cell lists of the K distances, built on first use
+        self._goal = None
+        self._goalDistances = None
+
+    @classmethod
+    def build(cls, bitmap: np.ndarray, k: int = 8, seedCell: tuple = (0, 0)) -> "LandmarkTable":
+        """Choose k landmarks by farthest-point selection and compute their distance tables"""
+        landmarks, tables = [], []
+        # The first landmark is the cell farthest from the seed cell, each next one is farthest from all chosen ones
+        closest = distance_transform(bitmap, [seedCell]).astype(np.float64)
+        closest[closest < 0] = -np.inf
+        for _ in range(min(k, bitmap.size)):
+            landmark = np.unravel_index(int(np.argmax(closest)), bitmap.shape)
+            landmark = (int(landmark[0]), int(landmark[1]))
+            distances = distance_transform(bitmap, [landmark])
+            landmarks.append(landmark)
+            tables.append(distances)
+            reachable = distances >= 0
+            closest[reachable] = np.minimum(closest[reachable], distances[reachable])
+        stacked = np.stack(tables).astype(np.int64)
+        dtype = np.uint16 if stacked.max() < np.iinfo(np.uint16).max else np.uint32
+        compact = np.where(stacked < 0, np.iinfo(dtype).max, stacked).astype(dtype)
+        return cls(landmarks, compact, digest=bitmap_digest(bitmap))
+
+    def lowerBound(self, x: int, y: int, goalX: int, goalY: int) -> int:
+        """Triangle-inequality lower bound on the distance from (x, y) to the goal"""
+        if self._cellTable is None:
+            self._cellTable = self.distances.transpose(1, 2, 0).tolist()
+        if self._goal != (goalX, goalY):
+            self._goal = (goalX, goalY)
+            self._goalDistances = self._cellTable[goalX][goalY]
+        best = 0
+        unreachable = self.unreachable
+        for fromLandmark, goalFromLandmark in zip(self._cellTable[x][y], self._goalDistances):
+            if fromLandmark != unreachable and goalFromLandmark != unreachable:
+                bound = abs(goalFromLandmark - fromLandmark)
+                if bound > best:
+                    best = bound
+        return best
+
+    # ----------------------------------------------------------------------------------
+    # Persistence alongside the maze file, e.g. saved_maze_test -> saved_maze_test.landmarks.npz
+    def save(self, mazeFilename: str) -> str:
+        filename = mazeFilename + LANDMARK_FILE_SUFFIX
+        np.savez_compressed(filename, landmarks=np.array(self.landmarks, dtype=np.int32),
+                            distances=self.distances, digest=np.array(self.digest))
+        logger.info("Landmark tables saved to %s", filename)
+        return filename
+
+    @classmethod
+    def load(cls, mazeFilename: str, bitmap: Optional[np.ndarray] = None) -> Optional["LandmarkTable"]:
+        """Load the tables saved next to a maze file. Return None if missing, or stale compared to the given bitmap"""
+        filename = mazeFilename + LANDMARK_FILE_SUFFIX
+        if not os.path.exists(filename):
+            return None
+        with np.load(filename) as data:
+            table = cls([tuple(landmark) for landmark in data["landmarks"].tolist()], data["distances"], str(data["digest"]))
+        if bitmap is not None and table.digest != bitmap_digest(bitmap):
+            logger.warning("Landmark tables in %s do not match the maze, ignoring them", filename)
+            return None
+        return table
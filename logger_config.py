@@ -1,24 +1,108 @@
-import logging, os
-
-# Define the working directory for the log file
-working_directory = "c:\\CODE\\game-development-library\\mazeSolver\\logs"
-os.makedirs(working_directory, exist_ok=True)  # Create the directory if it doesn't exist
-
-# Construct the full path to the log file
-log_file_path = os.path.join(working_directory, "maze_solver.log")
-
-# Configure logging
-logging.basicConfig(
-    filename=log_file_path,  # Log file name
-    filemode="w",               # Overwrite the log file each time the program runs
-    level=logging.INFO,         # Set the logging level (INFO, DEBUG, etc.)
-    format="%(asctime)s - %(levelname)s - %(message)s"  # Log format
-)
-
-# Optional: Add a console handler to also print logs to the console
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-console_handler.setFormatter(console_formatter)
-logging.getLogger().addHandl# Log a test message
-logging.info("Logging initialized. Log file is located at: " + log_file_path)
\ No newline at end of file
+# Logging setup: every record goes through a queue, the (slow) file and console writes happen on a background thread
+"""Usage
+    import logger_config
+    logger_config.setup_logging(level="INFO", moduleLevels={"solver": "DEBUG"})
+
+Modules log through logging.getLogger(__name__) with lazy %-style arguments, so a message below the level is never
+formatted. Step-level tracing (one message per generator/solver step) sits behind `if __debug__:`, which Python
+removes entirely when run with -O:
+    python -O main.py
+
+Environment variables (override the arguments)
+- MAZE_LOG_DIR: directory of the log file, defaults to ./logs next to this file
+- MAZE_LOG_LEVEL: root level, e.g. DEBUG
+- MAZE_LOG_LEVELS: per-module levels, e.g. "Maze=DEBUG,solver=WARNING"
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+from typing import Dict, Optional
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def parse_module_levels(text: str) -> Dict[str, str]:
+    """Parse "Maze=DEBUG,solver=WARNING" into {"Maze": "DEBUG", "solver": "WARNING"}"""
+    levels = {}
+    for item in text.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging(level: str = "INFO", logFile: Optional[str] = "maze_solver.log", console: bool = True,
+                  moduleLevels: Optional[Dict[str, str]] = None, consoleLevel: str = "INFO") -> logging.handlers.QueueListener:
+    """
+    Route all logging through a QueueHandler, with a QueueListener thread doing the actual writes.
+    Safe to call again: the previous listener is stopped and replaced
+
+    Parameters
+    ----------
+    level : str
+        Level of the root logger
+    logFile : str or None
+        File name inside MAZE_LOG_DIR (or an absolute path), None for no log file. Overwritten on every run
+    console : bool
+        Also write to stderr, at consoleLevel
+    moduleLevels : dict
+        Levels of individual loggers, e.g. {"Maze": "WARNING", "solver": "DEBUG"}
+    Returns
+    -------
+    The running QueueListener (stopped automatically at exit)
+    """
+    global _listener
+    level = os.environ.get("MAZE_LOG_LEVEL", level).upper()
+    moduleLevels = dict(moduleLevels or {})
+    moduleLevels.update(parse_module_levels(os.environ.get("MAZE_LOG_LEVELS", "")))
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if logFile:
+        logDirectory = os.environ.get("MAZE_LOG_DIR", DEFAULT_LOG_DIR)
+        logPath = logFile if os.path.isabs(logFile) else os.path.join(logDirectory, logFile)
+        os.makedirs(os.path.dirname(logPath), exist_ok=True)
+        fileHandler = logging.FileHandler(logPath, mode="w")
+        fileHandler.setFormatter(formatter)
+        handlers.append(fileHandler)
+    if console:
+        consoleHandler = logging.StreamHandler()
+        consoleHandler.setLevel(consoleLevel)
+        consoleHandler.setFormatter(formatter)
+        handlers.append(consoleHandler)
+
+    if _listener is not None:
+        _listener.stop()
+    # Unbounded queue: putting a record never blocks the simulation thread
+    recordQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(recordQueue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(recordQueue))
+    root.setLevel(level)
+    for name, moduleLevel in moduleLevels.items():
+        logging.getLogger(name).setLevel(moduleLevel)
+    return _listener
+
+def shutdown_logging() -> None:
+    "Flush the queue and stop the background writer"
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
+# Driver code to test the setup
+if __name__ == "__main__":
+    setup_logging(level="DEBUG", moduleLevels={"quiet": "WARNING"})
+    logging.getLogger(__name__).info("Logging initialized, log directory: %s", os.environ.get("MAZE_LOG_DIR", DEFAULT_LOG_DIR))
+    logging.getLogger("quiet").info("This message is filtered out by the per-module level")
+    if __debug__:
+        logging.getLogger(__name__).debug("Step-level trace, removed under python -O")
@@ -4,6 +4,7 @@ import random
 import Maze
 import time
 import solver
+import logger_config
 from settings import Colors, GameState
 from app import mainMazeProgram
 pygame.init()
@@ -19,22 +20,25 @@ def show_message(screen, text, position, color=(255, 255, 255)):
 
 # TODO: define these wrapper stuff, or also use PyTest
 def SeedRetrieval(func):
-    "time-based pseudo-random seed generator and retrieval"
-    # https://stackoverflow.com/questions/5012560/how-to-query-seed-used-by-random-random
-    def wrapper(*args, **kwargs):
-        seed = random.Random(sys.maxsize)
-        func()
+    """Seed the wrapped call: reuse the `seed=` keyword if given, otherwise draw a fresh seed, and print it so the
+    run can be replayed. The wrapped function must accept a `seed` keyword, like Maze.MazeMap and solver.Mouse
+    Example: `maze = SeedRetrieval(Maze.MazeMap)(800, 800, 20)`"""
+    def wrapper(*args, seed=None, **kwargs):
+        if seed is None:
+            seed = random.SystemRandom().randrange(sys.maxsize)
         print('Generated Seed: ', seed)
+        return func(*args, seed=seed, **kwargs)
     return wrapper
 
 def runTimeCounter(func):
-    "Counting time"
+    "Counting time, see benchmark.py for repeated trials, memory and JSON results"
     def wrapper(*args, **kwargs):
         start_time = time.perf_counter()
-        func()
+        result = func(*args, **kwargs)
         end_time = time.perf_counter()
         runtime = end_time - start_time
         print(f"The code took {runtime:.4f} seconds to run.")
+        return result
     return wrapper
 
 def checkObjectAttributes(object):
@@ -43,6 +47,7 @@ def checkObjectAttributes(object):
 
 # --- Driver Code ---
 if __name__ == "__main__":
+    logger_config.setup_logging()
     # New maze new mouse who dis?
     new_maze = Maze.MazeMap(mazeWidth=800, mazeHeight=800, cellSize=20 ,startX=0, startY=0)
     new_mouse = solver.Mouse(maze=new_maze) # referencing the maze to the mouse for solving
@@ -0,0 +1,280 @@
+# Single-file archive of many mazes, with a metadata index for random access by id or by filter
+"""File layout (all integers little-endian)
+    b"MAZEARC1"                                   file magic, 8 bytes
+    record 0, record 1, ...                       appended one after the other
+    index                                         INDEX_DTYPE array, one entry per record, in id order
+    footer                                        b"MAZEIDX1", index offset (u8), record count (u8)
+    record n, ..., index, footer                  every later writer session appends its records, then a new
+                                                  index of all the records and a new footer: the last footer wins
+
+Every record is a RECORD_DTYPE header followed by the cols * rows bytes of its wall bitmap (see wall_bitmap). The
+headers repeat the metadata of the index, so the index is only a cache: an archive whose writer died before writing
+the footer is recovered by scanning the records (rebuild_index), stepping over the index and footer of earlier
+sessions and dropping a torn last record.
+
+- Records get consecutive ids, so looking up an id is index[id]: O(1), no search
+- Metadata per record: id, seed, generator, cols, rows, solution length (cells on the shortest path from the top-left
+  to the bottom-right corner, 0 if unreachable) and dead ends (cells with a single opening)
+- Filters are vectorized comparisons over the whole index array
+- Reads go through np.memmap: opening a 100k-maze archive reads only the index, a maze is a zero-copy view into the
+  mapped file
+- The file only ever grows: appending never rewrites bytes a reader may have mapped, so an open MazeArchive keeps
+  seeing the archive as it was when it was opened. The price is one stale index per writer session. There is one
+  writer at a time (an exclusive lock on the file); parallel generators feed it, see write_corpus and
+  batch_generate --archive
+
+Usage:
+    with ArchiveWriter("corpus.mza") as writer:
+        writer.append(bitmap, seed=0, generator="dfs")
+    archive = MazeArchive("corpus.mza")
+    bitmap = archive[42]
+    ids = archive.filter(generator="kruskal", minSolution=100)
+"""
+import os
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import wall_bitmap
+import distance_map
+
+try:
+    import fcntl
+except ImportError: # Windows: no advisory locking, one writer at a time is then up to the caller
+    fcntl = None
+
+FILE_MAGIC = b"MAZEARC1"
+RECORD_MAGIC = b"MREC"
+FOOTER_MAGIC = b"MAZEIDX1"
+_METADATA_FIELDS = [("id", "<u8"), ("seed", "<i8"), ("generator", "S16"), ("cols", "<u4"), ("rows", "<u4"),
+                    ("solution_length", "<i4"), ("dead_ends", "<i4")]
+RECORD_DTYPE = np.dtype([("magic", "S4")] + _METADATA_FIELDS)
+INDEX_DTYPE = np.dtype(_METADATA_FIELDS + [("offset", "<u8")]) # offset of the bitmap bytes in the file
+FOOTER_DTYPE = np.dtype([("magic", "S8"), ("index_offset", "<u8"), ("count", "<u8")])
+
+def maze_metadata(bitmap: np.ndarray) -> Tuple[int, int]:
+    """Solution length (cells on the shortest path corner to corner, 0 if unreachable) and number of dead ends"""
+    cols, rows = bitmap.shape
+    distance = int(distance_map.distance_transform(bitmap, [(0, 0)])[cols - 1, rows - 1])
+    solutionLength = distance + 1 if distance != distance_map.UNREACHABLE else 0
+    return solutionLength, int(np.count_nonzero(wall_bitmap.degrees(bitmap) == 1))
+
+def _read_footer(data: np.ndarray) -> Optional[np.void]:
+    "Footer of a mapped archive, None when it is missing (writer died before closing)"
+    if len(data) < len(FILE_MAGIC) + FOOTER_DTYPE.itemsize:
+        return None
+    footer = data[-FOOTER_DTYPE.itemsize:].view(FOOTER_DTYPE)[0]
+    if footer["magic"] != FOOTER_MAGIC:
+        return None
+    indexEnd = footer["index_offset"] + footer["count"] * INDEX_DTYPE.itemsize
+    return footer if indexEnd == len(data) - FOOTER_DTYPE.itemsize else None
+
+def rebuild_index(data: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Recover the index of a mapped archive by walking the record headers from the start of the file
+
+    Returns
+    -------
+    (index, end) with end the offset just after the last complete record, where appending resumes
+    """
+    entries = []
+    position = len(FILE_MAGIC)
+    while position + RECORD_DTYPE.itemsize <= len(data):
+        # The index and footer closing an earlier writer session: the footer points back at the index
+        staleEnd = position + len(entries) * INDEX_DTYPE.itemsize + FOOTER_DTYPE.itemsize
+        if staleEnd <= len(data):
+            footer = data[staleEnd - FOOTER_DTYPE.itemsize:staleEnd].view(FOOTER_DTYPE)[0]
+            if footer["magic"] == FOOTER_MAGIC and footer["index_offset"] == position and footer["count"] == len(entries):
+                position = staleEnd
+                continue
+        header = data[position:position + RECORD_DTYPE.itemsize].view(RECORD_DTYPE)[0]
+        dataStart = position + RECORD_DTYPE.itemsize
+        dataEnd = dataStart + int(header["cols"]) * int(header["rows"])
+        if header["magic"] != RECORD_MAGIC or header["id"] != len(entries) or dataEnd > len(data):
+            break
+        entries.append(tuple(header[name] for name, _ in _METADATA_FIELDS) + (dataStart,))
+        position = dataEnd
+    return np.array(entries, dtype=INDEX_DTYPE), position
+
+class ArchiveWriter:
+    """
+    Append mazes to an archive, creating it if needed. Use as a context manager, or call close(): the index is only
+    written on close
+
+    Parameters
+    ----------
+    path : str
+        Archive file. An existing archive is appended to, recovering its index first if it was not closed properly
+    """
+    def __init__(self, path: str):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "r+b" if exists else "w+b")
+        try:
+            if fcntl is not None:
+                # Fails straight away rather than waiting if another writer holds the archive
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if exists:
+                self._resume()
+            else:
+                self.file.write(FILE_MAGIC)
+                self.entries = []
+        except BaseException:
+            self.file.close() # also releases the lock
+            raise
+
+    def _resume(self) -> None:
+        "Load the entries of the existing archive and move to where the next record goes"
+        data = np.memmap(self.path, dtype=np.uint8, mode="r")
+        if bytes(data[:len(FILE_MAGIC)]) != FILE_MAGIC:
+            raise ValueError(f"{self.path} is not a maze archive")
+        footer = _read_footer(data)
+        if footer is not None:
+            indexOffset = int(footer["index_offset"])
+            index = data[indexOffset:indexOffset + int(footer["count"]) * INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+            end = len(data) # after the footer, which stays for the readers that use it
+        else:
+            index, end = rebuild_index(data)
+        self.entries = [tuple(entry) for entry in index.tolist()]
+        if end < len(data):
+            # Only the torn record of a crashed session is cut off: no index refers to it, no reader reads it
+            self.file.truncate(end)
+        self.file.seek(end)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def append(self, bitmap: np.ndarray, seed: int = -1, generator: str = "",
+               metadata: Optional[Tuple[int, int]] = None) -> int:
+        """Append one maze and return its id. metadata is (solution length, dead ends), computed if not given"""
+        bitmap = np.ascontiguousarray(bitmap, dtype=np.uint8)
+        cols, rows = bitmap.shape
+        solutionLength, deadEnds = metadata if metadata is not None else maze_metadata(bitmap)
+        recordId = len(self.entries)
+        header = np.array([(RECORD_MAGIC, recordId, seed, generator.encode(), cols, rows, solutionLength, deadEnds)],
+                          dtype=RECORD_DTYPE)
+        self.file.write(header.tobytes())
+        self.entries.append((recordId, seed, generator.encode(), cols, rows, solutionLength, deadEnds, self.file.tell()))
+        self.file.write(bitmap.tobytes())
+        return recordId
+
+    def close(self) -> None:
+        "Write the index and the footer after the last record, then release the file"
+        if self.file.closed:
+            return
+        indexOffset = self.file.tell()
+        self.file.write(np.array(self.entries, dtype=INDEX_DTYPE).tobytes())
+        self.file.write(np.array([(FOOTER_MAGIC, indexOffset, len(self.entries))], dtype=FOOTER_DTYPE).tobytes())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class MazeArchive:
+    """
+    Read-only, memory-mapped view of an archive
+
+    archive[i] is the wall bitmap of maze i (a read-only view into the file), archive.index the metadata of all mazes
+    as a structured array with the fields of INDEX_DTYPE
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self.data[:len(FILE_MAGIC)]) != FILE_MAGIC:
+            raise ValueError(f"{path} is not a maze archive")
+        footer = _read_footer(self.data)
+        if footer is None:
+            # Not closed properly: usable, but the index has to be rebuilt by a full scan
+            self.index, _ = rebuild_index(self.data)
+        else:
+            indexOffset = int(footer["index_offset"])
+            self.index = self.data[indexOffset:indexOffset + int(footer["count"]) * INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, recordId: int) -> np.ndarray:
+        entry = self.index[recordId]
+        offset, cols, rows = int(entry["offset"]), int(entry["cols"]), int(entry["rows"])
+        return self.data[offset:offset + cols * rows].reshape(cols, rows)
+
+    def metadata(self, recordId: int) -> Dict[str, object]:
+        entry = self.index[recordId]
+        return {name: (entry[name].decode() if name == "generator" else int(entry[name])) for name, _ in _METADATA_FIELDS}
+
+    def filter(self, generator: Optional[str] = None, cols: Optional[int] = None, rows: Optional[int] = None,
+               seed: Optional[int] = None, minSolution: Optional[int] = None, maxSolution: Optional[int] = None,
+               minDeadEnds: Optional[int] = None, maxDeadEnds: Optional[int] = None) -> np.ndarray:
+        """Ids of the mazes matching every given criterion (bounds are inclusive)"""
+        index = self.index
+        keep = np.ones(len(index), dtype=bool)
+        for field, value in (("generator", generator and generator.encode()), ("cols", cols), ("rows", rows), ("seed", seed)):
+            if value is not None:
+                keep &= index[field] == value
+        for field, low, high in (("solution_length", minSolution, maxSolution), ("dead_ends", minDeadEnds, maxDeadEnds)):
+            if low is not None:
+                keep &= index[field] >= low
+            if high is not None:
+                keep &= index[field] <= high
+        return index["id"][keep]
+
+def _generate_record(task: Tuple[str, int, int, int], validate: bool = False) -> Tuple[bytes, int, int]:
+    "Worker entry point: the maze and its metadata, so the single writer only copies bytes"
+    from batch_generate import generate_bitmap # batch_generate imports this module for --archive
+    bitmap = generate_bitmap(*task, validate=validate)
+    return (bitmap.tobytes(),) + maze_metadata(bitmap)
+
+def _generate_validated_record(task: Tuple[str, int, int, int]) -> Tuple[bytes, int, int]:
+    return _generate_record(task, validate=True)
+
+def write_corpus(path: str, tasks: Iterable[Tuple[str, int, int, int]], workers: Optional[int] = None,
+                 chunksize: int = 16, validate: bool = False) -> int:
+    """Generate (generator, cols, rows, seed) tasks in a process pool and append them to the archive in task order.
+    With validate every maze is checked to be perfect before it is archived (see maze_validator).
+    Return the number of mazes in the archive"""
+    from concurrent.futures import ProcessPoolExecutor
+    tasks = list(tasks)
+    worker = _generate_validated_record if validate else _generate_record
+    with ArchiveWriter(path) as writer, ProcessPoolExecutor(max_workers=workers) as pool:
+        for (generator, cols, rows, seed), (data, solutionLength, deadEnds) in zip(
+                tasks, pool.map(worker, tasks, chunksize=chunksize)):
+            bitmap = np.frombuffer(data, dtype=np.uint8).reshape(cols, rows)
+            writer.append(bitmap, seed, generator, (solutionLength, deadEnds))
+        return len(writer)
+
+# Driver code: archive a few mazes, reopen, append, filter, and recover an archive that was never closed
+if __name__ == "__main__":
+    import tempfile
+    import time
+    from batch_generate import GENERATORS
+    path = os.path.join(tempfile.gettempdir(), "maze_archive_test.mza")
+    if os.path.exists(path):
+        os.remove(path)
+    start_time = time.perf_counter()
+    count = write_corpus(path, [(GENERATORS[i % 4], 16, 16, i) for i in range(400)])
+    print(f"Archived {count} mazes in {time.perf_counter() - start_time:.2f} seconds, {os.path.getsize(path)} bytes")
+    archive = MazeArchive(path)
+    print("Maze 7:", archive.metadata(7))
+    print("Kruskal mazes with a solution of 60+ cells:", len(archive.filter(generator="kruskal", minSolution=60)))
+
+    with ArchiveWriter(path) as writer:
+        writer.append(archive[0], seed=0, generator="dfs")
+    print(f"Reader opened before the append still sees {len(archive)} mazes, a new one {len(MazeArchive(path))}")
+    writer = ArchiveWriter(path)
+    writer.append(archive[1], seed=1, generator="kruskal")
+    writer.file.close() # simulate a crash: no index, no footer for this session
+    recovered = MazeArchive(path)
+    print(f"Recovered {len(recovered)} records by scanning, last ones equal to the first two: "
+          f"{np.array_equal(recovered[400], recovered[0]) and np.array_equal(recovered[401], recovered[1])}")
+    notArchive = path + ".txt"
+    with open(notArchive, "wb") as file:
+        file.write(b"not a maze archive")
+    try:
+        ArchiveWriter(notArchive)
+    except ValueError as error:
+        print("Not an archive:", error)
+    with ArchiveWriter(path) as writer: # the lock of the failed writer was released
+        print(f"Reopened with {len(writer)} mazes")
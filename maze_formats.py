@@ -0,0 +1,214 @@
+# Readers and writers of the standard micromouse maze files, straight to and from wall bitmaps
+"""Formats (see wall_bitmap for the bitmap, indexed [x][y] with y = 0 the top row)
+- maz:  the binary competition format, one byte per cell (256 bytes for the classic 16x16). The wall bits are the
+        same as the bitmap's (North 1, East 2, South 4, West 8) but the cells are stored column by column starting
+        from the bottom-left corner, the start cell, so the file is the bitmap with its y axis flipped. Bits above the
+        four walls (visited flags of some tools) are dropped. The file has no header, so the size is inferred as square
+        and only square mazes are written
+- text: the ASCII art of the maze collections, 4 characters by 2 lines per cell, top row first:
+            o---o---o
+            |       |
+            o   o---o
+        Any character on a wall position counts as a wall, so '+', '-', '_' and '|' variants read as well, and marks
+        in the middle of the cells (S, G) are ignored
+- png:  1-bit black and white pictures, see maze_image
+- json: the format of MazeMap.save2file
+
+Every conversion is a handful of NumPy slicing operations on the whole grid, no Cell is created.
+The format of a file comes from its extension (FORMAT_EXTENSIONS), anything else is taken for json.
+
+Usage:
+    bitmap = read_maze("japan2019.maz")
+    write_maze("japan2019.txt", bitmap)
+    python maze_formats.py mazes/ converted/ --to text --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+import wall_bitmap
+from wall_bitmap import TOP, RIGHT, BOTTOM, LEFT
+
+FORMAT_EXTENSIONS = {".maz": "maz", ".txt": "text", ".png": "png", ".json": "json"}
+EXTENSIONS = {"maz": ".maz", "text": ".txt", "png": ".png", "json": ".json"}
+POST, HORIZONTAL_WALL, VERTICAL_WALL = "o", "-", "|"
+
+def format_of(path: str) -> str:
+    return FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "json")
+
+# ----------------------------------------------------------------------------------
+# maz
+def maz_to_bitmap(data: bytes, rows: Optional[int] = None) -> np.ndarray:
+    """Bitmap of a .maz file content. rows defaults to the side of a square maze"""
+    cells = np.frombuffer(data, dtype=np.uint8)
+    if rows is None:
+        rows = int(round(len(cells) ** 0.5))
+    if rows == 0 or len(cells) % rows:
+        raise ValueError(f"{len(cells)} bytes do not make a maze of {rows} rows")
+    return cells.reshape(-1, rows)[:, ::-1] & wall_bitmap.ALL_WALLS
+
+def bitmap_to_maz(bitmap: np.ndarray) -> bytes:
+    """.maz content of a square bitmap. Any other shape is refused, maz_to_bitmap could not read it back"""
+    cols, rows = bitmap.shape
+    if cols != rows:
+        raise ValueError(f"A .maz file holds square mazes only, not {cols}x{rows}")
+    return np.ascontiguousarray(bitmap[:, ::-1], dtype=np.uint8).tobytes()
+
+# ----------------------------------------------------------------------------------
+# Wall lines, the drawing order of the text and image formats:
+# - horizontal[y, x]: wall above the cell (x, y), shape (rows + 1, cols), row `rows` being the bottom edge
+# - vertical[y, x]:   wall left of the cell (x, y), shape (rows, cols + 1), column `cols` being the right edge
+def lines_to_bitmap(horizontal: np.ndarray, vertical: np.ndarray) -> np.ndarray:
+    """Bitmap of the wall lines. Both cells along a wall get it, so the result is always consistent"""
+    bitmap = horizontal[:-1] * np.uint8(TOP) # uint8 all along, int64 temporaries would take 8 bytes per cell
+    bitmap |= horizontal[1:] * np.uint8(BOTTOM)
+    bitmap |= vertical[:, :-1] * np.uint8(LEFT)
+    bitmap |= vertical[:, 1:] * np.uint8(RIGHT)
+    return np.ascontiguousarray(bitmap.T)
+
+def bitmap_to_lines(bitmap: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Wall lines of a bitmap. A wall present on either side is drawn"""
+    cols, rows = bitmap.shape
+    cells = np.ascontiguousarray(bitmap.T) # [y][x], the line order, one strided pass instead of one per test
+    horizontal = np.zeros((rows + 1, cols), dtype=bool)
+    horizontal[:-1] |= (cells & TOP) != 0
+    horizontal[1:] |= (cells & BOTTOM) != 0
+    vertical = np.zeros((rows, cols + 1), dtype=bool)
+    vertical[:, :-1] |= (cells & LEFT) != 0
+    vertical[:, 1:] |= (cells & RIGHT) != 0
+    return horizontal, vertical
+
+# ----------------------------------------------------------------------------------
+# text
+def text_to_bitmap(text: str) -> np.ndarray:
+    """Bitmap of an ASCII art maze"""
+    lines = text.rstrip("\n").split("\n")
+    lines = [line.rstrip() for line in lines]
+    rows, cols = (len(lines) - 1) // 2, (max(len(line) for line in lines) - 1) // 4
+    if rows < 1 or cols < 1:
+        raise ValueError("Not an ASCII maze: at least 3 lines of 5 characters are needed")
+    width = 4 * cols + 1
+    chars = np.frombuffer("".join(line.ljust(width)[:width] for line in lines[:2 * rows + 1]).encode("ascii", "replace"),
+                          dtype=np.uint8).reshape(2 * rows + 1, width)
+    # The middle dash of every horizontal wall, the bar of every vertical wall
+    return lines_to_bitmap(chars[::2, 2::4] != ord(" "), chars[1::2, ::4] != ord(" "))
+
+def bitmap_to_text(bitmap: np.ndarray) -> str:
+    """ASCII art of a bitmap"""
+    cols, rows = bitmap.shape
+    horizontal, vertical = bitmap_to_lines(bitmap)
+    chars = np.full((2 * rows + 1, 4 * cols + 2), ord(" "), dtype=np.uint8)
+    chars[:, -1] = ord("\n")
+    chars[::2, :-1:4] = ord(POST)
+    for offset in (1, 2, 3): # the three dashes of a horizontal wall
+        chars[::2, offset:-1:4][horizontal] = ord(HORIZONTAL_WALL)
+    chars[1::2, :-1:4][vertical] = ord(VERTICAL_WALL)
+    return chars.tobytes().decode("ascii")
+
+# ----------------------------------------------------------------------------------
+# json
+def json_to_bitmap(data: bytes) -> np.ndarray:
+    maze_data = json.loads(data)
+    walls = np.array(maze_data["walls"], dtype=bool).reshape(maze_data["cols"], maze_data["rows"], 4)
+    return (walls @ np.array(wall_bitmap.WALL_BITS)).astype(np.uint8)
+
+def bitmap_to_json(bitmap: np.ndarray, cellSize: int = 20) -> bytes:
+    cols, rows = bitmap.shape
+    return json.dumps({"cols": cols, "rows": rows, "cellSize": cellSize, "generator": None, "seed": None,
+                       "walls": wall_bitmap.to_wall_lists(bitmap)}).encode()
+
+# ----------------------------------------------------------------------------------
+def decode(data: bytes, fileFormat: str) -> np.ndarray:
+    if fileFormat == "maz":
+        return maz_to_bitmap(data)
+    if fileFormat == "text":
+        return text_to_bitmap(data.decode("ascii", "replace"))
+    if fileFormat == "png":
+        import maze_image # imports this module
+        return maze_image.png_to_bitmap(data)
+    return json_to_bitmap(data)
+
+def encode(bitmap: np.ndarray, fileFormat: str) -> bytes:
+    if fileFormat == "maz":
+        return bitmap_to_maz(bitmap)
+    if fileFormat == "text":
+        return bitmap_to_text(bitmap).encode("ascii")
+    if fileFormat == "png":
+        import maze_image
+        return maze_image.bitmap_to_png(bitmap)
+    return bitmap_to_json(bitmap)
+
+def read_maze(path: str) -> np.ndarray:
+    """Wall bitmap of a maze file, in the format given by its extension"""
+    with open(path, "rb") as file:
+        return decode(file.read(), format_of(path))
+
+def write_maze(path: str, bitmap: np.ndarray) -> None:
+    data = encode(bitmap, format_of(path)) # before opening, a maze that cannot be encoded leaves no empty file
+    with open(path, "wb") as file:
+        file.write(data)
+
+# ----------------------------------------------------------------------------------
+# Bulk conversion
+def _convert_file(job: Tuple[str, str]) -> Optional[str]:
+    "Worker entry point, returns the error message of a file that could not be converted"
+    source, destination = job
+    try:
+        write_maze(destination, read_maze(source))
+    except (OSError, ValueError, KeyError, UnicodeError) as error:
+        return f"{source}: {error}"
+    return None
+
+def convert_directory(source: str, destination: str, fileFormat: str, workers: Optional[int] = None,
+                      chunksize: int = 64) -> Tuple[int, List[str]]:
+    """
+    Convert every maze file under source (recursively) to fileFormat, mirroring the directory tree under destination
+
+    Parameters
+    ----------
+    fileFormat : str
+        "maz", "text" or "json"
+    workers : int or None
+        Number of worker processes, defaults to the number of CPUs
+    Returns
+    -------
+    (number of files converted, error messages of the files that failed)
+    """
+    jobs = []
+    for directory, _, files in os.walk(source):
+        target = os.path.join(destination, os.path.relpath(directory, source))
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in FORMAT_EXTENSIONS:
+                os.makedirs(target, exist_ok=True)
+                jobs.append((os.path.join(directory, name),
+                             os.path.join(target, os.path.splitext(name)[0] + EXTENSIONS[fileFormat])))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        errors = [error for error in pool.map(_convert_file, jobs, chunksize=chunksize) if error]
+    return len(jobs) - len(errors), errors
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert micromouse maze files (.maz, .txt, .png, .json)")
+    parser.add_argument("source", help="maze file or directory of maze files")
+    parser.add_argument("destination", nargs="?", default=None, help="output file or directory, omit to print the maze")
+    parser.add_argument("--to", choices=sorted(EXTENSIONS), default="text", help="output format of a directory")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source):
+        bitmap = read_maze(args.source)
+        if args.destination:
+            write_maze(args.destination, bitmap)
+        else:
+            print(bitmap_to_text(bitmap), end="")
+        return
+    start_time = time.perf_counter()
+    converted, errors = convert_directory(args.source, args.destination or args.source, args.to, args.workers)
+    for error in errors:
+        print(error)
+    print(f"Converted {converted} mazes to {args.to} in {time.perf_counter() - start_time:.2f} seconds")
+
+if __name__ == "__main__":
+    main()
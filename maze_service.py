@@ -0,0 +1,438 @@
+# Localhost maze service: a small asyncio HTTP/JSON front end, generation and solving done in a process pool
+"""Endpoints
+    POST /generate   JSON {"generator": "dfs", "cols": 64, "rows": 64, "seed": 0}
+                     -> application/octet-stream, the wall bitmap (cols * rows bytes, see wall_bitmap), with the
+                        headers X-Maze-Cols, X-Maze-Rows, X-Maze-Seed and X-Maze-Generator
+    POST /solve      JSON {"solver": "bfs", "generator": "dfs", "cols": 64, "rows": 64, "seed": 0}, a maze from a seed
+                     or an application/octet-stream bitmap body with /solve?solver=bfs&cols=64&rows=64
+                     -> JSON {"solved": true, "path": [[x, y], ...], "expanded": 123}
+    GET  /stats      -> JSON counters of the service
+
+Flow
+- Requests are put on a bounded asyncio.Queue. When it is full the service answers 503 with Retry-After straight
+  away (backpressure) instead of letting the latency of every client grow without limit
+- A dispatcher takes up to batchSize jobs off the queue (waiting at most batchDelay seconds for a batch to fill) and
+  sends them to a worker process as one task, so small mazes do not pay one inter-process round trip each
+- At most one batch per worker is in flight, the rest waits in the queue
+- Bitmaps travel as raw bytes: no JSON encoding of the walls, no numpy arrays pickled between processes
+- Uploaded bitmaps must be consistent (both sides of every wall agree) and closed by the outer walls, see
+  maze_validator.check_walls, or the request answers 400
+- A job failing on its input answers 400; a worker failure (a crashed worker process included) answers 500 and the
+  pool is replaced. stop() answers the requests in flight, closes the idle connections, then shuts the pool down
+
+Everything runs on the local machine, the clients only need HTTP (no pygame):
+    python maze_service.py serve --port 8765 --workers 4
+    curl -s -X POST localhost:8765/generate -d '{"generator": "kruskal", "cols": 32, "rows": 32, "seed": 1}' > maze.bin
+    python maze_service.py load --requests 2000 --concurrency 64 --size 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import statistics
+import time
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import numpy as np
+import Maze
+import solver
+import logger_config
+import maze_validator
+from batch_generate import GENERATORS, generate_bitmap
+
+logger = logging.getLogger(__name__)
+
+MAX_CELLS = 2000 * 2000 # larger requests are refused with 413
+MAX_HEADER_BYTES = 16 * 1024
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+class RequestError(Exception):
+    """A request the service refuses, answered with the given HTTP status"""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# ----------------------------------------------------------------------------------
+# Worker side: plain functions of picklable tuples
+def solve_bitmap(solverName: str, bitmap: np.ndarray, seed: int = 0) -> Dict[str, object]:
+    """Solve a maze given as a wall bitmap from the top-left to the bottom-right corner"""
+    mouse = solver.Mouse(Maze.MazeMap.fromBitmap(bitmap, cellSize=1), seed=seed)
+    solved = mouse.runToCompletion(solverName)
+    return {"solved": solved, "path": [list(cell) for cell in mouse.finalPath], "expanded": mouse.nodesExpanded(solverName)}
+
+def _run_job(job: tuple) -> object:
+    kind = job[0]
+    if kind == "generate":
+        _, generator, cols, rows, seed = job
+        return generate_bitmap(generator, cols, rows, seed).tobytes()
+    _, solverName, cols, rows, seed, maze = job
+    if isinstance(maze, str):
+        # Maze given by its generator name, generated from the same seed
+        bitmap = generate_bitmap(maze, cols, rows, seed)
+    else:
+        bitmap = np.frombuffer(maze, dtype=np.uint8).reshape(cols, rows)
+    return solve_bitmap(solverName, bitmap, seed)
+
+def _ignore_interrupt() -> None:
+    "Worker initializer: Ctrl-C reaches the whole process group, the service shuts the pool down itself"
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _run_batch(jobs: List[tuple]) -> List[Tuple[bool, object]]:
+    "Worker entry point: run a batch of jobs, a failing job only fails its own request"
+    results = []
+    for job in jobs:
+        try:
+            results.append((True, _run_job(job)))
+        except Exception as error:
+            results.append((False, f"{type(error).__name__}: {error}"))
+    return results
+
+# ----------------------------------------------------------------------------------
+# Server side
+class MazeService:
+    """
+    asyncio front end dispatching batches of jobs to a process pool
+
+    Parameters
+    ----------
+    workers : int or None
+        Worker processes, defaults to the number of CPUs
+    queueSize : int
+        Jobs waiting for a worker before new requests get 503
+    batchSize : int
+        Most jobs sent to a worker at once
+    batchDelay : float
+        Seconds the dispatcher waits for a batch to fill once it has a first job
+    """
+    def __init__(self, workers: Optional[int] = None, queueSize: int = 256, batchSize: int = 16, batchDelay: float = 0.002):
+        self.workers = workers or os.cpu_count() or 1
+        self.queueSize = queueSize
+        self.batchSize = batchSize
+        self.batchDelay = batchDelay
+        self.stats = {"requests": 0, "rejected": 0, "errors": 0, "jobs": 0, "batches": 0}
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.server: Optional[asyncio.base_events.Server] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._idle: set = set() # connections waiting for their next request
+        self._stopping = False
+
+    def _newPool(self) -> ProcessPoolExecutor:
+        # Forked workers would inherit the sockets of the connections open at the time: a client closed by the
+        # service would never see the end of its connection while a worker lives. Workers start from a clean process
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_ignore_interrupt)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self.pool = self._newPool()
+        self.queue = asyncio.Queue(maxsize=self.queueSize)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("Maze service listening on %s:%d with %d workers", host, self.port, self.workers)
+
+    async def stop(self) -> None:
+        """Stop accepting, close the idle connections, answer the pending requests then shut the pool down.
+        Connections busy with a request get their answer (503 for the jobs still queued) before being closed"""
+        self._stopping = True
+        self.server.close()
+        for writer in list(self._idle):
+            writer.close()
+        self._dispatcher.cancel()
+        while not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RequestError(503, "Service shutting down"))
+        # shutdown waits for the running batches: off the event loop, which still has to deliver their results
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(self.pool.shutdown, cancel_futures=True))
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def submit(self, job: tuple) -> object:
+        """Queue a job and wait for its result. Raise RequestError(503) at once if the queue is full"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((job, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise RequestError(503, "Too many pending requests, retry later")
+        ok, result = await future # worker failures come as RequestError(500), set by _finish_batch
+        if not ok:
+            raise RequestError(400, result)
+        return result
+
+    async def _dispatch(self) -> None:
+        "Collect batches off the queue and run them in the pool, one batch per free worker"
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                await self._collect(batch, loop)
+            except asyncio.CancelledError:
+                self._fail_batch(batch, "Service shutting down", 503)
+                raise
+            self.stats["batches"] += 1
+            self.stats["jobs"] += len(batch)
+            pool = self.pool
+            try:
+                pending = loop.run_in_executor(pool, _run_batch, [job for job, _ in batch])
+            except BrokenProcessPool as error:
+                self._slots.release()
+                self._fail_batch(batch, f"Worker failed: {error}")
+                self._replace_pool(pool, error)
+                continue
+            pending.add_done_callback(lambda done, batch=batch, pool=pool: self._finish_batch(done, batch, pool))
+
+    async def _collect(self, batch: list, loop: asyncio.AbstractEventLoop) -> None:
+        "Fill a batch off the queue then wait for a free worker"
+        batch.append(await self.queue.get())
+        deadline = loop.time() + self.batchDelay
+        while len(batch) < self.batchSize:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self.queue.get_nowait())
+        await self._slots.acquire()
+
+    def _replace_pool(self, pool: ProcessPoolExecutor, error: BaseException) -> None:
+        "A worker died: the pool refuses any new work, replace it unless that was done already"
+        if pool is self.pool and not self._stopping:
+            logger.error("Worker pool broken (%s), starting a new one", error)
+            pool.shutdown(wait=False)
+            self.pool = self._newPool()
+
+    def _finish_batch(self, done: asyncio.Future, batch: list, pool: ProcessPoolExecutor) -> None:
+        self._slots.release()
+        if done.cancelled():
+            self._fail_batch(batch, "Worker pool shut down before running the request")
+            return
+        error = done.exception()
+        if error:
+            # The worker itself failed (BrokenProcessPool when it died): a server error, not a bad request
+            self._fail_batch(batch, f"Worker failed: {type(error).__name__}: {error}")
+            if isinstance(error, BrokenProcessPool):
+                self._replace_pool(pool, error)
+            return
+        for (_, future), result in zip(batch, done.result()):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail_batch(batch: list, message: str, status: int = 500) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RequestError(status, message))
+
+    # ------------------------------------------------------------------------------
+    # HTTP
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        "Serve the requests of one connection, kept alive until the client closes it or sends Connection: close"
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while not self._stopping:
+                self._idle.add(writer)
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                finally:
+                    self._idle.discard(writer)
+                if len(head) > MAX_HEADER_BYTES:
+                    break
+                requestLine, *headerLines = head.decode("latin-1").split("\r\n")
+                method, target, _ = requestLine.split(" ", 2)
+                headers = {}
+                for line in headerLines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_CELLS + 1024:
+                    await self._respond(writer, 413, {"error": "Request body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                self.stats["requests"] += 1
+                try:
+                    status, payload, extraHeaders = await self._route(method, target, headers, body)
+                except RequestError as error:
+                    status, payload, extraHeaders = error.status, {"error": str(error)}, {}
+                    if error.status == 503:
+                        extraHeaders = {"Retry-After": "1"}
+                    else:
+                        self.stats["errors"] += 1
+                close = headers.get("connection", "").lower() == "close" or self._stopping
+                await self._respond(writer, status, payload, extraHeaders, close)
+                if close:
+                    break
+        except ConnectionError:
+            pass # the client went away mid-request
+        except Exception:
+            logger.exception("Connection failed")
+        finally:
+            del self._connections[writer]
+            writer.close()
+
+    async def _route(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> tuple:
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if url.path == "/stats":
+            return 200, {**self.stats, "queued": self.queue.qsize(), "workers": self.workers}, {}
+        if url.path not in ("/generate", "/solve"):
+            raise RequestError(404, f"Unknown path: {url.path}")
+        if method != "POST":
+            raise RequestError(405, f"{url.path} only accepts POST")
+
+        binaryBody = headers.get("content-type", "").startswith("application/octet-stream")
+        if binaryBody:
+            fields, data = query, body
+        else:
+            try:
+                fields, data = {**query, **json.loads(body or b"{}")}, None
+            except ValueError:
+                raise RequestError(400, "Body is neither JSON nor application/octet-stream")
+        try:
+            cols, rows = int(fields["cols"]), int(fields["rows"])
+            seed = int(fields.get("seed", 0))
+        except (KeyError, ValueError):
+            raise RequestError(400, "cols and rows must be given as integers")
+        if not 0 < cols * rows <= MAX_CELLS or cols <= 0:
+            raise RequestError(413, f"The maze must have between 1 and {MAX_CELLS} cells")
+
+        if url.path == "/generate":
+            generator = fields.get("generator", "dfs")
+            if generator not in GENERATORS:
+                raise RequestError(400, f"Unknown generator: {generator}")
+            result = await self.submit(("generate", generator, cols, rows, seed))
+            return 200, result, {"X-Maze-Cols": cols, "X-Maze-Rows": rows, "X-Maze-Seed": seed, "X-Maze-Generator": generator}
+
+        solverName = fields.get("solver", "bfs")
+        if solverName not in solver.SOLVERS:
+            raise RequestError(400, f"Unknown solver: {solverName}")
+        if data is None:
+            generator = fields.get("generator", "dfs")
+            if generator not in GENERATORS:
+                raise RequestError(400, f"Unknown generator: {generator}")
+            job = ("solve", solverName, cols, rows, seed, generator)
+        else:
+            if len(data) != cols * rows:
+                raise RequestError(400, f"Bitmap of {len(data)} bytes does not match {cols}x{rows} cells")
+            # Walls set on one side only or a missing outer wall are refused before taking a worker.
+            # The check reads every cell (15 ms at MAX_CELLS), it runs off the event loop
+            bitmap = np.frombuffer(data, dtype=np.uint8).reshape(cols, rows)
+            problems = await asyncio.get_running_loop().run_in_executor(None, maze_validator.check_walls, bitmap)
+            if problems:
+                raise RequestError(400, "Invalid bitmap: " + "; ".join(problems))
+            job = ("solve", solverName, cols, rows, seed, data)
+        return 200, await self.submit(job), {}
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: object,
+                       extraHeaders: Optional[Dict[str, object]] = None, close: bool = False) -> None:
+        if isinstance(payload, bytes):
+            body, contentType = payload, "application/octet-stream"
+        else:
+            body, contentType = json.dumps(payload).encode(), "application/json"
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", f"Content-Type: {contentType}",
+                 f"Content-Length: {len(body)}", f"Connection: {'close' if close else 'keep-alive'}"]
+        lines += [f"{name}: {value}" for name, value in (extraHeaders or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+async def serve(host: str, port: int, **options) -> None:
+    service = MazeService(**options)
+    await service.start(host, port)
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.stop()
+
+# ----------------------------------------------------------------------------------
+# Load testing client
+async def _http_post(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str, payload: dict) -> Tuple[int, bytes]:
+    "One POST on a kept-alive connection, return the status and the body"
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    status = int(head.split(" ", 2)[1])
+    length = next(int(line.split(":", 1)[1]) for line in head.split("\r\n") if line.lower().startswith("content-length:"))
+    return status, await reader.readexactly(length)
+
+async def load_test(host: str, port: int, requests: int = 1000, concurrency: int = 32, path: str = "/generate",
+                    generator: str = "dfs", solverName: str = "bfs", size: int = 32) -> Dict[str, object]:
+    """Send `requests` requests over `concurrency` connections, return the throughput, latency percentiles and the
+    number of requests turned away with 503"""
+    latencies, statuses = [], {}
+    nextSeed = iter(range(requests))
+
+    async def client() -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for seed in nextSeed:
+                payload = {"generator": generator, "solver": solverName, "cols": size, "rows": size, "seed": seed}
+                start_time = time.perf_counter()
+                status, _ = await _http_post(reader, writer, path, payload)
+                latencies.append(time.perf_counter() - start_time)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    runtime = time.perf_counter() - start_time
+    latencies.sort()
+    return {"requests": requests, "seconds": runtime, "per_second": requests / runtime,
+            "p50_ms": statistics.median(latencies) * 1e3, "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1e3,
+            "statuses": statuses}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Localhost maze generation and solving service")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serveParser = commands.add_parser("serve", help="run the service")
+    serveParser.add_argument("--workers", type=int, default=None)
+    serveParser.add_argument("--queue", type=int, default=256, help="pending jobs before answering 503")
+    serveParser.add_argument("--batch", type=int, default=16)
+    serveParser.add_argument("--batch-delay", type=float, default=0.002)
+    loadParser = commands.add_parser("load", help="load test a running service")
+    loadParser.add_argument("--requests", type=int, default=1000)
+    loadParser.add_argument("--concurrency", type=int, default=32)
+    loadParser.add_argument("--path", choices=("/generate", "/solve"), default="/generate")
+    loadParser.add_argument("--generator", choices=GENERATORS, default="dfs")
+    loadParser.add_argument("--solver", choices=solver.SOLVERS, default="bfs")
+    loadParser.add_argument("--size", type=int, default=32)
+    for subparser in (serveParser, loadParser):
+        subparser.add_argument("--host", default="127.0.0.1")
+        subparser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        logger_config.setup_logging()
+        try:
+            asyncio.run(serve(args.host, args.port, workers=args.workers, queueSize=args.queue,
+                              batchSize=args.batch, batchDelay=args.batch_delay))
+        except KeyboardInterrupt:
+            pass
+        return
+    report = asyncio.run(load_test(args.host, args.port, args.requests, args.concurrency, args.path,
+                                   args.generator, args.solver, args.size))
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# Maze statistics computed with NumPy on stacks of wall bitmaps, for grading whole corpora at once
+"""All functions take a stack of wall bitmaps of shape (count, cols, rows) (a single (cols, rows) bitmap is treated
+as a stack of one) and return one value per maze. Nothing loops over cells in Python.
+
+Definitions (degree = number of open sides of a cell, see wall_bitmap.degrees)
+- dead ends:        cells of degree 1
+- junctions:        cells of degree 3 or 4
+- branching factor: mean over the junctions of (degree - 1), the number of new ways a junction offers to a walker
+                    coming through it. 0 for a maze without junctions
+- corridors:        maximal straight runs of connected cells, horizontal or vertical, counted in cells (a run of
+                    length 1 is a cell that opens on neither side along that axis). corridor_histogram gives their
+                    distribution, mean_corridor their average length
+- solution length:  cells on the shortest path from the top-left to the bottom-right corner, 0 if unreachable
+                    (matches len(Mouse.finalPath) of the BFS solver)
+- river factor:     share of the cells of degree 2 (plain passage cells). Long winding "rivers" (DFS) score about
+                    0.85, mazes made of many short dead-end branches (Prim, Kruskal, Wilson) about 0.4 to 0.5
+
+The solution length is a level-synchronous BFS run on a whole chunk of mazes at a time: every level expands the
+frontier of every maze in the chunk with four shifted mask operations, and mazes drop out of the chunk as soon as
+their goal is reached. Mazes larger than LARGE_MAZE_CELLS go one by one through distance_map instead, whose
+sparse frontier is much faster on long corridors.
+
+Usage:
+    python maze_stats.py corpus.mza --generator kruskal
+    python maze_stats.py corpus.bin --cols 16 --rows 16 --out stats.npz
+"""
+import argparse
+import time
+from typing import Dict, Optional
+import numpy as np
+import wall_bitmap
+import distance_map
+from maze_archive import MazeArchive
+
+LARGE_MAZE_CELLS = 256 * 256
+STAT_FIELDS = ("dead_ends", "junctions", "branching_factor", "mean_corridor", "solution_length", "river_factor")
+
+def _as_stack(bitmaps: np.ndarray) -> np.ndarray:
+    return bitmaps[np.newaxis] if bitmaps.ndim == 2 else bitmaps
+
+def degree_stack(bitmaps: np.ndarray) -> np.ndarray:
+    return wall_bitmap.degrees(_as_stack(bitmaps))
+
+def dead_end_counts(degrees: np.ndarray) -> np.ndarray:
+    return np.count_nonzero(degrees == 1, axis=(1, 2))
+
+def junction_counts(degrees: np.ndarray) -> np.ndarray:
+    return np.count_nonzero(degrees >= 3, axis=(1, 2))
+
+def branching_factors(degrees: np.ndarray) -> np.ndarray:
+    junctions = degrees >= 3
+    branches = np.where(junctions, degrees - 1, 0).sum(axis=(1, 2))
+    counts = np.count_nonzero(junctions, axis=(1, 2))
+    return np.divide(branches, counts, out=np.zeros(len(degrees)), where=counts > 0)
+
+def river_factors(degrees: np.ndarray) -> np.ndarray:
+    return np.count_nonzero(degrees == 2, axis=(1, 2)) / (degrees.shape[1] * degrees.shape[2])
+
+def _run_lengths(links: np.ndarray) -> tuple:
+    """Maze index and length in cells of every maximal run along the last axis of links, where links[..., i] tells
+    whether cell i is connected to cell i + 1"""
+    count, lines, _ = links.shape
+    padded = np.zeros((count, lines, links.shape[2] + 2), dtype=np.int8)
+    padded[:, :, 1:-1] = links
+    edges = np.diff(padded, axis=2)
+    # Starts and ends come out of nonzero in the same (maze, line, position) order, so they pair up
+    starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[2]
+    return starts[0], ends - starts[2] + 1
+
+def corridor_lengths(bitmaps: np.ndarray) -> tuple:
+    """Maze index and length of every straight corridor of at least two cells in the stack"""
+    stack = _as_stack(bitmaps)
+    _, openRight, openBottom, _ = wall_bitmap.open_masks(stack)
+    # Horizontal runs: lines are the rows, positions the columns
+    horizontalMazes, horizontalLengths = _run_lengths(openRight[:, :-1, :].transpose(0, 2, 1))
+    verticalMazes, verticalLengths = _run_lengths(openBottom[:, :, :-1])
+    return np.concatenate([horizontalMazes, verticalMazes]), np.concatenate([horizontalLengths, verticalLengths])
+
+def corridor_histogram(bitmaps: np.ndarray, maxLength: Optional[int] = None) -> np.ndarray:
+    """Array of shape (count, maxLength + 1): [i, k] is the number of straight corridors of k cells in maze i.
+    Cells in no corridor along an axis count as corridors of length 1 along it. Longer runs go in the last column"""
+    stack = _as_stack(bitmaps)
+    count, cols, rows = stack.shape
+    mazes, lengths = corridor_lengths(stack)
+    maxLength = maxLength or max(cols, rows)
+    histogram = np.bincount(mazes * (maxLength + 1) + np.minimum(lengths, maxLength),
+                            minlength=count * (maxLength + 1)).reshape(count, maxLength + 1)
+    # Every cell is covered once per axis: what the runs of 2+ cells leave out are runs of a single cell
+    histogram[:, 1] = 2 * cols * rows - np.bincount(mazes, weights=lengths, minlength=count).astype(np.int64)
+    return histogram
+
+def mean_corridors(bitmaps: np.ndarray) -> np.ndarray:
+    """Mean length of the straight corridors of at least two cells of every maze, 0 if there are none"""
+    stack = _as_stack(bitmaps)
+    mazes, lengths = corridor_lengths(stack)
+    totals = np.bincount(mazes, weights=lengths, minlength=len(stack))
+    counts = np.bincount(mazes, minlength=len(stack))
+    return np.divide(totals, counts, out=np.zeros(len(stack)), where=counts > 0)
+
+def solution_lengths(bitmaps: np.ndarray, chunkSize: int = 1024) -> np.ndarray:
+    """Cells on the shortest path from (0, 0) to (cols - 1, rows - 1) of every maze, 0 where the goal is unreachable"""
+    stack = _as_stack(bitmaps)
+    count, cols, rows = stack.shape
+    lengths = np.zeros(count, dtype=np.int64)
+    if cols * rows > LARGE_MAZE_CELLS:
+        for i, bitmap in enumerate(stack):
+            distance = distance_map.distance_transform(np.asarray(bitmap), [(0, 0)])[-1, -1]
+            lengths[i] = distance + 1 if distance != distance_map.UNREACHABLE else 0
+        return lengths
+    for first in range(0, count, chunkSize):
+        chunk = np.asarray(stack[first:first + chunkSize])
+        active = np.arange(first, first + len(chunk)) # maze index of every row still searching
+        openTop, openRight, openBottom, openLeft = wall_bitmap.open_masks(chunk)
+        reached = np.zeros(chunk.shape, dtype=bool)
+        reached[:, 0, 0] = True
+        frontier = reached.copy()
+        level = 1
+        while len(active):
+            done = frontier[:, -1, -1]
+            lengths[active[done]] = level
+            keep = ~done & frontier.any(axis=(1, 2))
+            if not keep.all():
+                active, frontier, reached = active[keep], frontier[keep], reached[keep]
+                openTop, openRight, openBottom, openLeft = openTop[keep], openRight[keep], openBottom[keep], openLeft[keep]
+            grown = np.zeros_like(frontier)
+            grown[:, :, :-1] |= frontier[:, :, 1:] & openTop[:, :, 1:]
+            grown[:, 1:, :] |= frontier[:, :-1, :] & openRight[:, :-1, :]
+            grown[:, :, 1:] |= frontier[:, :, :-1] & openBottom[:, :, :-1]
+            grown[:, :-1, :] |= frontier[:, 1:, :] & openLeft[:, 1:, :]
+            grown &= ~reached
+            reached |= grown
+            frontier = grown
+            level += 1
+    return lengths
+
+def maze_statistics(bitmaps: np.ndarray, chunkSize: int = 1024) -> Dict[str, np.ndarray]:
+    """Every statistic of STAT_FIELDS for every maze of the stack, computed chunk by chunk to bound the memory"""
+    stack = _as_stack(bitmaps)
+    results = {field: [] for field in STAT_FIELDS}
+    for first in range(0, len(stack), chunkSize):
+        chunk = np.asarray(stack[first:first + chunkSize])
+        degrees = degree_stack(chunk)
+        results["dead_ends"].append(dead_end_counts(degrees))
+        results["junctions"].append(junction_counts(degrees))
+        results["branching_factor"].append(branching_factors(degrees))
+        results["river_factor"].append(river_factors(degrees))
+        results["mean_corridor"].append(mean_corridors(chunk))
+        results["solution_length"].append(solution_lengths(chunk, chunkSize))
+    return {field: np.concatenate(values) if values else np.zeros(0) for field, values in results.items()}
+
+def archive_stack(archive: MazeArchive, ids: np.ndarray) -> np.ndarray:
+    """Gather mazes of one size from an archive into a (count, cols, rows) stack with one fancy-indexing read"""
+    entries = archive.index[ids]
+    cols, rows = int(entries["cols"][0]), int(entries["rows"][0])
+    if np.any(entries["cols"] != cols) or np.any(entries["rows"] != rows):
+        raise ValueError("All the mazes of a stack must have the same size")
+    positions = entries["offset"].astype(np.int64)[:, np.newaxis] + np.arange(cols * rows)
+    return archive.data[positions].reshape(len(ids), cols, rows)
+
+def summarize(statistics: Dict[str, np.ndarray]) -> str:
+    lines = [f"{'':>17} {'mean':>9} {'min':>9} {'median':>9} {'max':>9}"]
+    for field, values in statistics.items():
+        if len(values):
+            lines.append(f"{field:>17} {values.mean():9.3f} {values.min():9.3f} {np.median(values):9.3f} {values.max():9.3f}")
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Statistics of a maze corpus")
+    parser.add_argument("corpus", help="maze archive (.mza) or raw bitmaps back to back (.bin, needs --cols and --rows)")
+    parser.add_argument("--cols", type=int, default=None)
+    parser.add_argument("--rows", type=int, default=None)
+    parser.add_argument("--generator", default=None, help="only the mazes of this generator (archives only)")
+    parser.add_argument("--chunk", type=int, default=1024)
+    parser.add_argument("--out", default=None, help="save the per-maze statistics to this .npz")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    if args.cols and args.rows:
+        stacks = {(args.cols, args.rows): np.memmap(args.corpus, dtype=np.uint8, mode="r").reshape(-1, args.cols, args.rows)}
+    else:
+        archive = MazeArchive(args.corpus)
+        ids = archive.filter(generator=args.generator)
+        sizes = np.unique(archive.index[ids][["cols", "rows"]])
+        stacks = {}
+        for cols, rows in sizes.tolist():
+            stacks[(cols, rows)] = archive_stack(archive, archive.filter(generator=args.generator, cols=cols, rows=rows))
+    saved = {}
+    for (cols, rows), stack in stacks.items():
+        statistics = maze_statistics(stack, args.chunk)
+        print(f"{len(stack)} mazes of {cols}x{rows}")
+        print(summarize(statistics))
+        saved.update({f"{field}_{cols}x{rows}": values for field, values in statistics.items()})
+    print(f"Computed in {time.perf_counter() - start_time:.2f} seconds")
+    if args.out:
+        np.savez(args.out, **saved)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# Perfect-maze validator for wall bitmaps: cheap enough to run on every generated maze
+"""A maze is perfect when its passages form a spanning tree of the grid: every cell reachable from every other
+cell by exactly one path. On a wall bitmap (see wall_bitmap) that is checked in four steps:
+1. Consistency (vectorized): the wall bits shared by two neighbors agree, e.g. the RIGHT bit of (x, y) equals the
+   LEFT bit of (x + 1, y)
+2. Boundary (vectorized): the outer walls are all present
+3. Openings (vectorized): exactly V - 1 internal passages for V cells
+4. One union-find pass over the passages: a passage joining two cells already in the same set closes a cycle.
+   With V - 1 passages and no cycle the graph is a tree, hence connected, so no separate connectivity search is needed
+
+Usage:
+    problems = validate_bitmap(bitmap)     # [] when the maze is perfect, otherwise one line per problem
+    raise_if_invalid(bitmap)               # MazeValidationError with those lines
+    maze.runToCompletion("kruskal", validate=True)
+"""
+from typing import List
+import numpy as np
+import wall_bitmap
+from wall_bitmap import TOP, RIGHT, BOTTOM, LEFT
+
+class MazeValidationError(ValueError):
+    """A generated maze is not perfect"""
+
+def _first_cell(mask: np.ndarray) -> tuple:
+    return tuple(int(i) for i in np.argwhere(mask)[0])
+
+def check_walls(bitmap: np.ndarray, checkBoundary: bool = True) -> List[str]:
+    """Steps 1 and 2 only: both sides of every wall agree and the outer walls are present. Enough for the solvers,
+    which also accept imperfect (braided) mazes. Return the problems, empty when there are none"""
+    problems = []
+    # 1. Both sides of every internal wall must agree
+    rightMismatch = ((bitmap[:-1, :] & RIGHT) != 0) != ((bitmap[1:, :] & LEFT) != 0)
+    bottomMismatch = ((bitmap[:, :-1] & BOTTOM) != 0) != ((bitmap[:, 1:] & TOP) != 0)
+    if rightMismatch.any():
+        problems.append(f"{np.count_nonzero(rightMismatch)} inconsistent vertical wall(s), first between "
+                        f"{_first_cell(rightMismatch)} and its right neighbor")
+    if bottomMismatch.any():
+        problems.append(f"{np.count_nonzero(bottomMismatch)} inconsistent horizontal wall(s), first between "
+                        f"{_first_cell(bottomMismatch)} and its bottom neighbor")
+    # 2. The outer walls
+    if checkBoundary:
+        for name, edge, bit in (("top", bitmap[:, 0], TOP), ("right", bitmap[-1, :], RIGHT),
+                                ("bottom", bitmap[:, -1], BOTTOM), ("left", bitmap[0, :], LEFT)):
+            missing = np.count_nonzero((edge & bit) == 0)
+            if missing:
+                problems.append(f"{missing} missing wall(s) on the {name} boundary")
+    return problems
+
+def validate_bitmap(bitmap: np.ndarray, checkBoundary: bool = True) -> List[str]:
+    """
+    Check that a wall bitmap is a perfect maze
+
+    Parameters
+    ----------
+    bitmap : np.ndarray
+        Wall bitmap of shape (cols, rows)
+    checkBoundary : bool
+        Also require the outer walls, turn off for mazes with an opened entrance and exit
+    Returns
+    -------
+    List of problems, empty when the maze is perfect. The union-find pass only runs when the cheap checks pass
+    """
+    cols, rows = bitmap.shape
+    problems = check_walls(bitmap, checkBoundary)
+    if problems:
+        return problems
+    # 3. A spanning tree of V cells has V - 1 edges
+    _, openRight, openBottom, _ = wall_bitmap.open_masks(bitmap)
+    openings = int(np.count_nonzero(openRight) + np.count_nonzero(openBottom))
+    if openings != cols * rows - 1:
+        kind = "cycles" if openings > cols * rows - 1 else "disconnected regions"
+        problems.append(f"{openings} openings for {cols * rows} cells, a perfect maze has {cols * rows - 1} ({kind})")
+        return problems
+    # 4. Union-find over the passages, flat indices x * rows + y. Inlined with path halving on a plain list: no
+    # recursion (DisjointSet.find recurses, which overflows the stack on long chains) and no method calls per edge
+    cycle = _find_cycle(np.flatnonzero(openRight), np.flatnonzero(openBottom), cols * rows, rows)
+    if cycle is not None:
+        a, b = cycle
+        problems.append(f"Cycle closed by the passage between {divmod(a, rows)} and {divmod(b, rows)}")
+    return problems
+
+def _find_cycle(rightCells: np.ndarray, bottomCells: np.ndarray, size: int, rows: int):
+    "First passage (a, b) joining two cells that are already connected, None if the passages form a forest"
+    parent = list(range(size))
+    edges = zip(np.concatenate([rightCells, bottomCells]).tolist(),
+                np.concatenate([rightCells + rows, bottomCells + 1]).tolist())
+    for a, b in edges:
+        rootA, rootB = a, b
+        while parent[rootA] != rootA:
+            parent[rootA] = parent[parent[rootA]]
+            rootA = parent[rootA]
+        while parent[rootB] != rootB:
+            parent[rootB] = parent[parent[rootB]]
+            rootB = parent[rootB]
+        if rootA == rootB:
+            return a, b
+        parent[rootB] = rootA
+    return None
+
+def is_perfect(bitmap: np.ndarray, checkBoundary: bool = True) -> bool:
+    return not validate_bitmap(bitmap, checkBoundary)
+
+def raise_if_invalid(bitmap: np.ndarray, name: str = "maze", checkBoundary: bool = True) -> None:
+    problems = validate_bitmap(bitmap, checkBoundary)
+    if problems:
+        raise MazeValidationError(f"{name} is not a perfect maze: " + "; ".join(problems))
+
+def validate_stack(bitmaps: np.ndarray, checkBoundary: bool = True) -> np.ndarray:
+    """Boolean array telling which mazes of a (count, cols, rows) stack are perfect. The consistency, boundary and
+    opening-count checks run on the whole stack at once, the union-find pass only on the mazes that pass them"""
+    count, cols, rows = bitmaps.shape
+    valid = np.ones(count, dtype=bool)
+    valid &= ~(((bitmaps[:, :-1, :] & RIGHT) != 0) != ((bitmaps[:, 1:, :] & LEFT) != 0)).any(axis=(1, 2))
+    valid &= ~(((bitmaps[:, :, :-1] & BOTTOM) != 0) != ((bitmaps[:, :, 1:] & TOP) != 0)).any(axis=(1, 2))
+    if checkBoundary:
+        valid &= (bitmaps[:, :, 0] & TOP).all(axis=1) & (bitmaps[:, -1, :] & RIGHT).all(axis=1)
+        valid &= (bitmaps[:, :, -1] & BOTTOM).all(axis=1) & (bitmaps[:, 0, :] & LEFT).all(axis=1)
+    _, openRight, openBottom, _ = wall_bitmap.open_masks(bitmaps)
+    valid &= np.count_nonzero(openRight, axis=(1, 2)) + np.count_nonzero(openBottom, axis=(1, 2)) == cols * rows - 1
+    for i in np.flatnonzero(valid):
+        valid[i] = _find_cycle(np.flatnonzero(openRight[i]), np.flatnonzero(openBottom[i]), cols * rows, rows) is None
+    return valid
+
+# Driver code: every generator must produce perfect mazes, and broken mazes must be caught
+if __name__ == "__main__":
+    import time
+    from batch_generate import GENERATORS, generate_bitmap
+    import bitmap_generators
+    for generator in GENERATORS:
+        bitmap = generate_bitmap(generator, 40, 30, 1)
+        print(f"{generator:>14}: {validate_bitmap(bitmap) or 'perfect'}")
+    bitmap = generate_bitmap("kruskal", 40, 30, 2)
+    print("Braided:", validate_bitmap(bitmap_generators.braid_bitmap(bitmap, 0.5, np.random.default_rng(0))))
+    broken = bitmap.copy()
+    x, y = np.argwhere(bitmap[:-1, :] & RIGHT)[0]
+    broken[x, y] &= ~RIGHT & wall_bitmap.ALL_WALLS # removed from one side only
+    print("One-sided wall:", validate_bitmap(broken))
+    big = generate_bitmap("binary_tree", 1000, 1000, 0)
+    start_time = time.perf_counter()
+    problems = validate_bitmap(big)
+    print(f"1000x1000 validated in {(time.perf_counter() - start_time) * 1e3:.1f} ms: {problems or 'perfect'}")
@@ -0,0 +1,160 @@
+# Path post-processing: turn a solver's finalPath (list of (x, y) cells) into a compact motor command stream
+"""Commands emitted
+- F<n>: drive straight forward for n cells
+- D<n>: drive a diagonal across a staircase section, n = number of cell-to-cell steps it replaces
+- R<deg> / L<deg>: turn in place (or smooth turn) to the right/left by 45, 90 or 135 degrees. A reversal is R180,
+  a U-turn in place: the mouse brakes to a stop before it and starts again from rest after it
+
+Headings are stored as integers on an 8-way compass going clockwise (0 = up, 1 = up-right, 2 = right, ...), so that
+a turn is just the difference between two headings modulo 8. Up means decreasing y, like solver.Direction.UP
+"""
+import math
+from typing import List, Optional, Tuple
+
+# (dx, dy) of one cell-to-cell move -> heading on the 8-way compass
+MOVE_TO_HEADING = {(0, -1): 0, (1, 0): 2, (0, 1): 4, (-1, 0): 6}
+
+# Minimum number of alternating single-cell moves before a staircase is worth driving as a diagonal
+MIN_DIAGONAL_STEPS = 3
+
+# Motion parameters used for the timing estimate (standard 18cm micromouse cells)
+CELL_LENGTH = 0.18          # metres
+STRAIGHT_MAX_SPEED = 2.0    # m/s
+DIAGONAL_MAX_SPEED = 1.5    # m/s, diagonals are driven slower because the side clearance is smaller
+ACCELERATION = 4.0          # m/s^2, used for both speeding up and braking
+TURN_SPEED = 0.7            # m/s, speed at which every turn is entered and left
+TURN_TIME = {45: 0.15, 90: 0.25, 135: 0.35, 180: 0.5} # seconds spent in a turn of the given angle
+
+def path_to_headings(path: List[tuple]) -> List[int]:
+    """Convert a list of adjacent cells into the list of headings of every move"""
+    headings = []
+    for (x1, y1), (x2, y2) in zip(path, path[1:]):
+        heading = MOVE_TO_HEADING.get((x2 - x1, y2 - y1))
+        if heading is None:
+            raise ValueError(f"Cells {(x1, y1)} and {(x2, y2)} are not adjacent")
+        headings.append(heading)
+    return headings
+
+def run_lengths(headings: List[int]) -> List[List[int]]:
+    """Merge consecutive moves in the same heading into [heading, length] runs"""
+    runs = []
+    for heading in headings:
+        if runs and runs[-1][0] == heading:
+            runs[-1][1] += 1
+        else:
+            runs.append([heading, 1])
+    return runs
+
+def turn_between(fromHeading: int, toHeading: int) -> Optional[Tuple[str, int]]:
+    """Return the ('R'|'L', degrees) turn between two headings, or None when going straight"""
+    delta = (toHeading - fromHeading) % 8
+    if delta == 0:
+        return None
+    if delta <= 4:
+        return ("R", 45 * delta)
+    return ("L", 45 * (8 - delta))
+
+def plan_segments(path: List[tuple], start_heading: Optional[Tuple[int, int]] = None,
+                  min_diagonal: int = MIN_DIAGONAL_STEPS) -> List[Tuple[str, int]]:
+    """
+    Build the command list for a path
+
+    Parameters
+    ----------
+    path : List[tuple]
+        Cells from start to goal, e.g. Mouse.finalPath
+    start_heading : (dx, dy) or None
+        Direction the mouse is facing at the start (a solver.Direction value). When None,
+        the mouse is assumed to already face its first move
+    min_diagonal : int
+        Minimum number of alternating single-cell moves that are merged into a diagonal
+    Returns
+    -------
+    List of (op, value) tuples, op being one of 'F', 'D', 'R', 'L'
+    """
+    runs = run_lengths(path_to_headings(path))
+    if not runs:
+        return []
+    # Group the runs into straight and diagonal segments: a staircase is a stretch of length-1 runs
+    # alternating between two perpendicular headings
+    segments = [] # (heading, 'F'|'D', steps)
+    i = 0
+    while i < len(runs):
+        j = i
+        first = second = None
+        if runs[i][1] == 1:
+            first = runs[i][0]
+            second = runs[i + 1][0] if i + 1 < len(runs) else None
+            j = i + 1
+            while j < len(runs) and runs[j][1] == 1 and runs[j][0] == (first if (j - i) % 2 == 0 else second):
+                j += 1
+        if j - i >= min_diagonal and second is not None and (second - first) % 8 in (2, 6):
+            # The diagonal heading sits halfway between the two cardinal headings of the staircase
+            diagonal = (first + 1) % 8 if (second - first) % 8 == 2 else (first - 1) % 8
+            segments.append((diagonal, "D", j - i))
+            i = j
+        else:
+            segments.append((runs[i][0], "F", runs[i][1]))
+            i += 1
+
+    commands = []
+    heading = MOVE_TO_HEADING[start_heading] if start_heading is not None else segments[0][0]
+    for segmentHeading, op, steps in segments:
+        turn = turn_between(heading, segmentHeading)
+        if turn:
+            commands.append(turn)
+        commands.append((op, steps))
+        heading = segmentHeading
+    return commands
+
+def format_commands(commands: List[Tuple[str, int]]) -> str:
+    "Format the command list as a compact stream, e.g. 'F5 R90 D3 L45'"
+    return " ".join(f"{op}{value}" for op, value in commands)
+
+def segment_time(distance: float, startSpeed: float, endSpeed: float, maxSpeed: float, acceleration: float = ACCELERATION) -> float:
+    """Time to drive a straight line with a trapezoidal speed profile"""
+    accelDistance = (maxSpeed ** 2 - startSpeed ** 2) / (2 * acceleration)
+    brakeDistance = (maxSpeed ** 2 - endSpeed ** 2) / (2 * acceleration)
+    if accelDistance + brakeDistance <= distance:
+        cruise = distance - accelDistance - brakeDistance
+        return (maxSpeed - startSpeed) / acceleration + (maxSpeed - endSpeed) / acceleration + cruise / maxSpeed
+    # Triangular profile: never reaches the maximum speed
+    peakSpeed = math.sqrt((2 * acceleration * distance + startSpeed ** 2 + endSpeed ** 2) / 2)
+    if peakSpeed <= max(startSpeed, endSpeed):
+        return distance / max(startSpeed, endSpeed)
+    return (peakSpeed - startSpeed) / acceleration + (peakSpeed - endSpeed) / acceleration
+
+def estimate_time(commands: List[Tuple[str, int]]) -> float:
+    """Estimate the run time in seconds of a command list, starting and stopping at rest"""
+    total = 0.0
+    last = len(commands) - 1
+    for i, (op, value) in enumerate(commands):
+        if op in ("R", "L"):
+            total += TURN_TIME[value]
+            continue
+        # At rest at both ends of the run and around a U-turn, at turn speed around the other turns
+        startSpeed = TURN_SPEED if i > 0 and commands[i - 1] != ("R", 180) else 0.0
+        endSpeed = TURN_SPEED if i < last and commands[i + 1] != ("R", 180) else 0.0
+        if op == "F":
+            total += segment_time(value * CELL_LENGTH, startSpeed, endSpeed, STRAIGHT_MAX_SPEED)
+        else:
+            total += segment_time(value * CELL_LENGTH * math.sqrt(2) / 2, startSpeed, endSpeed, DIAGONAL_MAX_SPEED)
+    return total
+
+def export_commands(path: List[tuple], start_heading: Optional[Tuple[int, int]] = None,
+                    min_diagonal: int = MIN_DIAGONAL_STEPS) -> Tuple[str, float]:
+    """Return the command stream of a path together with its estimated run time in seconds"""
+    commands = plan_segments(path, start_heading=start_heading, min_diagonal=min_diagonal)
+    return format_commands(commands), estimate_time(commands)
+
+# Driver code to test the post-processor
+if __name__ == "__main__":
+    # 5 cells right, then a staircase down-right, then down again
+    testPath = [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (5, 0),
+                (5, 1), (6, 1), (6, 2), (7, 2), (7, 3), (7, 4), (7, 5)]
+    stream, seconds = export_commands(testPath)
+    print(f"Commands: {stream}")
+    print(f"Estimated time: {seconds:.3f} s")
+    # Facing left at the start: the first move needs a U-turn
+    stream, seconds = export_commands([(0, 0), (1, 0), (2, 0)], start_heading=(-1, 0))
+    print(f"U-turn start: {stream}, estimated time: {seconds:.3f} s")
@@ -0,0 +1,189 @@
+# Content-addressed cache of solver results: the same walls, solver, start and goal never get solved twice
+"""Keys
+- maze_hash(bitmap) is the sha256 of the dimensions and the wall bitmap (see wall_bitmap), so it identifies the walls
+  only: two MazeMaps with the same walls share it whatever their cell size, generator or seed
+- An entry is keyed by (maze hash, solver name, start, goal) and holds the final path, whether the goal was reached,
+  the number of nodes expanded and the solve time of the original run
+- Solvers with random tie-breaking (dfs, dijkstra) may find another path on another run, the cache keeps the first one
+
+Tiers
+1. In memory: LRU (OrderedDict) bounded by the total size of the entries, measured as their JSON size in bytes
+2. On disk (optional): one JSON file per entry under `directory`, written atomically, so it survives restarts and can
+   be shared by processes. A disk hit is promoted to the memory tier, a corrupt or truncated file is a miss and is
+   deleted, so the result gets recomputed and stored again
+- Entries are stored with their path as a tuple of cells and get() returns a new dict, so callers cannot change what
+  the cache holds
+
+Usage:
+    cache = SolveCache(maxBytes=64 * 2**20, directory=".solve_cache")
+    result = solve_mouse(mouse, "a_star", cache)   # fills mouse.finalPath either way
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+import wall_bitmap
+
+CacheKey = Tuple[str, str, Tuple[int, int], Tuple[int, int]]
+
+def maze_hash(bitmap: np.ndarray) -> str:
+    """Canonical hash of a wall bitmap: sha256 over a format tag, cols, rows and the bytes of the bitmap in [x][y] order"""
+    bitmap = np.ascontiguousarray(bitmap, dtype=np.uint8) & wall_bitmap.ALL_WALLS
+    cols, rows = bitmap.shape
+    digest = hashlib.sha256(f"walls-v1:{cols}x{rows}:".encode())
+    digest.update(bitmap.tobytes())
+    return digest.hexdigest()
+
+def _frozen(result: dict) -> dict:
+    "Copy of a result whose path is a tuple of (x, y) tuples, the form kept in the memory tier"
+    return {**result, "path": tuple((int(cell[0]), int(cell[1])) for cell in result["path"])}
+
+class SolveCache:
+    """
+    Two-tier cache of solver results
+
+    Parameters
+    ----------
+    maxBytes : int
+        Budget of the memory tier, least recently used entries are evicted beyond it. An entry larger than the whole
+        budget is only kept on disk
+    directory : str or None
+        Directory of the disk tier, None to keep everything in memory only
+    """
+    def __init__(self, maxBytes: int = 64 * 2**20, directory: Optional[str] = None):
+        self.maxBytes = maxBytes
+        self.directory = directory
+        self.entries: "OrderedDict[CacheKey, Tuple[dict, int]]" = OrderedDict() # key -> (result, size in bytes)
+        self.currentBytes = 0
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(mazeHash: str, solverName: str, start: Tuple[int, int], goal: Tuple[int, int]) -> CacheKey:
+        return (mazeHash, solverName, (int(start[0]), int(start[1])), (int(goal[0]), int(goal[1])))
+
+    def _diskPath(self, key: CacheKey) -> str:
+        mazeHash, solverName, (sx, sy), (gx, gy) = key
+        return os.path.join(self.directory, mazeHash[:2], f"{mazeHash}_{solverName}_{sx}_{sy}_{gx}_{gy}.json")
+
+    def get(self, key: CacheKey) -> Optional[dict]:
+        """Cached result of the key or None, the memory tier first then the disk tier"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+        if self.directory:
+            path = self._diskPath(key)
+            try:
+                with open(path, "rb") as file:
+                    data = file.read()
+            except FileNotFoundError:
+                pass
+            else:
+                try:
+                    result = _frozen(json.loads(data))
+                except (ValueError, KeyError, TypeError):
+                    # Corrupt or truncated entry: drop it, the caller recomputes and stores it again
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                else:
+                    self._remember(key, result, len(data))
+                    self.diskHits += 1
+                    return dict(result)
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, result: dict) -> None:
+        """Store a result ({"solved", "path", "expanded", "seconds"}) in both tiers"""
+        data = json.dumps(result, separators=(",", ":")).encode()
+        self._remember(key, _frozen(result), len(data))
+        if self.directory:
+            path = self._diskPath(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file next to the target then rename, readers never see half a file
+            descriptor, temporaryPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as file:
+                    file.write(data)
+                os.chmod(temporaryPath, wall_bitmap.NEW_FILE_MODE) # shared between processes
+                os.replace(temporaryPath, path)
+            except BaseException:
+                os.unlink(temporaryPath)
+                raise
+
+    def _remember(self, key: CacheKey, result: dict, size: int) -> None:
+        "Insert into the memory tier, evicting least recently used entries to stay within maxBytes"
+        if key in self.entries:
+            self.currentBytes -= self.entries.pop(key)[1]
+        if size > self.maxBytes:
+            return
+        self.entries[key] = (result, size)
+        self.currentBytes += size
+        while self.currentBytes > self.maxBytes:
+            _, (_, evictedSize) = self.entries.popitem(last=False)
+            self.currentBytes -= evictedSize
+            self.evictions += 1
+
+    def clear(self) -> None:
+        "Empty the memory tier, the disk tier is left alone"
+        self.entries.clear()
+        self.currentBytes = 0
+
+    def report(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "bytes": self.currentBytes, "hits": self.hits, "disk_hits": self.diskHits,
+                "misses": self.misses, "evictions": self.evictions}
+
+def solve_mouse(mouse: "Mouse", solverName: str, cache: SolveCache) -> dict:
+    """
+    mouse.runToCompletion(solverName) through the cache. On a hit the solver does not run: mouse.finalPath,
+    mouse.MazeSolved and the mouse position are set from the cached result
+
+    Returns
+    -------
+    The result dict {"solved", "path", "expanded", "seconds"}
+    """
+    bitmap = wall_bitmap.from_maze_grid(mouse.maze.MazeGrid)
+    key = cache.key(maze_hash(bitmap), solverName, (mouse.startX, mouse.startY), (mouse.endX, mouse.endY))
+    result = cache.get(key)
+    if result is not None:
+        mouse.finalPath = list(result["path"])
+        mouse.MazeSolved = result["solved"]
+        if result["solved"]:
+            mouse.x, mouse.y = mouse.endX, mouse.endY
+        return result
+    start_time = time.perf_counter()
+    solved = mouse.runToCompletion(solverName)
+    result = {"solved": solved, "path": [tuple(cell) for cell in mouse.finalPath],
+              "expanded": mouse.nodesExpanded(solverName), "seconds": time.perf_counter() - start_time}
+    cache.put(key, result)
+    return result
+
+# Driver code: solve the saved test maze twice with every solver, the second round comes from the cache
+if __name__ == "__main__":
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import Maze
+    import solver
+    savedMaze = Maze.MazeMap(mazeWidth=1, mazeHeight=1, cellSize=1, headless=True) # resized by load_file
+    savedMaze.load_file("saved_maze_test")
+    bitmap = wall_bitmap.from_maze_grid(savedMaze.MazeGrid)
+    print(f"Maze hash: {maze_hash(bitmap)}")
+    cache = SolveCache(directory=os.path.join(tempfile.gettempdir(), "maze_solve_cache"))
+    for attempt in ("first", "second"):
+        for solverName in solver.SOLVERS:
+            mouse = solver.Mouse(Maze.MazeMap.fromBitmap(bitmap, cellSize=1))
+            start_time = time.perf_counter()
+            result = solve_mouse(mouse, solverName, cache)
+            print(f"{attempt:>6} {solverName:>10}: path of {len(result['path'])} cells in "
+                  f"{(time.perf_counter() - start_time) * 1e3:.2f} ms")
+    print(cache.report())
@@ -2,10 +2,22 @@
 from Maze import MazeMap, Cell
 from enum import Enum
 import random
+import sys
 from collections import deque
-from typing import List, Tuple, Union
+from typing import List, Optional, Tuple, Union
 from settings import Colors
 import heapq
+import path_commands
+from hpa_star import HierarchicalIndex
+from landmarks import LandmarkTable
+from distance_map import distance_transform, descend
+from dead_end_filling import prune_dead_ends, core_bitmap
+import numpy as np
+import wall_bitmap
+import instrumentation
+import logging
+
+logger = logging.getLogger(__name__)
 
 # using enum.Enum to define the symbolic names for the fixed set of constants or values 
 class Direction(Enum):
@@ -31,11 +43,18 @@ NUM_TRAILING_CELLS = 5
 TRAILING_COLORS = [Colors.DARK_RED, Colors.FIREBRICK, Colors.CRIMSON, Colors.RED, Colors.LIGHT_RED]
 
 class Mouse:
-    def __init__(self, maze: "MazeMap", x: int=0, y:int=0):
+    def __init__(self, maze: "MazeMap", x: int=0, y:int=0, rng: Union[random.Random, None] = None, seed: Union[int, None] = None):
         """
         Initialize the solver with a reference to the MazeMap class
+        Random choices (RandomMouse, the neighbor shuffle of dijkstra_iter) come from rng, or from random.Random(seed)
         """
+        # As in MazeMap: without an explicit rng a seed is always drawn and kept, so any run can be replayed
+        if rng is None and seed is None:
+            seed = random.SystemRandom().randrange(sys.maxsize)
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed)
         self.x = x; self.y = y; # Starting position indices
+        self.startX = x; self.startY = y # x, y move while solving, the start is kept for path reconstruction
         self.maze: "MazeMap" = maze # reference to the MazeMap instance to access the maze grid # NOTE to self: the referenced maze has yet to be updated when initialized
                                     # TODO: maybe add an update function for whenever a maze is updated
         self.currentCell :"Cell"= self.maze.MazeGrid[self.x][self.y] 
@@ -59,6 +78,7 @@ class Mouse:
         self.dead_ends: List[Tuple[int]] = [] 
         self.deadEnd = None
         self.fillingaDeadEnd = False # A state to signify if the program is still filling in a deadEnd
+        self.core = None # Boolean mask of the cells left by deadEndFilling, reusable by other solvers
         # Dijsktra's algorithm
         self.distances = None
         self.pq = [] # A priority used for retrieving the smallest distance
@@ -66,6 +86,12 @@ class Mouse:
         # A star data structure attribute
         self.open_list = None
         self.closed_list = None
+        # Hierarchical pathfinding index, built lazily for large mazes
+        self.hpaIndex: Union[HierarchicalIndex, None] = None
+        # Optional landmark tables for a tighter A* heuristic (see useLandmarks)
+        self.landmarks: Union[LandmarkTable, None] = None
+        self.distanceMap = None # numpy distance field filled by computeDistanceMap
+        self.stats = instrumentation.NULL_STATS # counters and timers, see MazeMap.enableStats()
 
     # ----------------------------------------------------------------------------------
     # VISUAL STUFF FOR THE SOLVER
@@ -95,10 +121,9 @@ class Mouse:
         while current in self.parent: # Backtrack from the goal to the path
             path.append(current)
             current = self.parent[current] # Retrieve the parent of this p
-        path.append((0, 0))
+        path.append((self.startX, self.startY))
         path.reverse() # Reverse to get it from goal to start
-        print(f"Final path: {'->'.join(map(str, path))}") # Convert each tuple in the path into a string,, then use join to join the string representations of the coordinates
-        # with '->' as the separator
+        logger.debug("Final path: %s", path)
         self.finalPath = path
     
     def highlightFinalPath(self):
@@ -106,6 +131,13 @@ class Mouse:
         for cell in self.finalPath:
             self.maze.MazeGrid[cell[0]][cell[1]].Color = Colors.NEON_GREEN.value
 
+    def exportCommands(self, start_heading: Optional[Union[Direction, Tuple[int, int]]] = None) -> Tuple[str, float]:
+        """Convert the final path into a run-length motor command stream (e.g. 'F5 R90 D3 L45') and its estimated run time.
+        start_heading is where the mouse faces before the first move, a Direction or its (dx, dy). None: along the path"""
+        if isinstance(start_heading, Direction):
+            start_heading = start_heading.value
+        return path_commands.export_commands(self.finalPath, start_heading=start_heading)
+
     def resetMazeColor(self):
         self.maze.resetGrids2BLACK()
 
@@ -124,7 +156,8 @@ class Mouse:
         if not currentCell.walls[3]:  # No wall on the left
             available_directions.append(Direction.LEFT)
         
-        print("Available directions given the wall presence: {}".format(available_directions))
+        if __debug__:
+            logger.debug("Available directions given the wall presence: %s", available_directions)
         # Return the neighboring Cells
         for direction in available_directions:
             dx, dy = direction.value # Retrieve the value of the direction
@@ -150,15 +183,16 @@ class Mouse:
     # ----------------------------------------------------------------------------------
     def RandomMouse(self):
         "Random Mouse algorithm: unintelligent robot that moves randomly, does not require any memory of the maze"
-        print("Self.x is {}, self.y is {} \n end-X is {}, end-Y is {}".format(self.x, self.y, self.endX, self.endY))
+        if __debug__:
+            logger.debug("Mouse at (%d, %d), goal at (%d, %d)", self.x, self.y, self.endX, self.endY)
         # While we have yet to reach the desired goal
         if self.x != self.endX or self.y != self.endY: # Took me 15 minutes staring at the condition until I realize what was wrong, and -> or
-            print("--------------------------------------\nStill solving...")
             # Check the current grid cell to see what path there is
             self.currentCell = self.maze.MazeGrid[self.x][self.y]
             # Debug
-            print(f"Current cell is {self.currentCell.x} | {self.currentCell.y}")
-            print("Current states of the walls: top -> right -> bottom -> left is: {}".format(self.currentCell.walls))
+            if __debug__:
+                logger.debug("Current cell is %d | %d", self.currentCell.x, self.currentCell.y)
+                logger.debug("Current states of the walls: top -> right -> bottom -> left is: %s", self.currentCell.walls)
             # Check with the current direction that th
             # See if there are availiability for four directions
             # NOTE, might be DEPRECATED: adding an extra memory might not be too much, but we can do better by just inferring if there is not a wall
@@ -174,7 +208,8 @@ class Mouse:
             if not self.currentCell.walls[3]:  # No wall on the left
                 available_directions.append(Direction.LEFT)
             
-            print("Available directions given the wall presence: {}".format(available_directions))
+            if __debug__:
+                logger.debug("Available directions given the wall presence: %s", available_directions)
             # Prioritize continuing in either the current direction or the adjacent directions, only return when necessary
             # Exclude the opposite direction unless it's the only option
             if self.direction:
@@ -185,21 +220,23 @@ class Mouse:
                 if filtered_directions:
                     available_directions = filtered_directions
                 else:
-                    print(f"No other options available. Falling back to opposite direction: {currOppositeDirection}")
+                    if __debug__:
+                        logger.debug("No other options available. Falling back to opposite direction: %s", currOppositeDirection)
             # Randomly select one of the remaining openings
             if available_directions:
                 # Randomly select one of the openings
-                self.direction = random.choice(available_directions)
+                self.direction = self.rng.choice(available_directions)
                 dx, dy = self.direction.value # Retrieve the value of the direction
                 if (self.x + dx, self.y + dy) not in self.visited:
                     self.parent[(self.x+dx, self.y+dy)] = (self.x, self.y)
                 self.x += dx
                 self.y += dy
-                print(f"Continued {self.direction.name} to ({self.x}, {self.y})")
+                if __debug__:
+                    logger.debug("Continued %s to (%d, %d)", self.direction.name, self.x, self.y)
                 return # End this iteration
         else:
             self.MazeSolved = True
-            print("Reached goal at x={}| y={}".format(self.endX, self.endY))
+            logger.info("Reached goal at x=%d | y=%d", self.endX, self.endY)
     
     # FIXME: wall following does not work right, check again the theory and constraints of the wall follower
     def rightHand(self):
@@ -209,12 +246,14 @@ class Mouse:
         # As we rotate the maze 180 degree
         if self.x != self.endX or self.y != self.endY:
             self.currentCell = self.maze.MazeGrid[self.x][self.y]
-            print(f"Current cell: ({self.currentCell.x}, {self.currentCell.y})")
-            print(f"Wall states (top, right, bottom, left): {self.currentCell.walls}")
+            if __debug__:
+                logger.debug("Current cell: (%d, %d)", self.currentCell.x, self.currentCell.y)
+                logger.debug("Wall states (top, right, bottom, left): %s", self.currentCell.walls)
 
             if (self.x, self.y) not in self.visited:
                 self.visited.add((self.x, self.y))
-                print("Marking cell ({}, {}) as visited".format(self.x, self.y))
+                if __debug__:
+                    logger.debug("Marking cell (%d, %d) as visited", self.x, self.y)
             # Determine the direction to move based on the right-hand rule
             if self.direction is None:
                 self.direction = Direction.RIGHT  # Default starting direction
@@ -235,7 +274,8 @@ class Mouse:
                 # Check if the direction is valid (no wall, within bounds, and unvisited)
                 if 0 <= next_x < self.maze.cols and 0 <= next_y < self.maze.rows:
                     if not self.currentCell.walls[list(Direction).index(direction)] and (next_x, next_y) not in self.visited:
-                        print(f"Moving {label} to unvisited cell ({next_x}, {next_y})")
+                        if __debug__:
+                            logger.debug("Moving %s to unvisited cell (%d, %d)", label, next_x, next_y)
                         self.direction = direction
                         self.x, self.y = next_x, next_y
                         return  # Move to the next cell
@@ -248,14 +288,15 @@ class Mouse:
                 # Check if the direction is valid (no wall and within bounds)
                 if 0 <= next_x < self.maze.cols and 0 <= next_y < self.maze.rows:
                     if not self.currentCell.walls[list(Direction).index(direction)]:
-                        print(f"Moving {label} to ({next_x}, {next_y})")
+                        if __debug__:
+                            logger.debug("Moving %s to (%d, %d)", label, next_x, next_y)
                         self.direction = direction
                         self.x, self.y = next_x, next_y
                         return  # Move to the next cell
 
-            print("No valid moves found. Stuck!")
+            logger.warning("No valid moves found. Stuck!")
         else:
-            print(f"Goal reached at ({self.endX}, {self.endY})")
+            logger.info("Goal reached at (%d, %d)", self.endX, self.endY)
 
     # ----------------------------------------------------------------------------------
     # Depth-first traversal - DFS method of finding a maze
@@ -269,11 +310,12 @@ class Mouse:
 
             # Mark the current cell as visited
             self.visited.add((self.x, self.y))
-            print(f"Visiting cell: ({self.x}, {self.y})")
+            if __debug__:
+                logger.debug("Visiting cell: (%d, %d)", self.x, self.y)
 
             # Check if the goal is reached
             if self.x == self.endX and self.y == self.endY:
-                print(f"Goal reached at ({self.x}, {self.y})")
+                logger.info("Goal reached at (%d, %d)", self.x, self.y)
                 self.MazeSolved = True
                 self.finalPath = self.reconstructPath()
 
@@ -288,7 +330,8 @@ class Mouse:
             if not self.currentCell.walls[3] and (self.x - 1, self.y) not in self.visited:  # Left
                 neighbors.append((self.x - 1, self.y))
 
-            print(f"Neighbors to visit: {neighbors}")
+            if __debug__:
+                logger.debug("Neighbors to visit: %s", neighbors)
 
             # Add neighbors to the stack
             for neighbor in neighbors:
@@ -296,7 +339,7 @@ class Mouse:
                     self.stack.append(neighbor)
                     self.parent[neighbor] = (self.x, self.y)
 
-        print("No path to the goal was found.")
+        logger.warning("No path to the goal was found")
 
     def depthFirstSearch_optimized(self) -> List[tuple]:
         """TESTING: Optimized Depth-First Search (DFS) with path reconstruction embedded in the stack."""
@@ -310,11 +353,12 @@ class Mouse:
 
             # Mark the current cell as visited
             visited.add((self.x, self.y))
-            print(f"Visiting cell: ({self.x}, {self.y})")
+            if __debug__:
+                logger.debug("Visiting cell: (%d, %d)", self.x, self.y)
 
             # Check if the goal is reached
             if self.x == self.endX and self.y == self.endY:
-                print(f"Goal reached at ({self.x}, {self.y})")
+                logger.info("Goal reached at (%d, %d)", self.x, self.y)
                 self.finalPath = path  # Store the final path
                 return path
 
@@ -329,19 +373,20 @@ class Mouse:
             if not self.currentCell.walls[3] and (self.x - 1, self.y) not in visited:  # Left
                 neighbors.append((self.x - 1, self.y))
 
-            print(f"Neighbors to visit: {neighbors}")
+            if __debug__:
+                logger.debug("Neighbors to visit: %s", neighbors)
 
             # Add neighbors to the stack with the updated path
             for neighbor in neighbors:
                 stack.append((neighbor[0], neighbor[1], path + [neighbor]))
 
-        print("No path to the goal was found.")
+        logger.warning("No path to the goal was found")
         return []  # Return an empty path if no solution is found
     
     def depthFirstSearch_iter(self)-> bool:
         """Concurrently update the maze solving procedure of depth-first-search"""
         if self.x == self.endX and self.y == self.endY:
-            print(f"Goal Reached at ({self.x}, {self.y})!")
+            logger.info("Goal reached at (%d, %d)", self.x, self.y)
             self.MazeSolved = True
             self.reconstructPath()
         else:
@@ -350,8 +395,12 @@ class Mouse:
                 # Get the current position
                 self.x, self.y = self.stack.pop()
                 self.currentCell = self.maze.MazeGrid[self.x][self.y]
+                self.stats.count("expansions")
+                self.stats.sample("frontier", len(self.stack))
                 # Mark as visited
-                self.visited.add((self.x, self.y)); print(f"Visiting cell: ({self.x}, {self.y})")
+                self.visited.add((self.x, self.y))
+                if __debug__:
+                    logger.debug("Visiting cell: (%d, %d)", self.x, self.y)
 
                 # Get all possible directions from the current cell
                 neighbors = []
@@ -364,14 +413,15 @@ class Mouse:
                 if not self.currentCell.walls[3] and (self.x - 1, self.y) not in self.visited:  # Left
                     neighbors.append((self.x - 1, self.y))
 
-                print(f"Neighbors to visit: {neighbors}")
+                if __debug__:
+                    logger.debug("Neighbors to visit: %s", neighbors)
                 # Add neighbors to the stack
                 for neighbor in neighbors:
                     if neighbor not in self.visited:
                         self.stack.append(neighbor)
                         self.parent[neighbor] = (self.x, self.y)
             else:
-                print("No path to the goal was found...")
+                logger.warning("No path to the goal was found")
     
     def Tremaux(self):
         pass
@@ -394,7 +444,8 @@ class Mouse:
         """Filling in the path of the current deadEnd until we reach a junction - or meeting a cell which has more than 2 neighbors, not
         regarding the visited cells, which we will mark
         """
-        print("Currently running fillinPath()...\n")
+        if __debug__:
+            logger.debug("Filling in the dead end at %s", self.deadEnd)
         # if not self.checkJunction(*self.deadEnd):
         #     self.visited.add(self.deadEnd) # if the neighbor of this current cell does not open to a junction, mark as visited
         #     self.markCell(*self.deadEnd, color=Colors.MAGENTA.value) # Marked for visuals
@@ -422,9 +473,10 @@ class Mouse:
         #     self.markCell(neighborCellx, neighborCelly, color=Colors.CRIMSON.value)
         while self.dead_ends:
             # Pick a new random deadEnds
-            self.deadEnd = random.choice(self.dead_ends)
+            self.deadEnd = self.rng.choice(self.dead_ends)
             # Debug
-            print(f"Choosing a random dead-end at x: {self.deadEnd[0]}| y: {self.deadEnd[1]}")
+            if __debug__:
+                logger.debug("Choosing a random dead-end at x: %d | y: %d", *self.deadEnd)
             self.dead_ends.remove(self.deadEnd)
             self.visited.add(self.deadEnd) # Add to the list of visited nodes
             self.fillinPath()
@@ -439,8 +491,9 @@ class Mouse:
         # If program finishes filling a current dead end
         else:
             if self.dead_ends: # Check if there are still dead ends to be filled in, choose a new one
-                self.deadEnd = random.choice(self.dead_ends)
-                print(f"Choosing a random dead-end at x: {self.deadEnd[0]}| y: {self.deadEnd[1]}")
+                self.deadEnd = self.rng.choice(self.dead_ends)
+                if __debug__:
+                    logger.debug("Choosing a random dead-end at x: %d | y: %d", *self.deadEnd)
                 self.dead_ends.remove(self.deadEnd) 
                 self.visited.add(self.deadEnd) 
                 self.fillingaDeadEnd = True
@@ -461,22 +514,44 @@ class Mouse:
                     self.deadEnd = neighbors[0]# Move to the next cell
                     self.visited.add(self.deadEnd)
                 else:
-                    print(f"Error: Dead-end at ({self.deadEnd[0]}, {self.deadEnd[1]}) has multiple neighbors!")
+                    logger.warning("Dead-end at (%d, %d) has multiple neighbors!", *self.deadEnd)
             else:
                 # Finish filling the current dead end since a junction is reached
-                print(f"Finished filling dead-end at x: {self.deadEnd[0]} | y: {self.deadEnd[1]}")
+                if __debug__:
+                    logger.debug("Finished filling dead-end at x: %d | y: %d", *self.deadEnd)
                 self.fillingaDeadEnd = False
         else:
             # If not currently filling a dead end, select a new one
             if self.dead_ends:
-                self.deadEnd = random.choice(self.dead_ends)  # Pick a random dead end
-                print(f"Choosing a random dead-end at x: {self.deadEnd[0]} | y: {self.deadEnd[1]}")
+                self.deadEnd = self.rng.choice(self.dead_ends)  # Pick a random dead end
+                if __debug__:
+                    logger.debug("Choosing a random dead-end at x: %d | y: %d", *self.deadEnd)
                 self.dead_ends.remove(self.deadEnd)  # Remove it from the list of dead ends
                 self.visited.add(self.deadEnd)  # Mark it as visited
                 self.fillingaDeadEnd = True  # Start filling this dead end
             else:
                 # No more dead ends to process
-                print("All dead ends have been filled.")
+                logger.info("All dead ends have been filled")
+
+    def deadEndFilling(self, showFilled: bool = True) -> None:
+        """Dead-end filling on the whole wall bitmap: every dead end is filled in bulk, round after round, until only the
+        corridor between the mouse and the goal (plus any loops) is left in self.core. The final path is then the
+        shortest route through the core"""
+        bitmap = wall_bitmap.from_maze_grid(self.maze.MazeGrid)
+        start, goal = (self.x, self.y), (self.endX, self.endY)
+        self.core = prune_dead_ends(bitmap, keep=[start, goal])
+        if showFilled:
+            for x, y in np.argwhere(~self.core).tolist():
+                self.markCell(x=x, y=y, color=Colors.MAGENTA.value)
+        # Only the core is searched: in a perfect maze it is the solution corridor itself
+        reduced = core_bitmap(bitmap, self.core)
+        path = descend(reduced, distance_transform(reduced, [goal]), start)
+        if path:
+            self.finalPath = path # descend already walks from the start down to the goal
+            self.MazeSolved = True
+        else:
+            logger.warning("No path to the goal was found")
+
     # ----------------------------------------------------------------------------------
     # Shortest Path &  Pathfinding Algorithms, graph-based algorithms
     def breadthFirstSearch(self) -> List:
@@ -485,7 +560,8 @@ class Mouse:
         queue = deque([(self.x, self.y)]) # syntax for initializing a nonempty deque: queue=deque([1, 2])
         visited = set()  # Keep track of visited cells
         parent = dict() # Dictionary to store the parent of each cell
-        print("Breadth-first search chosen, now running the solver...")
+        if __debug__:
+            logger.debug("Breadth-first search step")
 
         while queue:
             # Get the current position
@@ -494,11 +570,12 @@ class Mouse:
 
             # Mark the current cell as visited
             visited.add((self.x, self.y))
-            print(f"Visiting cell: ({self.x}, {self.y})")
+            if __debug__:
+                logger.debug("Visiting cell: (%d, %d)", self.x, self.y)
 
             # Check if the goal is reached
             if self.x == self.endX and self.y == self.endY:
-                print(f"Goal reached at ({self.x}, {self.y})")
+                logger.info("Goal reached at (%d, %d)", self.x, self.y)
                 self.finalPath = self.reconstructPath()
                 self.MazeSolved = True
 
@@ -514,7 +591,8 @@ class Mouse:
             if not self.currentCell.walls[3] and (self.x - 1, self.y) not in visited:  # Left
                 neighbors.append((self.x - 1, self.y))
 
-            print(f"Neighbors to visit: {neighbors}")
+            if __debug__:
+                logger.debug("Neighbors to visit: %s", neighbors)
 
             # Add neighbors to the stack
             for neighbor in neighbors:
@@ -522,15 +600,16 @@ class Mouse:
                     queue.appendleft(neighbor)
                     parent[neighbor] = (self.x, self.y)
 
-        print("No path to the goal was found.")
+        logger.warning("No path to the goal was found")
         return []
 
     def breadthFirstSearch_iter(self)-> None:
         """Concurrently update the maze solving procedure of depth-first-search"""
         """Graph-based implementation: Breadth-first search for maze solving."""
-        print("Breadth-first search chosen, now running the solver...")
+        if __debug__:
+            logger.debug("Breadth-first search step")
         if self.x == self.endX and self.y == self.endY:
-            print(f"Goal Reached at ({self.x}, {self.y})!")
+            logger.info("Goal reached at (%d, %d)", self.x, self.y)
             self.reconstructPath()
             self.MazeSolved = True
         else:
@@ -538,10 +617,13 @@ class Mouse:
                 # Get the current position
                 self.x, self.y = self.queue.pop()
                 self.currentCell = self.maze.MazeGrid[self.x][self.y]
+                self.stats.count("expansions")
+                self.stats.sample("frontier", len(self.queue))
 
                 # Mark the current cell as visited
                 self.visited.add((self.x, self.y))
-                print(f"Visiting cell: ({self.x}, {self.y})")
+                if __debug__:
+                    logger.debug("Visiting cell: (%d, %d)", self.x, self.y)
 
                 # Get all possible directions from the current cell
                 # NOTE: the order of the directions added: Top -> Right -> Bottom -> Left
@@ -555,7 +637,8 @@ class Mouse:
                 if not self.currentCell.walls[3] and (self.x - 1, self.y) not in self.visited:  # Left
                     neighbors.append((self.x - 1, self.y))
 
-                print(f"Neighbors to visit: {neighbors}")
+                if __debug__:
+                    logger.debug("Neighbors to visit: %s", neighbors)
 
                 # Add neighbors to the stack
                 for neighbor in neighbors:
@@ -563,13 +646,13 @@ class Mouse:
                         self.queue.appendleft(neighbor)
                         self.parent[neighbor] = (self.x, self.y) # Mark that neighbor cell's parent as the current cell's xy-coordinate
             else:
-                print("No path to the goal was found.")
+                logger.warning("No path to the goal was found")
             self.MazeSolved = False
 
     # ----------------------------------------------------------------------------------
     def Dijsktra(self):
         # Given that the weights between vertices are uniform, meaning that they have the same weight
-        self.distances = [[float('inf') for _ in range(self.maze.cols)] for _ in range(self.maze.rows)]    
+        self.distances = [[float('inf') for _ in range(self.maze.rows)] for _ in range(self.maze.cols)] # indexed [x][y]
         self.distances[self.x][self.y] = 0 # starting vertex should be 0
         # Alternative data structure: self.distaces = {(self.x, self.y):0}
 
@@ -586,7 +669,7 @@ class Mouse:
 
             # If the goal is reached, reconstruct the path and terminate the loop
             if (curr_x, curr_y) == (self.endX, self.endY):
-                print(f"Goal reached at ({curr_x}, {curr_y}) with distance {curr_dist}")
+                logger.info("Goal reached at (%d, %d) with distance %d", curr_x, curr_y, curr_dist)
                 self.parent = parent
                 self.reconstructPath()
                 self.MazeSolved = True
@@ -594,7 +677,8 @@ class Mouse:
             
             # Mark the current cell as visited
             self.visited.add((curr_x, curr_y))
-            print(f"Debug Check: Visiting Cell: ({curr_x}, {curr_y}) with distance {curr_dist}")
+            if __debug__:
+                logger.debug("Visiting cell: (%d, %d) with distance %d", curr_x, curr_y, curr_dist)
             
             # Get all possible neighbors
             neighbors = []
@@ -621,7 +705,7 @@ class Mouse:
 
     def dijkstra_init(self):
         # Given that the weights between vertices are uniform, meaning that they have the same weight
-        self.distances = [[float('inf') for _ in range(self.maze.cols)] for _ in range(self.maze.rows)]    
+        self.distances = [[float('inf') for _ in range(self.maze.rows)] for _ in range(self.maze.cols)] # indexed [x][y]
         self.distances[self.x][self.y] = 0 # starting vertex should be 0
         # Alternative data structure: self.distaces = {(self.x, self.y):0}
 
@@ -636,10 +720,12 @@ class Mouse:
             # Get the current vertex with the minimum distance
             curr_dist, (curr_x, curr_y) = heapq.heappop(self.pq)
             self.currentCell = self.maze.MazeGrid[curr_x][curr_y]
+            self.stats.count("expansions")
+            self.stats.sample("frontier", len(self.pq))
 
             # If the goal is reached, reconstruct the path and terminate the loop
             if (curr_x, curr_y) == (self.endX, self.endY):
-                print(f"Goal reached at ({curr_x}, {curr_y}) with distance {curr_dist}")
+                logger.info("Goal reached at (%d, %d) with distance %d", curr_x, curr_y, curr_dist)
                 self.reconstructPath()
                 self.MazeSolved = True
                 return
@@ -648,7 +734,8 @@ class Mouse:
             # Since we use a min heap, we always make sure our current cell is having the smallest distance before marking it as visited
 
             self.visited.add((curr_x, curr_y))
-            print(f"Debug Check: Visiting Cell: ({curr_x}, {curr_y}) with distance {curr_dist}")
+            if __debug__:
+                logger.debug("Visiting cell: (%d, %d) with distance %d", curr_x, curr_y, curr_dist)
             
             # Get all possible neighbors
             neighbors = []
@@ -661,7 +748,7 @@ class Mouse:
             if not self.currentCell.walls[3]:  # Left
                 neighbors.append((curr_x - 1, curr_y))
             # TEST: shuffle to see the random behavior
-            random.shuffle(neighbors)
+            self.rng.shuffle(neighbors)
             # Process each neighbor
             for neighbor_x, neighbor_y in neighbors:
                 if (neighbor_x, neighbor_y) not in self.visited:
@@ -677,7 +764,22 @@ class Mouse:
     # ----------------------------------------------------------------------------------
     def calculate_h_value(self, curr_x, curr_y):
         "Approximation heuristics to calculate h for the A-star search"
-        return abs(curr_x - self.endX) + abs(curr_y - self.endY)
+        manhattan = abs(curr_x - self.endX) + abs(curr_y - self.endY)
+        if self.landmarks is not None:
+            # Both bounds are admissible, so the larger one is too
+            return max(manhattan, self.landmarks.lowerBound(curr_x, curr_y, self.endX, self.endY))
+        return manhattan
+
+    def useLandmarks(self, k: int = 8, mazeFilename: str = None) -> None:
+        """Enable the ALT heuristic for A*. Tables are loaded from next to mazeFilename when present and up to date,
+        otherwise computed (and saved there if a filename is given)"""
+        bitmap = wall_bitmap.from_maze_grid(self.maze.MazeGrid)
+        table = LandmarkTable.load(mazeFilename, bitmap) if mazeFilename else None
+        if table is None:
+            table = LandmarkTable.build(bitmap, k=k)
+            if mazeFilename:
+                table.save(mazeFilename)
+        self.landmarks = table
 
     def trace_path(self):
         path = []
@@ -685,13 +787,12 @@ class Mouse:
         # Trace the path from destination to source using parent cells, while the parent of the cell is not itself
         while not (self.maze.MazeGrid[x][y].parent_x == x and self.maze.MazeGrid[x][y].parent_y==y):
             path.append((x, y))
-            # Update the next parent
-            x = self.maze.MazeGrid[x][y].parent_x
-            y = self.maze.MazeGrid[x][y].parent_y
+            # Update the next parent (read both before moving, otherwise y is read from the parent's cell)
+            x, y = self.maze.MazeGrid[x][y].parent_x, self.maze.MazeGrid[x][y].parent_y
         # Add the source cell to the path
         path.append((x, y))
         path.reverse() # Reverse direction back from source -> destination
-        print(f"Final Path: {'->'.join(map(str, path))}")
+        logger.debug("Final path: %s", path)
         self.finalPath = path
 
     def Astar_search(self):
@@ -703,7 +804,7 @@ class Mouse:
         # Check if we are already at the destination
         
         # Initialize the closed list (ALTERNATIVELY, use the self.visited() set data structure)
-        closed_list = [[False for _ in range(self.maze.cols)] for _ in range(self.maze.rows)]
+        closed_list = [[False for _ in range(self.maze.rows)] for _ in range(self.maze.cols)]
         # Initialize the details of each Cell
         "I had the Cells object initialized for the Maze map to contain the necessary attributes to run this A* algorithm as well, so no need for additional objects"
         # Intialize starting cell's details
@@ -770,11 +871,11 @@ class Mouse:
                 
         
         if not self.MazeSolved:
-            print("Failed to find the destination cell")
+            logger.warning("Failed to find the destination cell")
     
     def astar_init(self):
         # Initialize the closed list (ALTERNATIVELY, use the self.visited() set data structure)
-        self.closed_list = [[False for _ in range(self.maze.cols)] for _ in range(self.maze.rows)]
+        self.closed_list = [[False for _ in range(self.maze.rows)] for _ in range(self.maze.cols)]
         # Initialize the details of each Cell
         "I had the Cells object initialized for the Maze map to contain the necessary attributes to run this A* algorithm as well, so no need for additional objects"
         # Intialize starting cell's details
@@ -793,6 +894,8 @@ class Mouse:
         if self.open_list:
             # Pop the cell with the smallest f value from the open list
             f_value, curr_x, curr_y = heapq.heappop(self.open_list)
+            self.stats.count("expansions")
+            self.stats.sample("frontier", len(self.open_list))
 
             # Mark the cell as visited and make it as current cell for our current iteration update on the trailing mouse
             self.currentCell = self.maze.MazeGrid[curr_x][curr_y]
@@ -841,6 +944,68 @@ class Mouse:
                             self.maze.MazeGrid[neighborx][neighbory].parent_x = curr_x
                             self.maze.MazeGrid[neighborx][neighbory].parent_y = curr_y
 
+    # ----------------------------------------------------------------------------------
+    def computeDistanceMap(self, fromGoal: bool = True):
+        """Whole-grid distance field (heatmap) from the goal, or from the mouse when fromGoal is False.
+        Computed frontier by frontier with NumPy, -1 marks unreachable cells"""
+        source = (self.endX, self.endY) if fromGoal else (self.x, self.y)
+        self.distanceMap = distance_transform(wall_bitmap.from_maze_grid(self.maze.MazeGrid), [source])
+        return self.distanceMap
+
+    def hierarchicalSearch(self, clusterSize: int = 16) -> None:
+        """HPA* search: query the cluster-level abstract graph, then refine it into cells. Same path length as A*
+        NOTE: call self.hpaIndex.refreshFromMaze(self.maze, changedCells) after editing walls instead of rebuilding"""
+        if self.hpaIndex is None or self.hpaIndex.clusterSize != clusterSize:
+            self.hpaIndex = HierarchicalIndex.fromMaze(self.maze, clusterSize=clusterSize)
+        path = self.hpaIndex.findPath((self.x, self.y), (self.endX, self.endY))
+        if path:
+            self.finalPath = path
+            self.MazeSolved = True
+        else:
+            logger.warning("Failed to find the destination cell")
+
+    # ----------------------------------------------------------------------------------
+    def runToCompletion(self, solverName: str = "bfs", profilePath: Union[str, None] = None) -> bool:
+        """Run a solver without drawing until it stops (benchmarks, batch runs). Return True if the goal was reached,
+        the path is then in self.finalPath
+        With profilePath the run is done under cProfile and its stats are dumped there (.prof)"""
+        with instrumentation.profiled(profilePath), self.stats.timer("solve"):
+            atGoal = lambda: self.x == self.endX and self.y == self.endY
+            if solverName == "dfs":
+                while not self.MazeSolved and (self.stack or atGoal()):
+                    self.depthFirstSearch_iter()
+            elif solverName == "bfs":
+                while not self.MazeSolved and (self.queue or atGoal()):
+                    self.breadthFirstSearch_iter()
+            elif solverName == "dijkstra":
+                self.dijkstra_init()
+                while not self.MazeSolved and self.pq:
+                    self.dijkstra_iter()
+            elif solverName in ("a_star", "a_star_alt"):
+                if solverName == "a_star_alt" and self.landmarks is None:
+                    self.useLandmarks() # unless the caller built or loaded the tables already
+                self.astar_init()
+                while not self.MazeSolved and self.open_list:
+                    self.astar_iter()
+            elif solverName == "dead_end":
+                self.deadEndFilling(showFilled=False)
+            elif solverName == "hpa":
+                self.hierarchicalSearch()
+            else:
+                raise ValueError(f"Unknown solver: {solverName}")
+        return self.MazeSolved
+
+    def nodesExpanded(self, solverName: str) -> int:
+        """Work done by the last runToCompletion: cells expanded by the graph searches, abstract nodes for HPA*,
+        cells filled in for dead-end filling"""
+        if solverName == "hpa":
+            return self.hpaIndex.expanded
+        if solverName == "dead_end":
+            return int(np.count_nonzero(~self.core))
+        return len(self.visited)
+
+SOLVERS = ("dfs", "bfs", "dijkstra", "a_star", "a_star_alt", "dead_end", "hpa")
+
 # TEST DRIVER
 if __name__ == "__main__":
 
@@ -0,0 +1,138 @@
+# Tiled maze generation for huge mazes: tiles generated in parallel, then stitched into one perfect maze
+"""Method
+1. Split the grid into tiles of tileSize x tileSize cells (the last row/column of tiles may be smaller)
+2. Every tile is a small perfect maze generated independently in a worker process, which writes its walls
+   straight into a wall bitmap held in shared memory (tiles never overlap, so no locking is needed)
+3. Join the tiles with a random spanning tree over the tile-adjacency graph (Kruskal with a DisjointSet), opening
+   exactly one passage at a random position along every chosen tile border
+Each tile is a spanning tree of its cells and the tiles are linked by a spanning tree, so the whole maze is still
+perfect: every cell reachable, exactly one path between any two cells. The price is long straight tile borders
+with a single door, visible on small tile sizes
+
+Usage:
+    python tiled_generation.py --generator kruskal --cols 1024 --rows 1024 --tile 64 --seed 0 --out big.bin
+The output file is the raw bitmap: np.fromfile("big.bin", np.uint8).reshape(cols, rows)
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import numpy as np
+import wall_bitmap
+from batch_generate import GENERATORS, generate_bitmap
+from disjoint_set import DisjointSet
+
+# (shared memory name, cols, rows, x0, y0, x1, y1, generator, seed)
+TileTask = Tuple[str, int, int, int, int, int, int, str, int]
+
+def tile_bounds(cols: int, rows: int, tileSize: int) -> List[Tuple[int, int, int, int]]:
+    """x0, y0, x1, y1 (exclusive) of every tile, in [tx][ty] order"""
+    return [(x0, y0, min(x0 + tileSize, cols), min(y0 + tileSize, rows))
+            for x0 in range(0, cols, tileSize) for y0 in range(0, rows, tileSize)]
+
+def _generate_tile(task: TileTask) -> None:
+    "Worker entry point: generate one tile and write it into the shared bitmap"
+    shmName, cols, rows, x0, y0, x1, y1, generator, seed = task
+    shm = shared_memory.SharedMemory(name=shmName)
+    try:
+        bitmap = np.ndarray((cols, rows), dtype=np.uint8, buffer=shm.buf)
+        bitmap[x0:x1, y0:y1] = generate_bitmap(generator, x1 - x0, y1 - y0, seed)
+        del bitmap # release the view before closing the shared memory
+    finally:
+        shm.close()
+
+def stitch_tiles(bitmap: np.ndarray, tileSize: int, rng: random.Random) -> int:
+    """Open one passage across the border of every tile pair in a random spanning tree of the tiles.
+    Return the number of passages opened"""
+    cols, rows = bitmap.shape
+    tilesX, tilesY = -(-cols // tileSize), -(-rows // tileSize)
+    borders = [] # ((tx, ty), (tx2, ty2)) of every pair of adjacent tiles
+    for tx in range(tilesX):
+        for ty in range(tilesY):
+            if tx + 1 < tilesX:
+                borders.append(((tx, ty), (tx + 1, ty)))
+            if ty + 1 < tilesY:
+                borders.append(((tx, ty), (tx, ty + 1)))
+    rng.shuffle(borders)
+    tileSets = DisjointSet(tilesX * tilesY)
+    opened = 0
+    for (tx1, ty1), (tx2, ty2) in borders:
+        a, b = tx1 * tilesY + ty1, tx2 * tilesY + ty2
+        if tileSets.find(a) == tileSets.find(b):
+            continue
+        tileSets.union(a, b)
+        if tx2 != tx1:
+            # Vertical border between columns x and x + 1, pick a row along the shared edge
+            x = tx2 * tileSize - 1
+            y = rng.randrange(ty1 * tileSize, min((ty1 + 1) * tileSize, rows))
+            wall_bitmap.remove_wall(bitmap, x, y, x + 1, y)
+        else:
+            y = ty2 * tileSize - 1
+            x = rng.randrange(tx1 * tileSize, min((tx1 + 1) * tileSize, cols))
+            wall_bitmap.remove_wall(bitmap, x, y, x, y + 1)
+        opened += 1
+    return opened
+
+def generate_tiled(cols: int, rows: int, tileSize: int = 64, generator: str = "dfs", seed: int = 0,
+                   workers: Optional[int] = None) -> np.ndarray:
+    """
+    Generate a perfect maze of cols x rows cells tile by tile in parallel
+
+    Parameters
+    ----------
+    tileSize : int
+        Side of a tile in cells. Larger tiles mean fewer seams but less parallelism
+    generator : str
+        Generator run inside every tile, one of batch_generate.GENERATORS
+    seed : int
+        The tile seeds and the stitching are all derived from it, so the result does not depend on the number of workers
+    Returns
+    -------
+    Wall bitmap of shape (cols, rows), see wall_bitmap
+    """
+    if generator not in GENERATORS:
+        raise ValueError(f"Unknown generator: {generator}")
+    rng = random.Random(seed)
+    bounds = tile_bounds(cols, rows, tileSize)
+    tileSeeds = [rng.getrandbits(63) for _ in bounds]
+    shm = shared_memory.SharedMemory(create=True, size=cols * rows)
+    try:
+        bitmap = np.ndarray((cols, rows), dtype=np.uint8, buffer=shm.buf)
+        tasks = [(shm.name, cols, rows, x0, y0, x1, y1, generator, tileSeed)
+                 for (x0, y0, x1, y1), tileSeed in zip(bounds, tileSeeds)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Consume the results so that worker exceptions are raised here
+            for _ in pool.map(_generate_tile, tasks):
+                pass
+        stitch_tiles(bitmap, tileSize, rng)
+        result = bitmap.copy()
+        del bitmap
+    finally:
+        shm.close()
+        shm.unlink()
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate one huge maze tile by tile in parallel")
+    parser.add_argument("--generator", choices=GENERATORS, default="dfs")
+    parser.add_argument("--cols", type=int, default=512)
+    parser.add_argument("--rows", type=int, default=512)
+    parser.add_argument("--tile", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="tiled_maze.bin")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    bitmap = generate_tiled(args.cols, args.rows, args.tile, args.generator, args.seed, args.workers)
+    runtime = time.perf_counter() - start_time
+    bitmap.tofile(args.out)
+    print(f"Generated a {args.cols}x{args.rows} {args.generator} maze in {args.tile}x{args.tile} tiles "
+          f"in {runtime:.2f} seconds -> {args.out}")
+
+if __name__ == "__main__":
+    main()
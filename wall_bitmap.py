@@ -0,0 +1,96 @@
+# Compact wall bitmap of a maze: one uint8 per cell, indexed [x][y] exactly like MazeMap.MazeGrid
+"""Bit layout (same order as Cell.walls: Top, Right, Bottom, Left)
+- bit 0 (1): wall at the top    (towards y - 1)
+- bit 1 (2): wall on the right  (towards x + 1)
+- bit 2 (4): wall at the bottom (towards y + 1)
+- bit 3 (8): wall on the left   (towards x - 1)
+A set bit means the wall is present, so a freshly initialized grid is all 15s
+"""
+import os
+import numpy as np
+from typing import List, Tuple
+
+TOP, RIGHT, BOTTOM, LEFT = 1, 2, 4, 8
+ALL_WALLS = TOP | RIGHT | BOTTOM | LEFT
+WALL_BITS = (TOP, RIGHT, BOTTOM, LEFT) # Same index order as Cell.walls
+OPPOSITE_BIT = {TOP: BOTTOM, RIGHT: LEFT, BOTTOM: TOP, LEFT: RIGHT}
+# (dx, dy) of the neighbor on the other side of each wall, same order as WALL_BITS
+WALL_OFFSETS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+def _file_mode() -> int:
+    "Mode of a file created by open() under the process umask. Read once: os.umask can only be read by setting it"
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+# mkstemp creates 0600 files, the atomic writes of saved mazes, checkpoints and solve cache entries set this mode
+# before renaming
+NEW_FILE_MODE = _file_mode()
+
+def full_walls(cols: int, rows: int) -> np.ndarray:
+    """Bitmap of a grid where every cell still has its four walls"""
+    return np.full((cols, rows), ALL_WALLS, dtype=np.uint8)
+
+def from_maze_grid(grid: List[list]) -> np.ndarray:
+    """Build the bitmap from a MazeMap.MazeGrid (or anything shaped [x][y] with a .walls list)"""
+    return np.array([[cell.walls[0] | cell.walls[1] << 1 | cell.walls[2] << 2 | cell.walls[3] << 3 for cell in column]
+                     for column in grid], dtype=np.uint8)
+
+def to_wall_lists(bitmap: np.ndarray) -> List[list]:
+    """Convert the bitmap back into nested [Top, Right, Bottom, Left] lists, the format of Cell.walls and save2file"""
+    bits = bitmap.tolist()
+    return [[[bool(b & TOP), bool(b & RIGHT), bool(b & BOTTOM), bool(b & LEFT)] for b in column] for column in bits]
+
+def apply_to_maze_grid(bitmap: np.ndarray, grid: List[list]) -> None:
+    """Overwrite the walls of every Cell in a MazeGrid with the bitmap"""
+    for column, wallColumn in zip(grid, to_wall_lists(bitmap)):
+        for cell, walls in zip(column, wallColumn):
+            cell.walls = walls
+
+def remove_wall(bitmap: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> None:
+    """Remove the wall between two adjacent cells, the bitmap twin of MazeMap.removeWalls"""
+    for bit, (dx, dy) in zip(WALL_BITS, WALL_OFFSETS):
+        if (x2 - x1, y2 - y1) == (dx, dy):
+            bitmap[x1, y1] &= ~bit & ALL_WALLS
+            bitmap[x2, y2] &= ~OPPOSITE_BIT[bit] & ALL_WALLS
+            return
+    raise ValueError(f"Cells {(x1, y1)} and {(x2, y2)} are not adjacent")
+
+def open_neighbors(walls: List[list], x: int, y: int) -> List[Tuple[int, int]]:
+    """Reachable neighbors of a cell, with `walls` being bitmap.tolist() (plain lists are much faster to index than arrays).
+    Like open_masks, a move is open only when both cells agree"""
+    cell = walls[x][y]
+    neighbors = []
+    if not cell & TOP and y > 0 and not walls[x][y - 1] & BOTTOM:
+        neighbors.append((x, y - 1))
+    if not cell & RIGHT and x < len(walls) - 1 and not walls[x + 1][y] & LEFT:
+        neighbors.append((x + 1, y))
+    if not cell & BOTTOM and y < len(walls[0]) - 1 and not walls[x][y + 1] & TOP:
+        neighbors.append((x, y + 1))
+    if not cell & LEFT and x > 0 and not walls[x - 1][y] & RIGHT:
+        neighbors.append((x - 1, y))
+    return neighbors
+
+def open_masks(bitmap: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Boolean arrays (same shape as the bitmap) telling whether a cell can move up, right, down and left.
+    Moves leaving the grid are always blocked, even if an outer wall has been removed. A move is open only when both
+    cells agree, so a wall set on one side only (an inconsistent bitmap) blocks both directions.
+    Also works on a stack of bitmaps of shape (count, cols, rows)"""
+    openRight = np.zeros(bitmap.shape, dtype=bool)
+    openBottom = np.zeros(bitmap.shape, dtype=bool)
+    openRight[..., :-1, :] = ((bitmap[..., :-1, :] & RIGHT) == 0) & ((bitmap[..., 1:, :] & LEFT) == 0)
+    openBottom[..., :, :-1] = ((bitmap[..., :, :-1] & BOTTOM) == 0) & ((bitmap[..., :, 1:] & TOP) == 0)
+    # The same passages seen from the other cell
+    openLeft = np.zeros_like(openRight)
+    openTop = np.zeros_like(openBottom)
+    openLeft[..., 1:, :] = openRight[..., :-1, :]
+    openTop[..., :, 1:] = openBottom[..., :, :-1]
+    return openTop, openRight, openBottom, openLeft
+
+def flat_offsets(rows: int) -> Tuple[int, int, int, int]:
+    """Index offsets of the up/right/down/left neighbors in bitmap.ravel(), where cell (x, y) sits at x * rows + y"""
+    return (-1, rows, 1, -rows)
+
+def degrees(bitmap: np.ndarray) -> np.ndarray:
+    """Number of open sides of every cell (0 to 4), ignoring openings that would leave the grid"""
+    return sum(mask.astype(np.int8) for mask in open_masks(bitmap))